@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+#
+"""
+Compare the table driven yubico_util.crc16 with the bit-by-bit
+implementation it replaced.
+
+  $ python bench/bench_crc16.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from yubico import yubico_util
+
+
+def bitwise_crc16(data):
+    """ The previous implementation of yubico_util.crc16. """
+    m_crc = 0xffff
+    for this in data:
+        m_crc ^= yubico_util.ord_byte(this)
+        for _ in range(8):
+            j = m_crc & 1
+            m_crc >>= 1
+            if j:
+                m_crc ^= 0x8408
+    return m_crc
+
+
+def main():
+    number = 20000
+    # 64 bytes is a frame payload / config, 22 bytes an HMAC response with CRC
+    for size in (6, 22, 64):
+        data = os.urandom(size)
+        assert bitwise_crc16(data) == yubico_util.crc16(data)
+        old = min(timeit.repeat(lambda: bitwise_crc16(data), number=number, repeat=3))
+        new = min(timeit.repeat(lambda: yubico_util.crc16(data), number=number, repeat=3))
+        print("%3i bytes : bitwise %6.2f us, table %6.2f us, speedup %.1fx" % (
+            size, old / number * 1e6, new / number * 1e6, old / new))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
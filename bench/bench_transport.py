@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+#
+"""
+Measure the latency of YubiKey operations through the USB HID transport,
+broken down into the phases of an exchange with the YubiKey :
+
+  frame  -- building YubiKeyFrames and splitting them into feature reports
+  crc    -- computing and checking CRCs on the host
+  write  -- writing feature reports
+  wait   -- polling the status until the YubiKey is ready or has a response
+  read   -- reading status and response feature reports
+  reset  -- resetting the read mode after a response
+  other  -- everything else (argument checks, parsing, Python overhead)
+
+By default the operations run against a software YubiKey (see
+yubico.yubikey_emulator) answering instantly, which measures the host
+side of the library only. With --typical or --profile the emulator takes
+as long as a real YubiKey would for each command. A profile is a JSON
+file like
+
+  {"latency": {"CHAL_HMAC2": 0.0131, "DEVICE_SERIAL": 0.0021}, "write_latency": 0.0}
+
+and can be recorded from a real YubiKey with --device --save-profile.
+
+  $ python bench/bench_transport.py
+  $ python bench/bench_transport.py --typical --json results.json
+  $ python bench/bench_transport.py --device --ops status,serial --save-profile yk.json
+  $ python bench/bench_transport.py --profile yk.json
+
+Never run write_config against a real YubiKey, --device refuses it.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import yubico
+from yubico import yubico_aes
+from yubico import yubico_util
+from yubico import yubikey_config
+from yubico import yubikey_frame
+from yubico import yubikey_usb_hid
+from yubico import yubikey_emulator
+from yubico.yubikey_defs import SLOT
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+PHASES = ['frame', 'crc', 'write', 'wait', 'read', 'reset', 'other']
+
+OPERATIONS = ['status', 'serial', 'hmac_variable', 'hmac_fixed', 'otp', 'write_config', 'find_key']
+
+HMAC_SECRET = b'h:303132333435363738393a3b3c3d3e3f40414243'
+OTP_SECRET = b'h:000102030405060708090a0b0c0d0e0f'
+
+
+class PhaseTimer(object):
+    """
+    Attributes time spent to phases, by wrapping the functions doing them.
+
+    Time is accounted to the innermost phase, except that `absorb' phases
+    (the USB transfers) include everything called from them, e.g. the
+    emulator's own CRC computations are not host CRC time.
+    """
+
+    def __init__(self):
+        self.times = dict((phase, 0.0) for phase in PHASES)
+        self._stack = []
+        self._patched = []
+
+    def reset(self):
+        for phase in self.times:
+            self.times[phase] = 0.0
+
+    def _enter(self, phase, absorb):
+        now = _timer()
+        if self._stack:
+            parent = self._stack[-1]
+            self.times[parent[0]] += now - parent[2]
+        self._stack.append([phase, absorb, now])
+
+    def _leave(self):
+        now = _timer()
+        (phase, _, start) = self._stack.pop()
+        self.times[phase] += now - start
+        if self._stack:
+            self._stack[-1][2] = now
+
+    def _absorbed(self):
+        return self._stack and self._stack[-1][1]
+
+    def wrap(self, phase, func, absorb=False):
+        def wrapper(*args, **kwargs):
+            if self._absorbed():
+                return func(*args, **kwargs)
+            self._enter(phase, absorb)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._leave()
+        return wrapper
+
+    def patch(self, obj, name, phase, absorb=False):
+        self._patched.append((obj, name, obj.__dict__[name]))
+        setattr(obj, name, self.wrap(phase, getattr(obj, name), absorb))
+
+    def install(self):
+        hid = yubikey_usb_hid.YubiKeyHIDDevice
+        self.patch(hid, '_raw_write', 'write', absorb=True)
+        self.patch(hid, '_read', 'read', absorb=True)
+        # not absorbing: the reports it reads are 'read', their CRC is 'crc'
+        self.patch(hid, '_read_pending', 'read')
+        self.patch(hid, '_waitfor', 'wait', absorb=True)
+        self.patch(hid, '_write_reset', 'reset', absorb=True)
+        self.patch(yubikey_frame.YubiKeyFrame, '__init__', 'frame')
+        self.patch(yubikey_frame.YubiKeyFrame, '_feature_reports', 'frame')
+        self.patch(yubikey_config.YubiKeyConfig, 'to_frame', 'frame')
+        self.patch(yubico_util, 'crc16', 'crc')
+        self.patch(yubico_util, 'validate_crc16', 'crc')
+        self.patch(yubico_util, '_crc16_update', 'crc')
+        self.patch(yubico_util.Crc16, 'update', 'crc')
+
+    def uninstall(self):
+        while self._patched:
+            (obj, name, orig) = self._patched.pop()
+            setattr(obj, name, orig)
+
+
+def percentile(values, pct):
+    """ Nearest-rank percentile of a sorted list. """
+    if not values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(samples):
+    """ Summarize a list of (total, {phase: seconds}) samples. """
+    totals = sorted(total for (total, _) in samples)
+    res = {'n': len(samples),
+           'ops_per_sec': len(samples) / sum(totals) if sum(totals) else 0.0,
+           'p50': percentile(totals, 50),
+           'p99': percentile(totals, 99),
+           'phases': {},
+           }
+    for phase in PHASES:
+        values = sorted(phases[phase] for (_, phases) in samples)
+        res['phases'][phase] = {'mean': sum(values) / len(values),
+                                'p50': percentile(values, 50),
+                                'p99': percentile(values, 99),
+                                }
+    return res
+
+
+def measure(timer, func, iterations, warmup=3):
+    """ Call func() `iterations' times, returning the samples. """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        timer.reset()
+        start = _timer()
+        func()
+        total = _timer() - start
+        phases = dict(timer.times)
+        phases['other'] = max(0.0, total - sum(phases.values()))
+        samples.append((total, phases))
+    return samples
+
+
+def load_profile(filename):
+    """ Read a latency profile, returning keyword arguments for YubiKeyEmulator. """
+    with open(filename) as f:
+        profile = json.load(f)
+    latency = dict((getattr(SLOT, name), seconds) for (name, seconds) in profile.get('latency', {}).items())
+    return {'latency': latency, 'write_latency': profile.get('write_latency', 0.0)}
+
+
+def make_emulator(args):
+    kwargs = {}
+    if args.profile:
+        kwargs = load_profile(args.profile)
+    elif args.typical:
+        kwargs = {'latency': dict(yubikey_emulator.TYPICAL_LATENCY)}
+    emulator = yubikey_emulator.YubiKeyEmulator(version=args.version, **kwargs)
+    emulator.load_config(args.otp_slot, otp_config())
+    emulator.load_config(args.hmac_slot, hmac_config())
+    return emulator
+
+
+def otp_config():
+    cfg = yubikey_config.YubiKeyConfig()
+    cfg.mode_challenge_response(OTP_SECRET, type='OTP')
+    return cfg
+
+
+def hmac_config():
+    cfg = yubikey_config.YubiKeyConfig()
+    cfg.mode_challenge_response(HMAC_SECRET, type='HMAC', variable=True)
+    return cfg
+
+
+def operations(args, YK, emulator):
+    """ Return the benchmarked functions, and the SLOT command each waits for. """
+    variable = b'Sample #2'
+    fixed = os.urandom(64)
+    ops = {
+        'status': (lambda: YK.status(), None),
+        'serial': (lambda: YK.serial(), 'DEVICE_SERIAL'),
+        'hmac_variable': (lambda: YK.challenge_response(variable, slot=args.hmac_slot),
+                          'CHAL_HMAC%i' % args.hmac_slot),
+        'hmac_fixed': (lambda: YK.challenge_response(fixed, slot=args.hmac_slot, variable=False),
+                       'CHAL_HMAC%i' % args.hmac_slot),
+        'otp': (lambda: YK.challenge_response(b'abcdef', mode='OTP', slot=args.otp_slot),
+                'CHAL_OTP%i' % args.otp_slot),
+        }
+    if emulator is not None:
+        cfg = otp_config()
+        ops['write_config'] = (lambda: YK.write_config(cfg, slot=args.otp_slot), 'CONFIG' if args.otp_slot == 1 else 'CONFIG2')
+        ops['find_key'] = (lambda: yubikey_emulator.emulate(emulator), None)
+    else:
+        ops['find_key'] = (lambda: yubico.find_yubikey(), None)
+    return ops
+
+
+def report(results, out):
+    out.write("%-14s %8s %10s %10s   %s\n" % (
+        'operation', 'ops/sec', 'p50 ms', 'p99 ms', '  '.join('%6s' % p for p in PHASES)))
+    for (name, res) in results.items():
+        out.write("%-14s %8.0f %10.3f %10.3f   %s\n" % (
+            name, res['ops_per_sec'], res['p50'] * 1e3, res['p99'] * 1e3,
+            '  '.join('%6.3f' % (res['phases'][p]['p50'] * 1e3) for p in PHASES)))
+    out.write("(phases are p50 in ms)\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the YubiKey USB HID transport.')
+    parser.add_argument('--ops', default=None,
+                        help='comma separated operations (default: all of %s)' % ','.join(OPERATIONS))
+    parser.add_argument('-n', '--iterations', type=int, default=200)
+    parser.add_argument('--typical', action='store_true',
+                        help='emulate typical YubiKey latencies')
+    parser.add_argument('--profile', help='emulate the latencies in this JSON profile')
+    parser.add_argument('--device', action='store_true',
+                        help='use the first attached YubiKey instead of the emulator')
+    parser.add_argument('--save-profile', help='write the measured wait times as a profile')
+    parser.add_argument('--version', default='4.3.7', help='emulated firmware version')
+    parser.add_argument('--hmac-slot', type=int, default=2)
+    parser.add_argument('--otp-slot', type=int, default=1)
+    parser.add_argument('--json', help='write the results as JSON to this file (- for stdout)')
+    args = parser.parse_args()
+    args.version = tuple(int(x) for x in args.version.split('.'))
+    args.ops = args.ops.split(',') if args.ops else OPERATIONS
+    for name in args.ops:
+        if name not in OPERATIONS:
+            parser.error('Unknown operation %s' % name)
+    if args.device and 'write_config' in args.ops:
+        if args.ops is OPERATIONS:
+            args.ops = [name for name in OPERATIONS if name != 'write_config']
+        else:
+            parser.error('Refusing to overwrite a configuration slot of a real YubiKey')
+    if not args.device and 'otp' in args.ops and not yubico_aes.HAVE_CRYPTOGRAPHY:
+        if args.ops is OPERATIONS:
+            args.ops = [name for name in args.ops if name != 'otp']
+        else:
+            parser.error('Emulating Yubico OTP requires the cryptography package')
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.device:
+        emulator = None
+        YK = yubico.find_yubikey()
+    else:
+        emulator = make_emulator(args)
+        YK = yubikey_emulator.emulate(emulator)
+    ops = operations(args, YK, emulator)
+
+    timer = PhaseTimer()
+    timer.install()
+    results = {}
+    commands = {}
+    try:
+        for name in args.ops:
+            (func, command) = ops[name]
+            results[name] = summarize(measure(timer, func, args.iterations))
+            if command is not None:
+                commands[command] = results[name]['phases']['wait']['p50']
+    finally:
+        timer.uninstall()
+
+    report(results, sys.stderr if args.json == '-' else sys.stdout)
+    if args.json:
+        doc = {'python': platform.python_version(),
+               'yubico': yubico.__version__,
+               'device': str(YK),
+               'emulated': emulator is not None,
+               'iterations': args.iterations,
+               'results': results,
+               }
+        if args.json == '-':
+            json.dump(doc, sys.stdout, indent=2, sort_keys=True)
+        else:
+            with open(args.json, 'w') as f:
+                json.dump(doc, f, indent=2, sort_keys=True)
+    if args.save_profile:
+        with open(args.save_profile, 'w') as f:
+            json.dump({'latency': commands, 'write_latency': 0.0}, f, indent=2, sort_keys=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,6 +27,10 @@ setup(
     license='BSD 2 clause',
     packages=['yubico'],
     install_requires=['pyusb'],
+    extras_require={
+        # AES for validating Yubico OTPs (yubico_otp)
+        'otp': ['cryptography'],
+    },
     test_suite='test',
     cmdclass={'release': release},
     classifiers=[
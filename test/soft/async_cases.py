@@ -0,0 +1,122 @@
+"""
+Tests of the asyncio front-end. They use async def, which Python < 3.5
+can't compile, so they are imported by test_yubikey_async from 3.5 only.
+"""
+
+import asyncio
+import threading
+import unittest
+
+from yubico.yubikey_async import AsyncYubiKey
+from yubico import yubikey_poll
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_defs import SLOT
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+
+
+class TestAsyncYubiKey(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3), serial=1234567)
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.emulator.load_config(2, cfg)
+        self.YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.001))
+
+    def run_async(self, coro):
+        return asyncio.new_event_loop().run_until_complete(coro)
+
+    def test_event_loops(self):
+        """ Test using the same YubiKey from one event loop after another """
+        YK = AsyncYubiKey(self.YK)
+        async def concurrent():
+            return await asyncio.gather(YK.serial(), YK.serial())
+        for _ in range(2):
+            self.assertEqual(self.run_async(concurrent()), [1234567, 1234567])
+
+    def test_serial(self):
+        """ Test reading the serial number """
+        self.assertEqual(self.run_async(AsyncYubiKey(self.YK).serial()), 1234567)
+
+    def test_challenge_response(self):
+        """ Test that concurrent challenges give the same results as the blocking API """
+        async def concurrent():
+            YK = AsyncYubiKey(self.YK)
+            return await asyncio.gather(*[YK.challenge_response(b'Sample #%i' % i, slot=2)
+                                          for i in range(5)])
+        responses = self.run_async(concurrent())
+        for i in range(5):
+            self.assertEqual(responses[i], self.YK.challenge_response(b'Sample #%i' % i, slot=2))
+
+    def test_timeout(self):
+        """ Test that a timeout resets the YubiKey """
+        self.emulator.latency = {SLOT.CHAL_HMAC2: 10}
+        self.assertRaises(YubiKeyTimeout, self.run_async,
+                          AsyncYubiKey(self.YK).challenge_response(b'test', slot=2, timeout=0.05))
+        self.assertEqual(self.emulator._response, None)
+        self.assertEqual(self.run_async(AsyncYubiKey(self.YK).serial()), 1234567)
+
+    def test_device_lock(self):
+        """ Test that async operations wait for the device lock held by another thread """
+        lock = self.YK._device._lock
+        held = threading.Event()
+        release = threading.Event()
+        def hold():
+            with lock:
+                held.set()
+                release.wait()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        async def serial():
+            writes = self.emulator.writes
+            task = asyncio.ensure_future(AsyncYubiKey(self.YK).serial())
+            await asyncio.sleep(0.05)
+            # nothing was sent while the other thread held the lock
+            self.assertFalse(task.done())
+            self.assertEqual(self.emulator.writes, writes)
+            release.set()
+            return await task
+        try:
+            self.assertEqual(self.run_async(serial()), 1234567)
+        finally:
+            release.set()
+            thread.join()
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+    def test_write_config(self):
+        """ Test writing a configuration """
+        cfg = self.YK.init_config()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.run_async(AsyncYubiKey(self.YK).write_config(cfg, slot=1))
+        self.assertEqual(self.run_async(AsyncYubiKey(self.YK).status()).valid_configs(), [1, 2])
+
+    def test_touch_progress(self):
+        """ Test iterating over the seconds left to press the button """
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243', require_button=True)
+        self.emulator.load_config(1, cfg)
+        self.emulator.touch_after = 0.05
+        async def touch():
+            progress = AsyncYubiKey(self.YK).challenge_response_progress(b'Sample #2', slot=1)
+            seen = []
+            async for seconds_left in progress:
+                seen.append(seconds_left)
+            return (seen, await progress)
+        (seen, response) = self.run_async(touch())
+        self.assertEqual(seen, [15])
+        self.assertEqual(response, self.YK.challenge_response(b'Sample #2', slot=2))
+
+    def test_no_touch_progress(self):
+        """ Test that nothing is iterated over when no button press is required """
+        async def no_touch():
+            progress = AsyncYubiKey(self.YK).challenge_response_progress(b'Sample #2', slot=2)
+            seen = []
+            async for seconds_left in progress:
+                seen.append(seconds_left)
+            return (seen, await progress)
+        (seen, response) = self.run_async(no_touch())
+        self.assertEqual(seen, [])
+        self.assertEqual(len(response), 20)
@@ -0,0 +1,40 @@
+"""
+Stand-ins for USB devices, shared by the tests not needing a real YubiKey.
+"""
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from yubico import yubico_util
+from yubico.yubikey_usb_hid import YubiKeyHIDDevice
+
+
+class FakeUSBDevice(object):
+    """ Looks enough like a usb.legacy.Device for find_usb_devices() users """
+
+    def __init__(self, address, version, pid=0x0010):
+        self.dev = mock.Mock(bus=1, address=address)
+        self.idProduct = pid
+        self.version = version
+
+
+class FakeHIDDevice(YubiKeyHIDDevice):
+    """ YubiKeyHIDDevice never touching USB, only answering status reads """
+
+    opened = 0
+
+    def _open(self, skip=0):
+        FakeHIDDevice.opened += 1
+        self._transport = True
+        return True
+
+    def _close(self):
+        self._transport = None
+
+    def _read(self):
+        major, minor, build = self.usb_device.version
+        return yubico_util.chr_byte(0) + yubico_util.chr_byte(major) + \
+            yubico_util.chr_byte(minor) + yubico_util.chr_byte(build) + b'\x01\x03\x00\x00'
+
@@ -0,0 +1,151 @@
+"""
+A pure Python AES-128, for the tests to run without the `cryptography'
+package. Its table lookups are not constant-time, so it has no place in
+the library.
+"""
+
+from yubico import yubico_aes
+from yubico import yubico_exception
+
+BLOCK_SIZE = yubico_aes.BLOCK_SIZE
+
+
+def use_pure_aes(testcase):
+    """
+    Have yubico_aes.AES128 be a PureAES128 for the duration of `testcase',
+    unless the cryptography package is installed.
+    """
+    if yubico_aes.HAVE_CRYPTOGRAPHY:
+        return
+    aes = yubico_aes.AES128
+    yubico_aes.AES128 = PureAES128
+    testcase.addCleanup(setattr, yubico_aes, 'AES128', aes)
+
+
+def _xtime(a):
+    a <<= 1
+    if a & 0x100:
+        a ^= 0x11b
+    return a
+
+def _tables():
+    """ Compute the S-box, its inverse and GF(2^8) multiplication tables. """
+    # generate the S-box from multiplicative inverses in GF(2^8)
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p := p * 3, q := q / 3
+        p = p ^ _xtime(p)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xff
+        if q & 0x80:
+            q ^= 0x09
+        x = q ^ ((q << 1) | (q >> 7)) ^ ((q << 2) | (q >> 6)) ^ \
+            ((q << 3) | (q >> 5)) ^ ((q << 4) | (q >> 4))
+        sbox[p] = (x ^ 0x63) & 0xff
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    inv_sbox = [0] * 256
+    for (i, s) in enumerate(sbox):
+        inv_sbox[s] = i
+
+    def mul(a, b):
+        res = 0
+        while b:
+            if b & 1:
+                res ^= a
+            a = _xtime(a)
+            b >>= 1
+        return res
+    muls = dict((n, tuple(mul(a, n) for a in range(256))) for (n) in (2, 3, 9, 11, 13, 14))
+    return (tuple(sbox), tuple(inv_sbox), muls)
+
+_SBOX, _INV_SBOX, _MUL = _tables()
+
+
+class PureAES128(object):
+    """ Pure Python stand-in for yubico_aes.AES128 (ECB, single blocks). """
+
+    def __init__(self, key):
+        key = bytes(key)
+        if len(key) != 16:
+            raise yubico_exception.InputError('AES128 key must be exactly 16 bytes')
+        self._round_keys = self._expand_key(bytearray(key))
+
+    def __repr__(self):
+        return '<%s instance at %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            )
+
+    def encrypt_block(self, block):
+        """ Encrypt one 16 byte block. """
+        if len(block) != BLOCK_SIZE:
+            raise yubico_exception.InputError('AES block must be exactly 16 bytes')
+        return bytes(self._encrypt(bytearray(block)))
+
+    def decrypt_block(self, block):
+        """ Decrypt one 16 byte block. """
+        if len(block) != BLOCK_SIZE:
+            raise yubico_exception.InputError('AES block must be exactly 16 bytes')
+        return bytes(self._decrypt(bytearray(block)))
+
+    def decrypt_blocks(self, data):
+        """ Decrypt a multiple of 16 bytes, block by block (ECB). """
+        if len(data) % BLOCK_SIZE:
+            raise yubico_exception.InputError('AES data must be a multiple of 16 bytes')
+        data = bytearray(data)
+        return b''.join(bytes(self._decrypt(data[i:i + BLOCK_SIZE]))
+                        for i in range(0, len(data), BLOCK_SIZE))
+
+    @staticmethod
+    def _expand_key(key):
+        words = [key[i:i + 4] for i in range(0, 16, 4)]
+        rcon = 1
+        for i in range(4, 44):
+            word = bytearray(words[i - 1])
+            if i % 4 == 0:
+                word = bytearray([_SBOX[word[1]] ^ rcon, _SBOX[word[2]], _SBOX[word[3]], _SBOX[word[0]]])
+                rcon = _xtime(rcon)
+            words.append(bytearray(a ^ b for (a, b) in zip(words[i - 4], word)))
+        return [bytearray().join(words[i:i + 4]) for i in range(0, 44, 4)]
+
+    def _encrypt(self, state):
+        keys = self._round_keys
+        state = bytearray(a ^ b for (a, b) in zip(state, keys[0]))
+        mul2, mul3 = _MUL[2], _MUL[3]
+        for rnd in range(1, 11):
+            # SubBytes and ShiftRows
+            s = [_SBOX[state[(i + 4 * (i % 4)) % 16]] for i in range(16)]
+            if rnd != 10:
+                # MixColumns
+                for c in range(0, 16, 4):
+                    a0, a1, a2, a3 = s[c:c + 4]
+                    s[c] = mul2[a0] ^ mul3[a1] ^ a2 ^ a3
+                    s[c + 1] = a0 ^ mul2[a1] ^ mul3[a2] ^ a3
+                    s[c + 2] = a0 ^ a1 ^ mul2[a2] ^ mul3[a3]
+                    s[c + 3] = mul3[a0] ^ a1 ^ a2 ^ mul2[a3]
+            state = bytearray(a ^ b for (a, b) in zip(s, keys[rnd]))
+        return state
+
+    def _decrypt(self, state):
+        keys = self._round_keys
+        m9, m11, m13, m14 = _MUL[9], _MUL[11], _MUL[13], _MUL[14]
+        state = bytearray(a ^ b for (a, b) in zip(state, keys[10]))
+        for rnd in range(9, -1, -1):
+            # InvShiftRows and InvSubBytes
+            s = [_INV_SBOX[state[(i - 4 * (i % 4)) % 16]] for i in range(16)]
+            s = [a ^ b for (a, b) in zip(s, keys[rnd])]
+            if rnd != 0:
+                # InvMixColumns
+                for c in range(0, 16, 4):
+                    a0, a1, a2, a3 = s[c:c + 4]
+                    s[c] = m14[a0] ^ m11[a1] ^ m13[a2] ^ m9[a3]
+                    s[c + 1] = m9[a0] ^ m14[a1] ^ m11[a2] ^ m13[a3]
+                    s[c + 2] = m13[a0] ^ m9[a1] ^ m14[a2] ^ m11[a3]
+                    s[c + 3] = m11[a0] ^ m13[a1] ^ m9[a2] ^ m14[a3]
+            state = bytearray(s)
+        return state
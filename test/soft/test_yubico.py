@@ -10,6 +10,18 @@ from yubico.yubico_util import crc16
 
 CRC_OK_RESIDUAL=0xf0b8
 
+def bitwise_crc16(data):
+    """ The original bit-by-bit implementation, as reference """
+    m_crc = 0xffff
+    for this in bytearray(data):
+        m_crc ^= this
+        for _ in range(8):
+            j = m_crc & 1
+            m_crc >>= 1
+            if j:
+                m_crc ^= 0x8408
+    return m_crc
+
 class TestCRC(unittest.TestCase):
 
     def test_first(self):
@@ -29,6 +41,29 @@ class TestCRC(unittest.TestCase):
         crc2 = crc16(buffer)
         self.assertEqual(crc2, CRC_OK_RESIDUAL)
 
+    def test_table_matches_bitwise(self):
+        """ Test table driven CRC16 against the bitwise reference """
+        for length in range(0, 80):
+            buffer = struct.pack('%iB' % length, *[(i * 37 + length) & 0xff for i in range(length)])
+            self.assertEqual(crc16(buffer), bitwise_crc16(buffer))
+
+    def test_buffer_types(self):
+        """ Test CRC16 of bytearray and memoryview input """
+        buffer = b'\x01\x02\x03\x04'
+        self.assertEqual(crc16(bytearray(buffer)), 0xc66e)
+        self.assertEqual(crc16(memoryview(buffer)), 0xc66e)
+        self.assertEqual(crc16(memoryview(b'\x00\x01\x02\x03\x04\x05')[1:5]), 0xc66e)
+
+    def test_incremental(self):
+        """ Test incremental CRC16 over chunks """
+        buffer = b'\x01\x02\x03\x04'
+        buffer += struct.pack('<H', 0xffff - 0xc66e)
+        crc = yubico_util.Crc16()
+        crc.update(buffer[:3]).update(memoryview(buffer)[3:])
+        self.assertEqual(crc.value, CRC_OK_RESIDUAL)
+        self.assertTrue(crc.valid())
+        self.assertFalse(yubico_util.Crc16(buffer[:5]).valid())
+
     def test_hexdump(self):
         """ Test hexdump function, normal use """
         bytes = b'\x01\x02\x03\x04\x05\x06\x07\x08'
@@ -45,5 +80,9 @@ class TestCRC(unittest.TestCase):
         """ Test modhex decoding """
         self.assertEqual(b"0123456789abcdef", yubico_util.modhex_decode(b"cbdefghijklnrtuv"))
 
+    def test_modhex_encode(self):
+        """ Test modhex encoding """
+        self.assertEqual(b"cbdefghijklnrtuv", yubico_util.modhex_encode(b"\x01\x23\x45\x67\x89\xab\xcd\xef"))
+
 if __name__ == '__main__':
     unittest.main()
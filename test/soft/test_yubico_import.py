@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+# seconds an import may take, measured in a fresh interpreter (a few
+# milliseconds when the USB transports are not loaded)
+IMPORT_BUDGET = 0.25
+
+_MEASURE = '''
+import sys, json, time
+sys.modules['usb'] = None   # as if PyUSB were not installed
+start = time.time()
+import %s
+elapsed = time.time() - start
+print(json.dumps({'elapsed': elapsed,
+                  'modules': sorted(m for (m, mod) in sys.modules.items()
+                                    if mod is not None and (m == 'usb' or m.startswith('yubico')))}))
+'''
+
+# below Python 3.7, the package imports the YubiKey classes (and through
+# them the USB transports) eagerly
+LAZY = sys.version_info >= (3, 7)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_import(module):
+    """ Import `module' in a new interpreter, returning the time taken and the modules loaded. """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([_ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    out = subprocess.check_output([sys.executable, '-c', _MEASURE % module], env=env)
+    res = json.loads(out.decode('utf-8'))
+    return (res['elapsed'], res['modules'])
+
+
+class TestImport(unittest.TestCase):
+
+    def check_import(self, module):
+        (elapsed, modules) = measure_import(module)
+        self.assertFalse('usb' in modules)
+        if LAZY:
+            self.assertFalse('yubico.yubikey_usb_hid' in modules)
+            self.assertFalse('yubico.yubikey_transport' in modules)
+            self.assertTrue(elapsed < IMPORT_BUDGET, 'import %s took %.3fs' % (module, elapsed))
+        return modules
+
+    @unittest.skipIf(not LAZY, 'imported on first use from Python 3.7')
+    def test_yubico(self):
+        """ Test that importing the package loads no YubiKey code """
+        self.assertEqual(self.check_import('yubico'), ['yubico', 'yubico.yubico_version'])
+
+    def test_software_modules(self):
+        """ Test that the pure software modules load without PyUSB """
+        for module in ('yubico.yubikey_config', 'yubico.yubikey_frame', 'yubico.yubico_util',
+                       'yubico.yubico_otp', 'yubico.yubico_oath'):
+            self.check_import(module)
+
+    @unittest.skipIf(not LAZY, 'imported on first use from Python 3.7')
+    def test_lazy_attributes(self):
+        """ Test that the package attributes are imported on first use """
+        import yubico
+        self.assertTrue(yubico.find_yubikey is yubico.yubikey.find_key)
+        self.assertEqual(yubico.yubico_util.crc16(b'\x01'), 0x1e0e)
+        self.assertRaises(AttributeError, getattr, yubico, 'no_such_thing')
+        self.assertTrue('yubikey_config' in dir(yubico))
+
+if __name__ == '__main__':
+    unittest.main()
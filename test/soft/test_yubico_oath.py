@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+import hmac
+import struct
+import hashlib
+import unittest
+
+from yubico import yubico_util
+from yubico import yubico_exception
+from yubico import yubico_oath
+from yubico.yubico_oath import OATHVerifier, HOTPCredential, TOTPCredential, hotp_truncate_many
+
+SECRET = b'12345678901234567890'
+# from RFC 4226, appendix D
+HOTP_CODES = [755224, 287082, 359152, 969429, 338314, 254676, 287922, 162583, 399871, 520489]
+
+
+class Clock(object):
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTruncate(unittest.TestCase):
+
+    def setUp(self):
+        self.digests = [hmac.new(SECRET, struct.pack('>Q', n), hashlib.sha1).digest() for n in range(10)]
+
+    def test_pure_python(self):
+        """ Test truncating without NumPy """
+        self.assertEqual(hotp_truncate_many(self.digests, use_numpy=False), HOTP_CODES)
+
+    @unittest.skipIf(yubico_oath.numpy is None, 'NumPy not installed')
+    def test_numpy(self):
+        """ Test truncating with NumPy """
+        self.assertEqual(hotp_truncate_many(b''.join(self.digests), use_numpy=True), HOTP_CODES)
+        self.assertEqual(hotp_truncate_many(self.digests, length=8, use_numpy=True),
+                         [yubico_util.hotp_truncate(d, length=8) for d in self.digests])
+
+    def test_bad_length(self):
+        """ Test that partial HMACs are refused """
+        self.assertRaises(yubico_exception.YubicoError, hotp_truncate_many, b'\x00' * 21)
+        self.assertEqual(hotp_truncate_many([]), [])
+
+
+class TestHOTP(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = OATHVerifier(window=3, resync_window=10)
+        self.verifier.add('yk', HOTPCredential(b'h:' + b'3132333435363738393031323334353637383930'))
+
+    def test_verify(self):
+        """ Test codes within the look-ahead window """
+        self.assertTrue(self.verifier.verify('yk', '755224'))
+        self.assertFalse(self.verifier.verify('yk', '755224'))
+        self.assertTrue(self.verifier.verify('yk', HOTP_CODES[3]))
+        self.assertEqual(self.verifier.credentials['yk'].counter, 4)
+        # too far ahead
+        self.assertFalse(self.verifier.verify('yk', HOTP_CODES[8]))
+        self.assertFalse(self.verifier.verify('yk', '33831'))
+        self.assertFalse(self.verifier.verify('nobody', '755224'))
+
+    def test_many(self):
+        """ Test a batch of codes, in order """
+        self.verifier.add('yk2', HOTPCredential(SECRET, counter=5))
+        res = self.verifier.verify_many([('yk', HOTP_CODES[0]), ('yk2', HOTP_CODES[6]),
+                                         ('yk', HOTP_CODES[0]), ('yk', HOTP_CODES[1]),
+                                         ('yk2', HOTP_CODES[5]), ('yk', 'abcdef')])
+        self.assertEqual(res, [True, True, False, True, False, False])
+
+    def test_resync(self):
+        """ Test resynchronizing with two consecutive codes """
+        self.assertFalse(self.verifier.verify('yk', HOTP_CODES[7]))
+        self.assertFalse(self.verifier.resync('yk', HOTP_CODES[7], HOTP_CODES[9]))
+        self.assertTrue(self.verifier.resync('yk', HOTP_CODES[7], HOTP_CODES[8]))
+        self.assertEqual(self.verifier.credentials['yk'].counter, 9)
+        self.assertTrue(self.verifier.verify('yk', HOTP_CODES[9]))
+
+    def test_digits(self):
+        """ Test that only 6 or 8 digits are accepted """
+        self.assertRaises(yubico_exception.InputError, HOTPCredential, SECRET, digits=7)
+
+
+class TestTOTP(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock(59)
+        self.verifier = OATHVerifier(totp_window=1, clock=self.clock)
+        self.verifier.add('app', TOTPCredential(SECRET, digits=8))
+
+    def test_verify(self):
+        """ Test the RFC 6238 test vectors """
+        for (now, code) in [(59, '94287082'), (1111111109, '07081804'),
+                            (1111111111, '14050471'), (1234567890, '89005924')]:
+            self.clock.now = now
+            self.assertTrue(self.verifier.verify('app', code))
+            self.assertFalse(self.verifier.verify('app', code))
+
+    def test_drift(self):
+        """ Test that the window follows the drift of the authenticator """
+        # 94287082 is for step 1, two steps behind
+        self.clock.now = 59 + 60
+        self.assertFalse(self.verifier.verify('app', '94287082'))
+        self.clock.now = 59 + 30
+        self.assertTrue(self.verifier.verify('app', '94287082'))
+        self.assertEqual(self.verifier.credentials['app'].drift, -1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+import struct
+import binascii
+import unittest
+
+from yubico import yubico_util
+from yubico import yubico_exception
+from yubico import yubico_aes
+from yubico.yubico_otp import OTPValidator, OTPCredential
+from .pure_aes import PureAES128, use_pure_aes
+
+PUBLIC_ID = b'ccccccbcgujh'
+UID = b'\x01\x02\x03\x04\x05\x06'
+KEY = b'\x10' * 16
+
+
+def make_otp(use_counter, session_counter, public_id=PUBLIC_ID, uid=UID, key=KEY, timestamp=0x123456):
+    ticket = uid + struct.pack('<HHBBH', use_counter, timestamp & 0xffff, timestamp >> 16,
+                               session_counter, 0x4711)
+    ticket += struct.pack('<H', 0xffff - yubico_util.crc16(ticket))
+    return public_id + yubico_util.modhex_encode(yubico_aes.AES128(key).encrypt_block(ticket))
+
+
+class TestOTPValidator(unittest.TestCase):
+
+    def setUp(self):
+        use_pure_aes(self)
+        self.validator = OTPValidator([OTPCredential(b'm:' + PUBLIC_ID, UID, b'h:' + b'10' * 16)])
+
+    def test_valid(self):
+        """ Test validating an OTP """
+        otp = make_otp(5, 1)
+        self.assertEqual(len(otp), 44)
+        result = self.validator.validate(otp)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.public_id, PUBLIC_ID)
+        self.assertEqual((result.use_counter, result.session_counter, result.timestamp), (5, 1, 0x123456))
+        self.assertEqual(self.validator.get(PUBLIC_ID).use_counter, 5)
+
+    def test_text(self):
+        """ Test that OTPs can be given as upper case text """
+        self.assertTrue(self.validator.validate(make_otp(5, 1).decode('ascii').upper()).ok)
+
+    def test_replayed(self):
+        """ Test that OTPs are only accepted with increasing counters """
+        otp = make_otp(5, 1)
+        self.assertEqual(self.validator.validate(otp).result, 'ok')
+        self.assertEqual(self.validator.validate(otp).result, 'replayed')
+        self.assertEqual(self.validator.validate(make_otp(4, 9)).result, 'replayed')
+        self.assertEqual(self.validator.validate(make_otp(5, 2)).result, 'ok')
+        self.assertEqual(self.validator.validate(make_otp(6, 0)).result, 'ok')
+
+    def test_usage_flag(self):
+        """ Test that the usage flag in the use counter is not part of the counter """
+        result = self.validator.validate(make_otp(5 | 0x8000, 1))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.use_counter, 5)
+        self.assertEqual(self.validator.validate(make_otp(6, 0)).result, 'ok')
+        self.assertEqual(self.validator.validate(make_otp(4 | 0x8000, 9)).result, 'replayed')
+
+    def test_invalid(self):
+        """ Test OTPs that are not valid """
+        self.assertEqual(self.validator.validate(make_otp(1, 1, public_id=b'ccccccbcgujj')).result,
+                         'unknown_id')
+        self.assertEqual(self.validator.validate(make_otp(1, 1, uid=b'\x00' * 6)).result, 'bad_ticket')
+        self.assertEqual(self.validator.validate(make_otp(1, 1, key=b'\x11' * 16)).result, 'bad_ticket')
+        self.assertEqual(self.validator.validate(make_otp(1, 1)[-30:]).result, 'malformed')
+        self.assertEqual(self.validator.validate(make_otp(1, 1)[:-1]).result, 'malformed')
+        self.assertEqual(self.validator.validate(make_otp(1, 1)[:-1] + b'a').result, 'malformed')
+        self.assertEqual(self.validator.validate(u'\xe5' * 44).result, 'malformed')
+        self.assertEqual(self.validator.get(PUBLIC_ID).use_counter, 0)
+
+    def test_many(self):
+        """ Test validating a batch of OTPs, in order """
+        other = OTPCredential(b'h:' + b'ff' * 6, b'\x07' * 6, b'\x08' * 16)
+        self.validator.add(other)
+        otps = [make_otp(2, 1),
+                make_otp(1, 1, public_id=other.public_id, uid=b'\x07' * 6, key=b'\x08' * 16),
+                b'not an otp',
+                make_otp(2, 1),
+                make_otp(1, 1, public_id=b'ccccccbcgujj'),
+                make_otp(2, 2),
+                make_otp(3, 1)[:-1] + b'x',
+                ]
+        results = self.validator.validate_many(otps)
+        self.assertEqual([r.result for r in results],
+                         ['ok', 'ok', 'malformed', 'replayed', 'unknown_id', 'ok', 'malformed'])
+        self.assertEqual([r.otp for r in results], otps)
+        self.assertEqual(self.validator.validate_many([]), [])
+
+    def test_credential(self):
+        """ Test credential input checks """
+        self.assertRaises(yubico_exception.InputError, OTPCredential, PUBLIC_ID, b'\x01' * 5, KEY)
+        self.assertRaises(yubico_exception.InputError, OTPCredential, PUBLIC_ID, UID, KEY[:15])
+        self.assertRaises(yubico_exception.InputError, OTPCredential, b'\x01' * 17, UID, KEY)
+        self.validator.remove(PUBLIC_ID)
+        self.assertEqual(len(self.validator), 0)
+
+
+class TestAES(unittest.TestCase):
+
+    # FIPS-197, appendix C.1
+    KEY = binascii.unhexlify(b'000102030405060708090a0b0c0d0e0f')
+    PLAIN = binascii.unhexlify(b'00112233445566778899aabbccddeeff')
+    CIPHER = binascii.unhexlify(b'69c4e0d86a7b0430d8cdb78070b4c55a')
+
+    def check(self, aes):
+        self.assertEqual(aes.encrypt_block(self.PLAIN), self.CIPHER)
+        self.assertEqual(aes.decrypt_block(self.CIPHER), self.PLAIN)
+        self.assertEqual(aes.decrypt_blocks(self.CIPHER * 3), self.PLAIN * 3)
+        self.assertRaises(yubico_exception.InputError, aes.decrypt_block, self.CIPHER[:15])
+
+    @unittest.skipIf(not yubico_aes.HAVE_CRYPTOGRAPHY, 'cryptography not installed')
+    def test_cryptography(self):
+        """ Test the AES of the cryptography package """
+        self.check(yubico_aes.AES128(self.KEY))
+        self.assertRaises(yubico_exception.InputError, yubico_aes.AES128, self.KEY[:15])
+
+    def test_pure(self):
+        """ Test the pure Python AES the tests fall back on """
+        self.check(PureAES128(self.KEY))
+
+    @unittest.skipIf(yubico_aes.HAVE_CRYPTOGRAPHY, 'cryptography installed')
+    def test_requires_cryptography(self):
+        """ Test that OTP credentials can't be made without the cryptography package """
+        self.assertRaises(yubico_exception.YubicoError, yubico_aes.AES128, self.KEY)
+        self.assertRaises(yubico_exception.YubicoError, OTPCredential, PUBLIC_ID, UID, KEY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+
+import sys
+import unittest
+
+if sys.version_info >= (3, 5):
+    from .async_cases import TestAsyncYubiKey
+else:
+    @unittest.skip("asyncio front-end requires Python 3.5")
+    class TestAsyncYubiKey(unittest.TestCase):
+        pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -303,5 +303,23 @@ class YubiKeyTests(unittest.TestCase):
         Config.mode_challenge_response(secret, type='OTP')
         self.assertEqual('CHAL_RESP', Config._mode)
 
+    def test_cached_compatibility(self):
+        """ Test that cached flag compatibility agrees with the flag metadata """
+        from yubico.yubikey_config import TicketFlags, ConfigFlags, ExtendedFlags
+        for model in ('YubiKey', 'YubiKey NEO', 'YubiKey 4', 'Unknown'):
+            for version in ((1, 3, 0), (2, 0, 1), (2, 1, 4), (2, 2, 3), (2, 3, 0), (4, 3, 7)):
+                capa = yubico.yubikey_usb_hid.YubiKeyUSBHIDCapabilities( \
+                    model = model, version = version, default_answer = False)
+                for flag in TicketFlags + ConfigFlags + ExtendedFlags:
+                    self.assertEqual(capa.have_config_flag(flag), flag._is_compatible(model, version))
+
+    def test_unknown_flag(self):
+        """ Test flags that aren't known by name """
+        Config = self.Config
+        self.assertRaises(yubico.yubico_exception.InputError, Config.ticket_flag, 'APPEND_LF', True)
+        self.assertRaises(yubico.yubico_exception.InputError, Config.extended_flag, ['DORMANT'], True)
+        Config.ticket_flag(0x20, True)
+        self.assertTrue(Config.ticket_flag('APPEND_CR'))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+
+from yubico import yubico_exception
+from yubico import yubikey_config_batch
+from yubico import yubikey_poll
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_config_batch import YubiKeyConfigBatch
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+
+
+def otp_config(uid, aes_key, fixed=b'', access_code=None):
+    cfg = YubiKeyConfig()
+    cfg.mode_yubikey_otp(uid, aes_key)
+    cfg.fixed_string(fixed)
+    cfg.ticket_flag('APPEND_CR', True)
+    if access_code is not None:
+        cfg.access_key(access_code)
+    return cfg
+
+
+class TestConfigBatch(unittest.TestCase):
+
+    use_numpy = False
+
+    def setUp(self):
+        self.template = otp_config(b'\x00' * 6, b'\x00' * 16)
+        self.uids = [os.urandom(6) for _ in range(20)]
+        self.keys = [os.urandom(16) for _ in range(20)]
+        # one of them all zeros, so that reports are skipped
+        self.uids[3] = b'\x00' * 6
+        self.fixed = [os.urandom(i % 17) for i in range(20)]
+        self.batch = YubiKeyConfigBatch(self.template, slot=2, use_numpy=self.use_numpy)
+
+    def test_same_as_config(self):
+        """ Test that compiled configurations are those of YubiKeyConfig """
+        configs = self.batch.compile(uid=self.uids, aes_key=self.keys, fixed=self.fixed)
+        self.assertEqual(len(configs), 20)
+        for (i, compiled) in enumerate(configs):
+            frame = otp_config(self.uids[i], self.keys[i], self.fixed[i]).to_frame(slot=2)
+            self.assertEqual(compiled.to_string(), frame.payload)
+            this = compiled.to_frame(slot=2)
+            self.assertEqual(this.command, frame.command)
+            self.assertEqual(this.crc, frame.crc)
+            self.assertEqual(this.to_feature_reports(), frame.to_feature_reports())
+            self.assertTrue(isinstance(compiled.to_string(), bytes))
+            self.assertTrue(all(isinstance(r, bytes) for r in this.to_feature_reports()))
+            self.assertEqual([a for (_, a) in this.to_feature_reports(debug=True)],
+                             [a for (_, a) in frame.to_feature_reports(debug=True)])
+
+    def test_access_code(self):
+        """ Test per-key access codes """
+        codes = [os.urandom(6) for _ in range(20)]
+        configs = self.batch.compile(access_code=codes)
+        for i in (0, 19):
+            frame = otp_config(b'\x00' * 6, b'\x00' * 16, access_code=codes[i]).to_frame(slot=2)
+            self.assertEqual(configs[i].to_string(), frame.payload)
+
+    def test_bad_fields(self):
+        """ Test that bad per-key fields are refused """
+        self.assertRaises(yubico_exception.InputError, self.batch.compile, uid=[b'\x00' * 5])
+        self.assertRaises(yubico_exception.InputError, self.batch.compile, fixed=[b'\x00' * 17])
+        self.assertRaises(yubico_exception.InputError, self.batch.compile,
+                          uid=self.uids, aes_key=self.keys[:3])
+        self.assertRaises(yubico_exception.InputError, self.batch.compile)
+        configs = self.batch.compile(uid=self.uids)
+        self.assertRaises(yubico_exception.InputError, configs[0].to_frame, slot=1)
+
+    def test_write_config(self):
+        """ Test programming emulated YubiKeys with compiled configurations """
+        configs = self.batch.compile(uid=self.uids[:2], aes_key=self.keys[:2], fixed=self.fixed[:2])
+        for (i, compiled) in enumerate(configs):
+            emulator = YubiKeyEmulator(version=(2, 2, 3))
+            YK = emulate(emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+            YK.write_config(compiled, slot=2)
+            self.assertEqual(emulator.configs[2]['uid'], self.uids[i])
+            self.assertEqual(emulator.configs[2]['key'], self.keys[i])
+            self.assertEqual(emulator.configs[2]['fixed'], self.fixed[i])
+
+
+@unittest.skipIf(yubikey_config_batch.numpy is None, "NumPy not installed")
+class TestConfigBatchNumPy(TestConfigBatch):
+
+    use_numpy = True
+
+    def test_arrays(self):
+        """ Test per-key fields given as arrays """
+        numpy = yubikey_config_batch.numpy
+        uids = numpy.frombuffer(b''.join(self.uids), dtype=numpy.uint8).reshape(20, 6)
+        fixed = numpy.frombuffer(b''.join(f.ljust(6, b'\x00')[:6] for f in self.fixed), dtype=numpy.uint8).reshape(20, 6)
+        configs = self.batch.compile(uid=uids, fixed=fixed)
+        for i in (0, 3, 19):
+            frame = otp_config(self.uids[i], b'\x00' * 16, self.fixed[i].ljust(6, b'\x00')[:6]).to_frame(slot=2)
+            self.assertEqual(configs[i].to_string(), frame.payload)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+import struct
+import binascii
+import unittest
+
+import yubico
+from yubico import yubico_util
+from yubico import yubikey_poll
+from yubico import yubico_aes
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_defs import SLOT
+from yubico.yubikey_emulator import YubiKeyEmulator, YubiKeyEmulatorError, \
+    EmulatedHIDDevice, emulate
+from yubico.yubikey_usb_hid import YubiKeyUSBHID, YubiKeyUSBHIDError
+from yubico.yubikey_neo_usb_hid import YubiKeyNEO_USBHID
+from yubico.yubikey_4_usb_hid import YubiKey4_USBHID
+from .pure_aes import use_pure_aes
+
+NIST_SECRET = b'h:303132333435363738393a3b3c3d3e3f40414243'
+OTP_KEY = b'h:000102030405060708090a0b0c0d0e0f'
+
+
+def hmac_config(variable=True, require_button=False):
+    cfg = YubiKeyConfig()
+    cfg.mode_challenge_response(NIST_SECRET, type='HMAC', variable=variable,
+                                require_button=require_button)
+    return cfg
+
+
+class TestYubiKeyEmulator(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(4, 3, 7), serial=1234567)
+        self.poller = yubikey_poll.FixedIntervalPoller(0)
+
+    def test_models(self):
+        """ Test that emulate() picks the class matching the version """
+        self.assertTrue(isinstance(emulate(YubiKeyEmulator(version=(2, 2, 3))), YubiKeyUSBHID))
+        self.assertTrue(isinstance(emulate(YubiKeyEmulator(version=(3, 4, 0))), YubiKeyNEO_USBHID))
+        YK = emulate(self.emulator)
+        self.assertTrue(isinstance(YK, YubiKey4_USBHID))
+        self.assertEqual(YK.version(), '4.3.7')
+
+    def test_hid_device_parameter(self):
+        """ Test plugging the emulator in through hid_device """
+        YK = YubiKey4_USBHID(hid_device=EmulatedHIDDevice(self.emulator))
+        self.assertEqual(YK.serial(), 1234567)
+        self.assertTrue(YK.capabilities.have_capability(yubico.yubikey_defs.YK4_CAPA.CCID))
+
+    def test_hmac_nist(self):
+        """ Test HMAC-SHA1 challenge-response with the NIST PUB 198 A.2 test vector """
+        self.emulator.load_config(2, hmac_config())
+        YK = emulate(self.emulator)
+        response = YK.challenge_response(b'Sample #2', slot=2)
+        self.assertEqual(binascii.hexlify(response), b'0922d3405faa3d194f82a45830737d5cc6c75d24')
+
+    def test_hmac_fixed(self):
+        """ Test fixed length HMAC-SHA1, of the challenge NULL padded to 64 bytes """
+        self.emulator.load_config(1, hmac_config(variable=False))
+        YK = emulate(self.emulator)
+        response = YK.challenge_response(b'Sample #2', slot=1, variable=False)
+        self.assertEqual(binascii.hexlify(response), b'0c450b09ea4e019944001518b927091ceab185be')
+
+    def test_otp(self):
+        """ Test Yubico OTP challenge-response """
+        use_pure_aes(self)
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(OTP_KEY, type='OTP')
+        self.emulator.load_config(1, cfg)
+        YK = emulate(self.emulator)
+        response = YK.challenge_response(b'abcdef', mode='OTP', slot=1)
+        ticket = yubico_aes.AES128(binascii.unhexlify(OTP_KEY[2:])).decrypt_block(response)
+        self.assertEqual(ticket[:6], b'abcdef')
+        self.assertTrue(yubico_util.validate_crc16(ticket))
+
+    def test_no_config(self):
+        """ Test that an unconfigured slot never responds """
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.05))
+        self.assertRaises(YubiKeyTimeout, YK.challenge_response, b'test', slot=1)
+
+    def test_write_config(self):
+        """ Test configuration writes, pgm_seq and the access code """
+        YK = emulate(self.emulator, poller=self.poller)
+        cfg = YK.init_config()
+        cfg.mode_challenge_response(NIST_SECRET)
+        cfg.access_key(b'h:010203040506')
+        YK.write_config(cfg, slot=2)
+        self.assertEqual(YK.status().pgm_seq, 1)
+        self.assertEqual(YK.status().valid_configs(), [2])
+        self.assertEqual(self.emulator.configs[2]['acc_code'], b'\x01\x02\x03\x04\x05\x06')
+
+        cfg = YK.init_config()
+        cfg.mode_challenge_response(NIST_SECRET)
+        self.assertRaises(YubiKeyUSBHIDError, YK.write_config, cfg, slot=2)
+
+        cfg.unlock_key(b'h:010203040506')
+        YK.write_config(cfg, slot=2)
+        self.assertEqual(YK.status().pgm_seq, 2)
+
+    def test_swap_and_zap(self):
+        """ Test swapping and deleting configurations """
+        self.emulator.load_config(1, hmac_config())
+        YK = emulate(self.emulator, poller=self.poller)
+        YK.write_config(YK.init_config(swap=True))
+        self.assertEqual(YK.status().valid_configs(), [2])
+        YK.write_config(YK.init_config(zap=True), slot=2)
+        self.assertEqual(YK.status().valid_configs(), [])
+        self.assertEqual(YK.status().pgm_seq, 0)
+
+    def test_latency(self):
+        """ Test that command latency is seen by the host """
+        self.emulator.latency = {SLOT.DEVICE_SERIAL: 0.02}
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.001))
+        reads = self.emulator.reads
+        self.assertEqual(YK.serial(), 1234567)
+        self.assertTrue(self.emulator.reads - reads > 5)
+
+    def test_button(self):
+        """ Test a challenge requiring a button press """
+        self.emulator.load_config(2, hmac_config(require_button=True))
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.01))
+        self.assertRaises(YubiKeyTimeout, YK.challenge_response, b'Sample #2', slot=2, may_block=False)
+        self.emulator.touch_after = 0.05
+        response = YK.challenge_response(b'Sample #2', slot=2, may_block=True)
+        self.assertEqual(binascii.hexlify(response), b'0922d3405faa3d194f82a45830737d5cc6c75d24')
+
+    def test_strict(self):
+        """ Test that writing while SLOT_WRITE_FLAG is set is caught in strict mode """
+        YK = emulate(self.emulator)
+        self.emulator.write_latency = 10
+        self.emulator.strict = True
+        device = YK._device
+        device._raw_write(b'\x00' * 7 + b'\x80')
+        self.assertRaises(YubiKeyEmulatorError, device._raw_write, b'\x00' * 7 + b'\x81')
+        self.assertEqual(self.emulator.overruns, 1)
+
+if __name__ == '__main__':
+    unittest.main()
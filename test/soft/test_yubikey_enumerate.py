@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import yubico
+from yubico import yubikey
+from yubico.yubikey_base import YubiKeyVersionError
+from yubico.yubikey_4_usb_hid import YubiKey4_USBHID
+from .fakes import FakeUSBDevice, FakeHIDDevice
+
+
+class TestEnumerateKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.devices = [FakeUSBDevice(address, (2, 2, 3), pid=0x0010) for address in range(4)]
+        mock.patch.object(yubikey, 'find_usb_devices', side_effect=lambda: list(self.devices)).start()
+        mock.patch.object(yubikey, 'YubiKeyHIDDevice', FakeHIDDevice).start()
+        mock.patch.object(yubikey.YubiKeyUSBHID, 'serial',
+                          lambda self, may_block=True: 1000 + self._device.usb_device.dev.address).start()
+        FakeHIDDevice.opened = 0
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def test_lazy(self):
+        """ Test that enumeration walks the bus once and opens nothing """
+        infos = list(yubico.enumerate_keys())
+        self.assertEqual(len(infos), 4)
+        self.assertEqual(yubikey.find_usb_devices.call_count, 1)
+        self.assertEqual(FakeHIDDevice.opened, 0)
+        self.assertEqual(infos[2].pid, 0x0010)
+        self.assertEqual(infos[2].serial(), 1002)
+        self.assertEqual(infos[2].version(), '2.2.3')
+        self.assertEqual(FakeHIDDevice.opened, 1)
+
+    def test_workers(self):
+        """ Test probing all keys in parallel """
+        infos = list(yubico.enumerate_keys(workers=3))
+        self.assertEqual(FakeHIDDevice.opened, 4)
+        self.assertEqual([info.serial() for info in infos], [1000, 1001, 1002, 1003])
+        self.assertEqual(FakeHIDDevice.opened, 4)
+
+    def test_without_futures(self):
+        """ Test probing all keys one after the other without concurrent.futures """
+        mock.patch.object(yubikey, 'futures', None).start()
+        infos = yubico.enumerate_keys(workers=3)
+        self.assertEqual(next(infos).serial(), 1000)
+        self.assertEqual(FakeHIDDevice.opened, 4)
+        self.assertEqual([info.serial() for info in infos], [1001, 1002, 1003])
+
+    def test_serial_unavailable(self):
+        """ Test that keys not revealing their serial give None """
+        def no_serial(self, may_block=True):
+            raise YubiKeyVersionError('Serial number unsupported')
+        mock.patch.object(yubikey.YubiKeyUSBHID, 'serial', no_serial).start()
+        info = next(yubico.enumerate_keys(workers=1))
+        self.assertEqual(info.serial(), None)
+
+    def test_key_class(self):
+        """ Test the model selection by version """
+        self.assertEqual(yubikey.key_class((4, 3, 1)), YubiKey4_USBHID)
+        self.assertEqual(yubikey.key_class((2, 1, 5)), yubikey.YubiKeyNEO_USBHID)
+        self.assertEqual(yubikey.key_class((2, 2, 3)), yubikey.YubiKeyUSBHID)
+
+if __name__ == '__main__':
+    unittest.main()
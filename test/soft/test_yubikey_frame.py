@@ -3,6 +3,7 @@
 from yubico import *
 from yubico.yubikey_frame import *
 import yubico.yubico_exception
+import yubico.yubico_util
 import unittest
 import struct
 import re
@@ -42,6 +43,42 @@ class YubiKeyTests(unittest.TestCase):
                            b'\x00\x00\x00\x01\x02\x03\x00\x85',
                            b'\x002\x01s\x00\x00\x00\x89'])
 
+  def test_feature_reports_bytes(self):
+    """ Test that the reports are bytes, not views of the frame's buffer """
+    frame = YubiKeyFrame(command=0x38, payload=b'\x01' * 64)
+    res = frame.to_feature_reports()
+    self.assertTrue(all(isinstance(report, bytes) for report in res))
+    self.assertEqual(b''.join(report[:7] for report in res), frame.to_string())
+    self.assertEqual([yubico.yubico_util.ord_byte(report[7]) for report in res], list(range(0x80, 0x8a)))
+    self.assertTrue(isinstance(frame.to_feature_reports(debug=True)[0][0], bytes))
+
+  def test_feature_reports_cached(self):
+    """ Test that payload-less frames share their encoding """
+    res1 = YubiKeyFrame(command=0x10)._feature_reports()
+    res2 = YubiKeyFrame(command=0x10)._feature_reports()
+    self.assertEqual([report.tobytes() for report in res1],
+                     [b'\x00\x00\x00\x00\x00\x00\x00\x80',
+                      b'\x00\x10\x6b\x5b\x00\x00\x00\x89'])
+    self.assertTrue(res1[0] is res2[0])
+    self.assertTrue(res1[0].readonly)
+
+  def test_feature_reports_one_buffer(self):
+    """ Test that the reports written are read-only views of one encoding """
+    frame = YubiKeyFrame(command=0x38, payload=b'\x01' * 64)
+    res = frame._feature_reports()
+    self.assertEqual(len(res), 10)
+    self.assertTrue(all(report.readonly for report in res))
+    self.assertEqual([report.tobytes() for report in res], frame.to_feature_reports())
+    self.assertTrue(frame._feature_reports()[0] is res[0])
+
+  def test_feature_reports_debug(self):
+    """ Test annotation of configuration frames """
+    res = YubiKeyFrame(command=0x01, payload=b'\x01' * 64).to_feature_reports(debug=True)
+    self.assertEqual([annotation for (_, annotation) in res][:3], ['FFFFFFF', 'FFFFFFF', 'FFUUUUU'])
+    self.assertEqual(res[-1][1], ' Scr')
+    res = YubiKeyFrame(command=0x38, payload=b'\x01' * 64).to_feature_reports(debug=True)
+    self.assertEqual(set(annotation for (_, annotation) in res), set(['']))
+
   def test_bad_payload(self):
     """ Test that we get an exception for four bytes payload """
     self.assertRaises(yubico_exception.InputError, YubiKeyFrame, command=0x32, payload=b'test')
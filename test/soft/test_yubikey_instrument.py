@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import unittest
+
+from yubico import yubikey_poll
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_defs import SLOT
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+from yubico.yubikey_instrument import YubiKeyInstrument, CountingInstrument, \
+    PrometheusInstrument, Counter, Histogram, command_name
+from yubico.yubikey_usb_hid import YubiKeyUSBHIDError
+
+
+class RecordingInstrument(YubiKeyInstrument):
+    """ Records the calls made """
+
+    def __init__(self):
+        self.calls = []
+
+    def report_read(self, device, start, elapsed, data):
+        self.calls.append(('read', len(data)))
+
+    def report_write(self, device, start, elapsed, data):
+        self.calls.append(('write', len(data)))
+
+    def wait(self, device, command, start, elapsed, polls):
+        self.calls.append(('wait', command, polls))
+
+    def crc_failure(self, device, command):
+        self.calls.append(('crc', command))
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.emulator.load_config(2, cfg)
+        self.poller = yubikey_poll.FixedIntervalPoller(0)
+
+    def test_transfers(self):
+        """ Test that every feature report transferred is reported """
+        instrument = RecordingInstrument()
+        YK = emulate(self.emulator, poller=self.poller, instrument=instrument)
+        reads, writes = self.emulator.reads, self.emulator.writes
+        del instrument.calls[:]
+        YK.challenge_response(b'Sample #2', slot=2)
+        calls = instrument.calls
+        self.assertEqual(len([c for c in calls if c[0] == 'read']), self.emulator.reads - reads)
+        self.assertEqual(len([c for c in calls if c[0] == 'write']), self.emulator.writes - writes)
+        self.assertTrue(('wait', SLOT.CHAL_HMAC2, 1) in calls)
+
+    def test_counting(self):
+        """ Test CountingInstrument """
+        counts = CountingInstrument()
+        YK = emulate(self.emulator, poller=self.poller, instrument=counts)
+        counts.reset()
+        YK.serial()
+        self.assertEqual(counts.reads, counts.polls)   # the response fits in its first report
+        self.assertTrue(counts.writes > 1)
+        self.assertTrue(counts.waits > 1)
+        self.assertEqual(counts.timeouts, 0)
+        self.assertEqual(counts.as_dict()['writes'], counts.writes)
+
+    def test_timeout(self):
+        """ Test that timeouts are reported """
+        counts = CountingInstrument()
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.01), instrument=counts)
+        # no command is pending, so no response will ever come
+        self.assertRaises(YubiKeyTimeout, YK._device._waitfor, 'and', 0x40, False, 0.05, SLOT.CHAL_HMAC2)
+        self.assertEqual(counts.timeouts, 1)
+
+    def test_crc_failure(self):
+        """ Test that CRC failures are reported """
+        instrument = RecordingInstrument()
+        YK = emulate(self.emulator, poller=self.poller, instrument=instrument)
+        YK._device._command = SLOT.CHAL_HMAC2
+        report = b'\x00' * 7 + b'\x40'
+        self.assertRaises(YubiKeyUSBHIDError, YK._device._read_pending, report, 6)
+        self.assertEqual(instrument.calls[-1], ('crc', SLOT.CHAL_HMAC2))
+
+    def test_prometheus(self):
+        """ Test PrometheusInstrument with the built-in metrics """
+        try:
+            import prometheus_client
+            return
+        except ImportError:
+            pass
+        instrument = PrometheusInstrument()
+        YK = emulate(self.emulator, poller=self.poller, instrument=instrument)
+        YK.challenge_response(b'Sample #2', slot=2)
+        samples = instrument.wait_seconds.samples()
+        self.assertTrue(('yubikey_wait_seconds_count', {'command': 'CHAL_HMAC2'}, 1) in samples)
+        reads = [s for s in instrument.reports.samples() if s[1] == {'direction': 'read'}]
+        self.assertEqual(reads, [('yubikey_reports_total', {'direction': 'read'}, self.emulator.reads)])
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        """ Test histogram buckets are cumulative """
+        h = Histogram('h', 'doc', ['x'], buckets=[1, 2])
+        for value in (0.5, 1.5, 1.5, 3):
+            h.labels(x='a').observe(value)
+        self.assertEqual(h.samples(), [
+            ('h_bucket', {'x': 'a', 'le': '1.0'}, 1),
+            ('h_bucket', {'x': 'a', 'le': '2.0'}, 3),
+            ('h_bucket', {'x': 'a', 'le': '+Inf'}, 4),
+            ('h_count', {'x': 'a'}, 4),
+            ('h_sum', {'x': 'a'}, 6.5),
+            ])
+
+    def test_counter(self):
+        """ Test labelled counters """
+        c = Counter('c', 'doc', ['x'])
+        c.labels(x='a').inc()
+        c.labels(x='a').inc(2)
+        c.labels(x='b').inc()
+        self.assertEqual(c.samples(), [('c_total', {'x': 'a'}, 3), ('c_total', {'x': 'b'}, 1)])
+
+    def test_command_name(self):
+        """ Test command names """
+        self.assertEqual(command_name(SLOT.CHAL_HMAC2), 'CHAL_HMAC2')
+        self.assertEqual(command_name(None), 'none')
+        self.assertEqual(command_name(0x7f), '0x7f')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import itertools
+import unittest
+
+from yubico.yubikey_defs import SLOT, SLOT_WRITE_FLAG, RESP_PENDING_FLAG
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_usb_hid import YubiKeyHIDDevice
+from yubico import yubikey_poll
+from yubico import yubico_util
+
+
+def first(iterator, num):
+    return list(itertools.islice(iterator, num))
+
+
+class ScriptedHIDDevice(YubiKeyHIDDevice):
+    """ YubiKeyHIDDevice returning a fixed sequence of status flags. """
+
+    def __init__(self, flags, poller):
+        self.flags = list(flags)
+        self.reads = 0
+        super(ScriptedHIDDevice, self).__init__(poller=poller)
+
+    def _open(self, skip=0):
+        return True
+
+    def _read(self):
+        self.reads += 1
+        flags = self.flags.pop(0) if self.flags else 0
+        return b'\x00\x03\x04\x05\x01\x00\x00' + yubico_util.chr_byte(flags)
+
+
+class TestPollers(unittest.TestCase):
+
+    def test_backoff(self):
+        """ Test the classic exponential backoff """
+        poller = yubikey_poll.BackoffPoller()
+        self.assertEqual(first(poller.intervals(), 8),
+                         [0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.5, 0.5])
+
+    def test_spin_backoff(self):
+        """ Test that spinning reads at once before backing off """
+        poller = yubikey_poll.SpinBackoffPoller(spins=2, spin_interval=0.001, initial=0.002)
+        self.assertEqual(first(poller.intervals(), 5), [0, 0.001, 0.001, 0.002, 0.004])
+
+    def test_fixed_interval(self):
+        """ Test fixed interval polling """
+        poller = yubikey_poll.FixedIntervalPoller(0.005)
+        self.assertEqual(first(poller.intervals(SLOT.CHAL_HMAC1), 3), [0.005] * 3)
+
+    def test_deadline(self):
+        """ Test sleeping until the expected deadline of a command """
+        poller = yubikey_poll.DeadlinePoller({SLOT.CHAL_HMAC2: 0.015}, interval=0.002)
+        self.assertEqual(first(poller.intervals(SLOT.CHAL_HMAC2), 3), [0.015, 0.002, 0.004])
+        self.assertEqual(first(poller.intervals(SLOT.DEVICE_SERIAL), 2), [0.0, 0.002])
+
+    def test_adaptive_learns(self):
+        """ Test that the adaptive poller learns latency per command """
+        poller = yubikey_poll.AdaptivePoller(alpha=0.5, fraction=0.5, spins=1, spin_interval=0.001)
+        self.assertEqual(first(poller.intervals(SLOT.CHAL_HMAC1), 2), [0, 0.001])
+        poller.observe(SLOT.CHAL_HMAC1, 0.020)
+        poller.observe(SLOT.CHAL_HMAC1, 0.010)
+        self.assertAlmostEqual(poller.latency(SLOT.CHAL_HMAC1), 0.015)
+        self.assertIsNone(poller.latency(SLOT.CHAL_HMAC2))
+        intervals = first(poller.intervals(SLOT.CHAL_HMAC1), 2)
+        self.assertAlmostEqual(intervals[0], 0.0075)
+        self.assertEqual(intervals[1], 0.001)
+
+
+class TestWaitfor(unittest.TestCase):
+
+    def test_waitfor_set(self):
+        """ Test waiting for a flag to be set, with no sleep before the first read """
+        poller = yubikey_poll.AdaptivePoller(spin_interval=0)
+        dev = ScriptedHIDDevice([0, 0, 0, 0, RESP_PENDING_FLAG], poller)
+        data = dev._waitfor_set(RESP_PENDING_FLAG, command=SLOT.CHAL_HMAC1)
+        self.assertEqual(yubico_util.ord_byte(data[7]), RESP_PENDING_FLAG)
+        self.assertEqual(dev.reads, 1 + 4)  # status() in __init__, then four polls
+        self.assertIsNotNone(poller.latency(SLOT.CHAL_HMAC1))
+
+    def test_waitfor_clear(self):
+        """ Test waiting for a flag to be cleared """
+        dev = ScriptedHIDDevice([0, SLOT_WRITE_FLAG, SLOT_WRITE_FLAG, 0], yubikey_poll.FixedIntervalPoller(0))
+        dev._waitfor_clear(SLOT_WRITE_FLAG)
+        self.assertEqual(dev.reads, 4)
+
+    def test_waitfor_timeout(self):
+        """ Test that a flag never being set times out """
+        dev = ScriptedHIDDevice([], yubikey_poll.FixedIntervalPoller(0.001))
+        self.assertRaises(YubiKeyTimeout, dev._waitfor, 'and', RESP_PENDING_FLAG, False, timeout=0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import threading
+import unittest
+
+from yubico import yubikey_poll
+from yubico import yubikey_pool
+from yubico.yubico_exception import InputError
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_pool import YubiKeyPool
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+from yubico.yubikey_instrument import CountingInstrument
+
+
+def emulated_key(**kwargs):
+    emulator = YubiKeyEmulator(version=(2, 2, 3), **kwargs)
+    cfg = YubiKeyConfig()
+    cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+    emulator.load_config(1, cfg)
+    return emulate(emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+
+
+class FlakyKey(object):
+    """ Key answering challenges with a fixed value, or timing out """
+
+    def __init__(self, name, fail=False, error=None):
+        self.name = name
+        self.fail = fail
+        self.error = error
+        self.calls = 0
+
+    def challenge_response(self, challenge, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        if self.fail:
+            raise YubiKeyTimeout('Timed out waiting for YubiKey to set status 0x40')
+        return self.name
+
+
+class TestThreads(unittest.TestCase):
+
+    def test_device_lock(self):
+        """ Test that threads sharing one YubiKey don't mix up their feature reports """
+        YK = emulated_key(strict=True)
+        expected = dict((i, YK.challenge_response(b'thread %i' % i)) for i in range(8))
+        errors = []
+        def worker(i):
+            for _ in range(10):
+                if YK.challenge_response(b'thread %i' % i) != expected[i]:
+                    errors.append(i)
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+class TestYubiKeyPool(unittest.TestCase):
+
+    def test_spread(self):
+        """ Test that sequential calls are spread over all YubiKeys """
+        keys = [FlakyKey(i) for i in range(3)]
+        pool = YubiKeyPool(keys)
+        self.assertEqual(sorted(pool.challenge_response(b'x') for _ in range(6)), [0, 0, 1, 1, 2, 2])
+
+    def test_failover(self):
+        """ Test that a timing out YubiKey is skipped """
+        keys = [FlakyKey('bad', fail=True), FlakyKey('good')]
+        counts = CountingInstrument()
+        pool = YubiKeyPool(keys, cooldown=60, instrument=counts)
+        self.assertEqual([pool.challenge_response(b'x') for _ in range(4)], ['good'] * 4)
+        self.assertEqual(keys[0].calls, 1)
+        self.assertEqual(counts.retries, 1)
+
+    def test_all_failing(self):
+        """ Test that the timeout is raised when no YubiKey responds """
+        pool = YubiKeyPool([FlakyKey(i, fail=True) for i in range(2)])
+        self.assertRaises(YubiKeyTimeout, pool.challenge_response, b'x')
+
+    def test_other_errors(self):
+        """ Test that other errors are raised without failing over, and release the YubiKey """
+        keys = [FlakyKey(i, error=InputError('challenge too long')) for i in range(2)]
+        pool = YubiKeyPool(keys)
+        for _ in range(3):
+            self.assertRaises(InputError, pool.challenge_response, b'x' * 65)
+        self.assertEqual([member.busy for member in pool._members], [0, 0])
+        self.assertEqual([member.failures for member in pool._members], [0, 0])
+        self.assertEqual(sum(key.calls for key in keys), 3)
+
+    def test_many(self):
+        """ Test a batch of challenges over real (fake) devices """
+        keys = [emulated_key() for _ in range(3)]
+        pool = YubiKeyPool(keys)
+        challenges = [b'challenge %i' % i for i in range(12)]
+        self.assertEqual(pool.challenge_response_many(challenges),
+                         [keys[0].challenge_response(challenge) for challenge in challenges])
+
+    def test_many_serial(self):
+        """ Test a batch of challenges without concurrent.futures """
+        keys = [FlakyKey(i) for i in range(2)]
+        pool = YubiKeyPool(keys)
+        futures = yubikey_pool.futures
+        yubikey_pool.futures = None
+        try:
+            self.assertEqual(sorted(pool.challenge_response_many([b'x'] * 4)), [0, 0, 1, 1])
+        finally:
+            yubikey_pool.futures = futures
+
+if __name__ == '__main__':
+    unittest.main()
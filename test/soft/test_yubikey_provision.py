@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from yubico import yubikey_poll
+from yubico import yubikey_provision
+from yubico.yubikey_base import YubiKeyTimeout
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+from yubico.yubikey_provision import YubiKeyProvisioner, ProvisioningJob, ProvisioningJournal, \
+    read_jobs, job_line
+
+
+def hmac_config(secret):
+    cfg = YubiKeyConfig()
+    cfg.mode_challenge_response(b'h:' + secret)
+    return cfg
+
+
+class TimingOutKey(object):
+    """ Key timing out on its first `timeouts' writes, possibly after writing """
+
+    def __init__(self, key, timeouts=1, written=False):
+        self.key = key
+        self.timeouts = timeouts
+        self.written = written
+        self.writes = 0
+
+    def status(self):
+        return self.key.status()
+
+    def write_config(self, cfg, slot=1):
+        self.writes += 1
+        if self.writes <= self.timeouts:
+            if self.written:
+                self.key.write_config(cfg, slot=slot)
+            raise YubiKeyTimeout('Timed out waiting for YubiKey to clear status 0x80')
+        return self.key.write_config(cfg, slot=slot)
+
+
+class UnpluggedKey(object):
+    """ Key gone from the USB bus """
+
+    def status(self):
+        raise IOError('No such device')
+
+    def write_config(self, cfg, slot=1):
+        raise IOError('No such device')
+
+
+class TestProvisioner(unittest.TestCase):
+
+    def setUp(self):
+        self.emulators = dict((serial, YubiKeyEmulator(version=(2, 2, 3), serial=serial))
+                              for serial in (1001, 1002, 1003))
+        self.keys = dict((serial, emulate(emulator, poller=yubikey_poll.FixedIntervalPoller(0)))
+                         for (serial, emulator) in self.emulators.items())
+        self.tmpdir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.tmpdir, 'journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def jobs(self, count=2):
+        for serial in sorted(self.emulators):
+            for slot in range(1, count + 1):
+                yield ProvisioningJob(serial, hmac_config(b'%02x' % slot * 20), slot=slot)
+
+    def test_run(self):
+        """ Test programming all attached YubiKeys """
+        jobs = list(self.jobs()) + [ProvisioningJob(9999, hmac_config(b'00' * 20))]
+        results = list(YubiKeyProvisioner(self.keys).run(iter(jobs)))
+        self.assertEqual(sorted(r.result for r in results), ['absent'] + ['ok'] * 6)
+        for emulator in self.emulators.values():
+            self.assertEqual(emulator.pgm_seq, 2)
+            self.assertEqual(emulator.configs[2]['key'], b'\x02' * 16)
+
+    def test_resume(self):
+        """ Test that a resumed run skips the jobs done """
+        jobs = list(self.jobs())
+        with ProvisioningJournal(self.journal_path) as journal:
+            results = list(YubiKeyProvisioner(self.keys, journal=journal).run(jobs[:3]))
+            self.assertEqual([r.result for r in results], ['ok'] * 3)
+        with open(self.journal_path, 'a') as f:
+            f.write('{"serial": 10')    # interrupted while writing
+        with ProvisioningJournal(self.journal_path) as journal:
+            results = list(YubiKeyProvisioner(self.keys, journal=journal).run(jobs))
+        self.assertEqual(sorted(r.result for r in results), ['ok'] * 3 + ['skipped'] * 3)
+        for emulator in self.emulators.values():
+            self.assertEqual(emulator.pgm_seq, 2)
+        with ProvisioningJournal(self.journal_path) as journal:
+            self.assertEqual(len([job for job in jobs if journal.done(job.serial, job.slot)]), 6)
+
+    def test_retry(self):
+        """ Test that timeouts are retried """
+        self.keys[1001] = TimingOutKey(self.keys[1001])
+        results = list(YubiKeyProvisioner(self.keys).run(self.jobs(1)))
+        result = [r for r in results if r.job.serial == 1001][0]
+        self.assertEqual((result.result, result.attempts, result.pgm_seq), ('ok', 2, 1))
+
+    def test_written_despite_timeout(self):
+        """ Test that a write timing out after programming the YubiKey isn't repeated """
+        self.keys[1001] = TimingOutKey(self.keys[1001], written=True)
+        results = list(YubiKeyProvisioner(self.keys).run(self.jobs(1)))
+        result = [r for r in results if r.job.serial == 1001][0]
+        self.assertEqual((result.result, result.attempts), ('ok', 1))
+        self.assertEqual(self.emulators[1001].pgm_seq, 1)
+
+    def test_zapped_despite_timeout(self):
+        """ Test that pgm_seq dropping to 0 after a timed out zap counts as written """
+        self.emulators[1001].load_config(1, hmac_config(b'01' * 20))
+        self.keys[1001] = TimingOutKey(self.keys[1001], written=True)
+        job = ProvisioningJob(1001, YubiKeyConfig(zap=True), slot=1)
+        results = list(YubiKeyProvisioner(self.keys).run([job]))
+        self.assertEqual((results[0].result, results[0].attempts, results[0].pgm_seq), ('ok', 1, 0))
+        self.assertEqual(self.emulators[1001].configs[1], None)
+
+    def test_failure(self):
+        """ Test that jobs fail after the retries """
+        self.keys[1001] = TimingOutKey(self.keys[1001], timeouts=10)
+        with ProvisioningJournal(self.journal_path, sync=False) as journal:
+            results = list(YubiKeyProvisioner(self.keys, journal=journal, retries=2).run(self.jobs(1)))
+            self.assertFalse(journal.done(1001, 1))
+            self.assertTrue(journal.done(1002, 1))
+        result = [r for r in results if r.job.serial == 1001][0]
+        self.assertEqual((result.result, result.attempts), ('failed', 3))
+        self.assertTrue(isinstance(result.error, YubiKeyTimeout))
+
+    def test_unplugged(self):
+        """ Test that a YubiKey failing to give its status fails its jobs only """
+        self.keys[1001] = UnpluggedKey()
+        with ProvisioningJournal(self.journal_path, sync=False) as journal:
+            results = list(YubiKeyProvisioner(self.keys, journal=journal).run(self.jobs(2)))
+            self.assertFalse(journal.done(1001, 1))
+            self.assertTrue(journal.done(1003, 2))
+        self.assertEqual(sorted(r.result for r in results), ['failed'] * 2 + ['ok'] * 4)
+        self.assertTrue(all(isinstance(r.error, IOError) for r in results if r.job.serial == 1001))
+
+    def test_without_futures(self):
+        """ Test running the jobs one at a time without concurrent.futures """
+        futures = yubikey_provision.futures
+        yubikey_provision.futures = None
+        try:
+            results = list(YubiKeyProvisioner(self.keys).run(self.jobs()))
+        finally:
+            yubikey_provision.futures = futures
+        self.assertEqual([(r.job.serial, r.job.slot, r.result) for r in results],
+                         [(serial, slot, 'ok') for serial in (1001, 1002, 1003) for slot in (1, 2)])
+
+    def test_job_file(self):
+        """ Test reading jobs from a file """
+        f = io.StringIO(u'# station 1\n' + u''.join(
+            job_line(job.serial, job.config, job.slot) for job in self.jobs()))
+        results = list(YubiKeyProvisioner(self.keys).run(read_jobs(f)))
+        self.assertEqual(sorted(r.result for r in results), ['ok'] * 6)
+        self.assertEqual(self.emulators[1003].configs[1]['key'], b'\x01' * 16)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from yubico import yubikey_session
+from yubico.yubikey_base import YubiKeyError
+from yubico.yubikey_usb_hid import YubiKeyUSBHID, YubiKeyUSBHIDError
+from yubico.yubikey_neo_usb_hid import YubiKeyNEO_USBHID
+from .fakes import FakeUSBDevice, FakeHIDDevice
+
+
+class TestYubiKeySession(unittest.TestCase):
+
+    def setUp(self):
+        self.devices = [FakeUSBDevice(4, (2, 2, 3)), FakeUSBDevice(5, (3, 4, 0))]
+        self.find = mock.patch.object(yubikey_session, 'find_usb_devices',
+                                      side_effect=lambda: list(self.devices))
+        self.find.start()
+        mock.patch.object(yubikey_session, 'YubiKeyHIDDevice', FakeHIDDevice).start()
+        FakeHIDDevice.opened = 0
+
+    def tearDown(self):
+        mock.patch.stopall()
+
+    def test_enumerate_once(self):
+        """ Test that keys are enumerated and opened only once """
+        session = yubikey_session.YubiKeySession()
+        self.assertEqual(len(session), 2)
+        first = session.key(0)
+        self.assertTrue(isinstance(first, YubiKeyUSBHID))
+        self.assertTrue(isinstance(session.key(1), YubiKeyNEO_USBHID))
+        self.assertTrue(session.key(0) is first)
+        self.assertEqual(session.status(1).ykver(), (3, 4, 0))
+        self.assertEqual(yubikey_session.find_usb_devices.call_count, 1)
+        self.assertEqual(FakeHIDDevice.opened, 2)
+
+    def test_refresh_keeps_open_keys(self):
+        """ Test that re-enumeration keeps keys still attached open """
+        session = yubikey_session.YubiKeySession()
+        second = session.key(1)
+        del self.devices[0]
+        session.refresh()
+        self.assertTrue(session.key(0) is second)
+        self.assertRaises(YubiKeyError, session.key, 1)
+
+    def test_invalidate_one(self):
+        """ Test that invalidating one key keeps the others, at their new index """
+        session = yubikey_session.YubiKeySession()
+        first = session.key(0)
+        second = session.key(1)
+        session.invalidate(0)
+        self.assertEqual(len(session.refresh()), 2)
+        self.assertTrue(session.key(1) is second)
+        self.assertFalse(session.key(0) is first)
+        # the first key is unplugged, and the second moves to index 0
+        session.invalidate(0)
+        del self.devices[0]
+        self.assertTrue(session.key(0) is second)
+        self.assertRaises(YubiKeyError, session.key, 1)
+
+    def test_status_unplugged(self):
+        """ Test that a YubiKey failing to give its status is dropped """
+        session = yubikey_session.YubiKeySession()
+        first = session.key(0)
+        second = session.key(1)
+        self.assertTrue(session.status(0) is first.last_status())
+        del self.devices[0]
+        with mock.patch.object(first._device, '_read', side_effect=IOError('No such device')):
+            self.assertRaises(IOError, session.status, 0, refresh=True)
+        self.assertTrue(session.key(0) is second)
+        self.assertEqual(session.status(0).ykver(), (3, 4, 0))
+        self.assertEqual(len(session), 1)
+
+    def test_run_reopens_on_error(self):
+        """ Test that a device error leads to a single retry on a fresh handle """
+        session = yubikey_session.YubiKeySession()
+        calls = []
+        def func(key):
+            calls.append(key)
+            if len(calls) == 1:
+                raise YubiKeyUSBHIDError('Failed talking to USB HID YubiKey')
+            return key.version()
+        self.assertEqual(session.run(func), '2.2.3')
+        self.assertFalse(calls[0] is calls[1])
+        self.assertEqual(FakeHIDDevice.opened, 2)
+
+if __name__ == '__main__':
+    unittest.main()
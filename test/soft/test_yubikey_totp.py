@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from yubico import yubico_exception
+from yubico import yubikey_poll
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+from yubico.yubikey_totp import TOTPAgent, TOTPAgentServer, TOTPAgentError, request_code, totp_codes
+
+
+class TestTOTPAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        # the RFC 6238 test key
+        cfg.mode_challenge_response(b'h:3132333435363738393031323334353637383930')
+        self.emulator.load_config(2, cfg)
+        self.now = 59
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+        self.agent = TOTPAgent(YK, slot=2, clock=lambda: self.now)
+
+    def test_code(self):
+        """ Test the RFC 6238 test vectors, and that codes are cached """
+        self.assertEqual(self.agent.code(digits=8), '94287082')
+        writes = self.emulator.writes
+        self.assertEqual(self.agent.code(digits=8), '94287082')
+        self.assertEqual(self.agent.code(digits=6), '287082')
+        self.assertEqual(self.emulator.writes, writes)
+        self.assertEqual(self.agent.code(digits=8, at=1111111109), '07081804')
+        self.assertEqual(self.agent.code(digits=8, at=20000000000), '65353130')
+
+    def test_precompute(self):
+        """ Test that the next time step is computed ahead, and old ones forgotten """
+        self.agent.code()
+        self.now = 89.5
+        self.agent.precompute()
+        self.assertEqual(sorted(self.agent._responses), [(2, 3)])
+        writes = self.emulator.writes
+        self.now = 90
+        self.agent.code()
+        self.assertEqual(self.emulator.writes, writes)
+        self.agent.precompute()
+        self.assertEqual(sorted(self.agent._responses), [(2, 3), (2, 4)])
+
+    def test_cache_bounded(self):
+        """ Test that only the current and next time steps are cached """
+        self.agent.code(at=59 + 30)
+        self.agent.code(at=1111111109)
+        self.agent.code(at=1111111109, digits=8)
+        self.assertEqual(sorted(self.agent._responses), [(2, 2)])
+        self.assertEqual(sorted(self.agent._codes), [(2, 2, 6)])
+
+    def test_digits(self):
+        """ Test that only 6 or 8 digits are accepted """
+        for digits in (0, 7, 20, 6.0, True, '6'):
+            self.assertRaises(yubico_exception.InputError, self.agent.code, digits=digits)
+
+    def test_slots(self):
+        """ Test that only slots giving responses are precomputed """
+        for slot in (0, 3, 99, 1.0, True, 'x'):
+            self.assertRaises(yubico_exception.InputError, self.agent.code, slot=slot)
+        # slot 1 isn't configured
+        self.assertRaises(yubico_exception.YubicoError, self.agent.code, slot=1)
+        self.assertEqual(self.agent.slots, set())
+        self.agent.code()
+        self.assertEqual(self.agent.slots, set([2]))
+        self.agent.precompute()
+
+    def test_period(self):
+        """ Test that codes for another period are refused """
+        self.assertRaises(yubico_exception.InputError, self.agent.code, period=60)
+
+
+class TestTOTPCodes(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:3132333435363738393031323334353637383930')
+        self.emulator.load_config(2, cfg)
+        self.YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+
+    def test_codes(self):
+        """ Test codes for consecutive time steps """
+        self.assertEqual(list(totp_codes(self.YK, 59, 3, digits=8)),
+                         [(30, '94287082'), (60, '37359152'), (90, '26969429')])
+        # a time step ending in a zero byte
+        self.assertEqual(list(totp_codes(self.YK, 256 * 30 + 29, 1, digits=8)), [(7680, '90620188')])
+
+    def test_streaming(self):
+        """ Test that codes are generated as the responses arrive """
+        writes = self.emulator.writes
+        codes = totp_codes(self.YK, 59, 1000)
+        next(codes)
+        self.assertTrue(self.emulator.writes - writes < 20)
+
+
+class TestTOTPAgentServer(unittest.TestCase):
+
+    def setUp(self):
+        emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:3132333435363738393031323334353637383930')
+        emulator.load_config(2, cfg)
+        agent = TOTPAgent(emulate(emulator, poller=yubikey_poll.FixedIntervalPoller(0)), slot=2)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'agent.sock')
+        self.server = TOTPAgentServer(agent, self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.assertFalse(os.path.exists(self.path))
+        shutil.rmtree(self.tmpdir)
+
+    def test_request(self):
+        """ Test asking the agent for codes over the socket """
+        self.assertEqual(request_code(self.path, digits=8, at=1234567890), '89005924')
+        self.assertEqual(request_code(self.path, slot=2, digits=8, at=1234567890, period=30), '89005924')
+        self.assertEqual(len(request_code(self.path)), 6)
+
+    def test_error(self):
+        """ Test that errors are passed on to the client """
+        self.assertRaises(TOTPAgentError, request_code, self.path, slot=3)
+        self.assertRaises(TOTPAgentError, request_code, self.path, slot='x')
+        self.server.agent.precompute()
+        self.assertEqual(self.server.agent.slots, set())
+        self.assertRaises(TOTPAgentError, request_code, self.path, period=60)
+        for digits in (0, 20, 6.5, '6'):
+            try:
+                request_code(self.path, digits=digits)
+                self.fail('digits %r accepted' % (digits,))
+            except TOTPAgentError as e:
+                self.assertEqual(e.reason, 'bad request')
+        self.assertEqual(request_code(self.path, digits=8, at=59), '94287082')
+
+
+class TestTOTPAgentSocket(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'agent.sock')
+        self.agent = TOTPAgent(None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_not_a_socket(self):
+        """ Test that a file at the socket path is left alone """
+        with open(self.path, 'w') as f:
+            f.write('precious')
+        self.assertRaises(TOTPAgentError, TOTPAgentServer, self.agent, self.path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'precious')
+
+    def test_running_agent(self):
+        """ Test that the socket of a running agent is not taken over """
+        server = TOTPAgentServer(self.agent, self.path)
+        try:
+            self.assertRaises(TOTPAgentError, TOTPAgentServer, self.agent, self.path)
+            self.assertTrue(os.path.exists(self.path))
+        finally:
+            server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_socket(self):
+        """ Test that the socket left behind by a dead agent is replaced """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.close()
+        server = TOTPAgentServer(self.agent, self.path)
+        server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_close_replaced(self):
+        """ Test that closing doesn't remove a socket that replaced ours """
+        server = TOTPAgentServer(self.agent, self.path)
+        os.unlink(self.path)
+        with open(self.path, 'w') as f:
+            f.write('other')
+        server.server_close()
+        self.assertTrue(os.path.exists(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+import array
+import unittest
+
+from yubico import yubico_exception
+from yubico import yubikey_poll
+from yubico import yubikey_transport
+from yubico.yubikey_transport import ControlMsgTransport, CoreUSBTransport, \
+    YubiKeyTransport, open_transport, hidraw_paths
+from yubico.yubikey_emulator import YubiKeyEmulator
+from yubico.yubikey_usb_hid import YubiKeyHIDDevice
+
+
+class FakeCoreDevice(object):
+    """ Enough of a usb.core.Device to do control transfers """
+
+    def __init__(self, report):
+        self.report = report
+        self.written = []
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue, wIndex, data_or_wLength, timeout):
+        if bmRequestType & yubikey_transport._USB_ENDPOINT_IN:
+            data_or_wLength[:len(self.report)] = array.array('B', self.report)
+            return len(self.report)
+        self.written.append(bytes(data_or_wLength))
+        return len(data_or_wLength)
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_control_msg(self):
+        """ Test ControlMsgTransport against the emulator """
+        emulator = YubiKeyEmulator(version=(2, 2, 3))
+        transport = ControlMsgTransport(emulator)
+        report = transport.read_report()
+        self.assertTrue(isinstance(report, bytes))
+        self.assertEqual(len(report), 8)
+        self.assertEqual(report[1:4], b'\x02\x02\x03')
+
+    def test_device_transport(self):
+        """ Test YubiKeyHIDDevice using an open transport """
+        emulator = YubiKeyEmulator(version=(2, 2, 3))
+        device = YubiKeyHIDDevice(transport=ControlMsgTransport(emulator),
+                                  poller=yubikey_poll.FixedIntervalPoller(0))
+        self.assertEqual(device.status().ykver(), (2, 2, 3))
+        self.assertEqual(emulator.reads, 2)   # once when opened, once for status()
+
+    def test_core_read(self):
+        """ Test CoreUSBTransport reading into its buffer """
+        transport = YubiKeyTransport.__new__(CoreUSBTransport)
+        transport.dev = FakeCoreDevice(b'\x00\x02\x02\x03\x01\x00\x06\x00')
+        transport._buf = array.array('B', [0] * 8)
+        self.assertEqual(transport.read_report(), b'\x00\x02\x02\x03\x01\x00\x06\x00')
+        transport.dev.report = b'\x01\x02'
+        self.assertEqual(transport.read_report(), b'\x01\x02')
+        self.assertEqual(transport.write_report(b'\x00' * 7 + b'\x8f'), 8)
+        self.assertEqual(transport.dev.written, [b'\x00' * 7 + b'\x8f'])
+
+    def test_unknown_transport(self):
+        """ Test that unknown transports are refused """
+        self.assertRaises(yubico_exception.InputError, open_transport, object(), 'serial')
+
+    def test_no_transport(self):
+        """ Test that a device no transport can open fails """
+        self.assertRaises(yubikey_transport.YubiKeyTransportError, open_transport, object())
+
+    def test_hidraw_paths(self):
+        """ Test that devices without an address have no hidraw devices """
+        self.assertEqual(hidraw_paths(object()), [])
+
+    def test_ioctl_numbers(self):
+        """ Test the hidraw ioctl numbers against linux/hidraw.h """
+        self.assertEqual(yubikey_transport._HIDIOCSFEATURE, 0xc0094806)
+        self.assertEqual(yubikey_transport._HIDIOCGFEATURE, 0xc0094807)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+import logging
+import binascii
+import unittest
+
+from yubico import yubico_util
+from yubico import yubikey_frame
+from yubico import yubikey_poll
+from yubico.yubikey_defs import SLOT
+from yubico.yubikey_config import YubiKeyConfig
+from yubico.yubikey_base import YubiKeyTimeout, YubiKeyVersionError
+from yubico.yubikey_emulator import YubiKeyEmulator, emulate
+from yubico.yubikey_instrument import CountingInstrument
+from yubico.yubikey_usb_hid import YubiKeyUSBHIDError, YubiKeyUSBHIDStatus
+
+
+class TestChallengeResponseMany(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.emulator.load_config(2, cfg)
+        self.YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+
+    def test_many(self):
+        """ Test a batch of HMAC challenges """
+        challenges = [b'Sample #2', b'what do ya want for nothing?', b'\x01' * 63 + b'\x02']
+        reads = self.emulator.reads
+        responses = list(self.YK.challenge_response_many(iter(challenges), slot=2))
+        batch_reads = self.emulator.reads - reads
+        self.assertEqual(binascii.hexlify(responses[0]), b'0922d3405faa3d194f82a45830737d5cc6c75d24')
+        reads = self.emulator.reads
+        for (challenge, response) in zip(challenges, responses):
+            self.assertEqual(response, self.YK.challenge_response(challenge, slot=2))
+        # every exchange ends with the YubiKey seen idle, so single challenges
+        # skip the poll before their first report just like batched ones
+        self.assertEqual(self.emulator.reads - reads, batch_reads)
+
+    def test_many_lazy(self):
+        """ Test that responses are generated as challenges are consumed """
+        writes = self.emulator.writes
+        responses = self.YK.challenge_response_many([b'a', b'b'], slot=2)
+        self.assertEqual(self.emulator.writes, writes)
+        next(responses)
+        self.assertTrue(self.emulator.writes > writes)
+
+    def test_many_unsupported(self):
+        """ Test that old YubiKeys are refused before any challenge is sent """
+        YK = emulate(YubiKeyEmulator(version=(2, 1, 0)))
+        self.assertRaises(YubiKeyVersionError, YK.challenge_response_many, [b'a'])
+
+
+class TestReadResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.emulator.load_config(2, cfg)
+        self.counts = CountingInstrument()
+        self.YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0),
+                          instrument=self.counts)
+
+    def test_stops_early(self):
+        """ Test that only the reports holding the response and its CRC are read """
+        self.counts.reset()
+        response = self.YK.challenge_response(b'Sample #2', slot=2)
+        self.assertEqual(len(response), 20)
+        # 22 bytes in 4 reports, the first of which ends the wait for the response
+        self.assertEqual(self.counts.reads - self.counts.polls, 3)
+
+    def test_unknown_length(self):
+        """ Test reading a response until the sequence number wraps """
+        device = self.YK._device
+        device._write(yubikey_frame.YubiKeyFrame(command=SLOT.DEVICE_SERIAL))
+        response = device._read_response()
+        self.assertEqual(len(response), 7)
+        self.assertTrue(yubico_util.validate_crc16(response[:6]))
+
+    def test_crc_failure(self):
+        """ Test that a corrupted response is refused """
+        device = self.YK._device
+        self.assertRaises(YubiKeyUSBHIDError, device._read_pending, b'\x01' * 7 + b'\x40', 22)
+        self.assertEqual(self.counts.crc_failures, 1)
+
+
+class TestWriteScheduler(unittest.TestCase):
+
+    def setUp(self):
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.cfg = cfg
+
+    def test_no_sleep_when_idle(self):
+        """ Test that reports are written without sleeping while the YubiKey is idle """
+        emulator = YubiKeyEmulator(version=(2, 2, 3), strict=True)
+        counts = CountingInstrument()
+        YK = emulate(emulator, poller=yubikey_poll.BackoffPoller(), instrument=counts)
+        counts.reset()
+        YK._device._write(yubikey_frame.YubiKeyFrame(command=SLOT.CHAL_HMAC2, payload=b'\x01' * 64))
+        self.assertEqual(counts.writes, 10)
+        # the status is known before the first report, and read once before each of the others
+        self.assertEqual(counts.reads, 9)
+        self.assertEqual(counts.sleep_time, 0)
+
+    def test_conformance(self):
+        """ Test that a slow YubiKey is never written to while busy """
+        emulator = YubiKeyEmulator(version=(2, 2, 3), write_latency=0.002,
+                                   latency={SLOT.CONFIG2: 0.02, SLOT.CHAL_HMAC2: 0.01},
+                                   strict=True)
+        YK = emulate(emulator, poller=yubikey_poll.SpinBackoffPoller(), conformance=True)
+        YK.write_config(self.cfg, slot=2)
+        self.assertEqual(binascii.hexlify(YK.challenge_response(b'Sample #2', slot=2)),
+                         b'0922d3405faa3d194f82a45830737d5cc6c75d24')
+        responses = list(YK.challenge_response_many([b'Sample #2'] * 3, slot=2))
+        self.assertEqual(len(set(responses)), 1)
+        self.assertEqual(YK.serial(), emulator.serial)
+        self.assertEqual(emulator.overruns, 0)
+
+    def test_conformance_failure(self):
+        """ Test that conformance mode catches writes scheduled while the YubiKey is busy """
+        emulator = YubiKeyEmulator(version=(2, 2, 3), write_latency=10)
+        YK = emulate(emulator, poller=yubikey_poll.FixedIntervalPoller(0), conformance=True)
+        device = YK._device
+        device._raw_write(b'\x00' * 7 + b'\x80')
+        device._writes.clear = True
+        self.assertRaises(YubiKeyUSBHIDError, device._writes.writable)
+        self.assertEqual(emulator.overruns, 0)
+
+
+class TestTouchWait(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3), touch_after=0.15)
+        cfg = YubiKeyConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243', require_button=True)
+        self.emulator.load_config(2, cfg)
+        self.progress = []
+        self.counts = CountingInstrument()
+
+    def test_touch_interval(self):
+        """ Test that the status is read every touch_interval while waiting for the button """
+        YK = emulate(self.emulator, poller=yubikey_poll.BackoffPoller(initial=0.01, maximum=0.5),
+                     instrument=self.counts)
+        YK._device.touch_interval = 0.01
+        YK._device.touch_callback = self.progress.append
+        self.counts.reset()
+        response = YK.challenge_response(b'Sample #2', slot=2)
+        self.assertEqual(binascii.hexlify(response), b'0922d3405faa3d194f82a45830737d5cc6c75d24')
+        # backoff would have slept 0.01 + 0.02 + 0.04 + 0.08 + 0.16 by now
+        self.assertTrue(self.counts.polls > 8)
+        self.assertEqual(self.progress, [15, None])
+
+    def test_touch_timeout(self):
+        """ Test that the callback is told when the wait for the button times out """
+        self.emulator.touch_after = None
+        YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0.01))
+        YK._device.touch_callback = self.progress.append
+        self.assertRaises(YubiKeyTimeout, YK.challenge_response, b'Sample #2', slot=2, may_block=False)
+        # counting down during the two seconds waited
+        self.assertEqual(self.progress[-1], None)
+        self.assertEqual(self.progress[:-1], sorted(set(self.progress[:-1]), reverse=True))
+        self.assertTrue(len(self.progress) > 2)
+
+
+class TestStatus(unittest.TestCase):
+
+    def test_interned(self):
+        """ Test that identical status reports give the same object """
+        data = b'\x00\x02\x02\x03\x01\x06\x00\x00'
+        status = YubiKeyUSBHIDStatus(data)
+        self.assertTrue(YubiKeyUSBHIDStatus(bytearray(data)) is status)
+        self.assertFalse(YubiKeyUSBHIDStatus(b'\x00\x02\x02\x03\x02\x06\x00\x00') is status)
+        self.assertEqual(status.ykver(), (2, 2, 3))
+        self.assertEqual(status.pgm_seq, 1)
+        self.assertEqual(status.to_string(), data)
+
+    def test_immutable(self):
+        """ Test that status objects can't be changed """
+        status = YubiKeyUSBHIDStatus(b'\x00\x02\x02\x03\x01\x06\x00\x00')
+        self.assertRaises(AttributeError, setattr, status, 'pgm_seq', 2)
+        self.assertRaises(AttributeError, setattr, status, 'serial', 1)
+        self.assertEqual(status.pgm_seq, 1)
+
+    def test_device_status(self):
+        """ Test that reading an unchanged status gives the same object """
+        YK = emulate(YubiKeyEmulator(version=(2, 2, 3)), poller=yubikey_poll.FixedIntervalPoller(0))
+        self.assertTrue(YK.status() is YK.status())
+
+
+class ExplodingConfig(YubiKeyConfig):
+    """ A configuration that must not be formatted """
+
+    def __str__(self):
+        raise AssertionError('formatted with debug output disabled')
+
+
+class ListHandler(logging.Handler):
+    """ Keeps the messages logged (assertLogs() is Python 3.4+) """
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.output = []
+
+    def emit(self, record):
+        self.output.append(record.getMessage())
+
+
+class TestDebugOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.emulator = YubiKeyEmulator(version=(2, 2, 3))
+        self.YK = emulate(self.emulator, poller=yubikey_poll.FixedIntervalPoller(0))
+
+    def test_logging(self):
+        """ Test that transfers are logged, without colors, when debug is off """
+        log = logging.getLogger('yubico.yubikey_usb_hid')
+        logs = ListHandler()
+        level = log.level
+        log.addHandler(logs)
+        log.setLevel(logging.DEBUG)
+        try:
+            self.YK.serial()
+        finally:
+            log.removeHandler(logs)
+            log.setLevel(level)
+        reads = [line for line in logs.output if 'READ  : ' in line]
+        writes = [line for line in logs.output if 'WRITE : ' in line]
+        self.assertTrue(reads and writes)
+        self.assertFalse([line for line in logs.output if '\x1b' in line])
+
+    def test_not_formatted(self):
+        """ Test that nothing is formatted when debug output is disabled """
+        cfg = ExplodingConfig()
+        cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+        self.YK.write_config(cfg, slot=2)
+        self.assertEqual(self.YK.status().pgm_seq, 1)
+
+if __name__ == '__main__':
+    unittest.main()
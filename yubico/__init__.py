@@ -20,25 +20,67 @@ yubikey_config module.
 # Copyright (c) 2010, 2011, 2012 Yubico AB
 # See the file COPYING for licence statement.
 
+import sys
+import importlib
+
 from .yubico_version import __version__
 
+# yubikey_async is left out, as it only compiles on Python 3.5 and later
+# (and `from yubico import *' would fail on older ones), as are
+# yubikey_emulator, a testing aid, and yubico_aes, the AES of yubico_otp.
+# Import them explicitly.
 __all__ = [
     # classes
     'YubiKey',
     # functions
     "find_yubikey",
+    "enumerate_keys",
     # modules
     "yubico_exception",
+    "yubico_oath",
+    "yubico_otp",
     "yubico_util",
     "yubikey",
     "yubikey_config",
     "yubikey_config_util",
+    "yubikey_config_batch",
     "yubikey_defs",
     "yubikey_frame",
+    "yubikey_instrument",
+    "yubikey_transport",
+    "yubikey_poll",
+    "yubikey_pool",
+    "yubikey_provision",
+    "yubikey_session",
+    "yubikey_totp",
     "yubikey_usb_hid",
     "yubikey_neo_usb_hid",
     ]
 
-# to not have to import yubico.yubikey
-from .yubikey import YubiKey
-from .yubikey import find_key as find_yubikey
+# to not have to import yubico.yubikey : name -> name in yubico.yubikey
+_YUBIKEY_NAMES = {
+    'YubiKey': 'YubiKey',
+    'find_yubikey': 'find_key',
+    'enumerate_keys': 'enumerate_keys',
+}
+
+if sys.version_info >= (3, 7):
+    # Import the YubiKey classes (and through them the USB transports) and the
+    # modules in __all__ on first use (PEP 562), so that the pure software
+    # modules load quickly, and without PyUSB.
+    def __getattr__(name):
+        if name in _YUBIKEY_NAMES:
+            value = getattr(importlib.import_module('.yubikey', __name__), _YUBIKEY_NAMES[name])
+        elif name in __all__:
+            value = importlib.import_module('.' + name, __name__)
+        else:
+            raise AttributeError("module %r has no attribute %r" % (__name__, name))
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    from .yubikey import YubiKey
+    from .yubikey import find_key as find_yubikey
+    from .yubikey import enumerate_keys
@@ -0,0 +1,80 @@
+"""
+AES-128 block encryption, as used for Yubico OTP tickets
+
+Yubico OTP and OTP challenge-response encrypt a single 16 byte ticket
+with AES-128 in ECB mode, done by the `cryptography' package (install
+python-yubico[otp]). Without it, AES128 raises YubicoError.
+
+Example usage :
+
+    from yubico.yubico_aes import AES128
+
+    ticket = AES128(aes_key).decrypt_block(otp_bytes)
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'HAVE_CRYPTOGRAPHY',
+    # functions
+    # classes
+    'AES128',
+]
+
+from .yubico_version import __version__
+from . import yubico_exception
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.backends import default_backend
+except ImportError:
+    Cipher = None
+
+# True if the cryptography package (and so AES128) is available
+HAVE_CRYPTOGRAPHY = Cipher is not None
+
+BLOCK_SIZE = 16
+
+
+class AES128(object):
+    """
+    AES-128 encryption and decryption of single blocks (ECB).
+
+    The cipher context is set up once, so keep the object around when
+    handling many blocks with the same key.
+    """
+
+    def __init__(self, key):
+        if Cipher is None:
+            raise yubico_exception.YubicoError('AES requires the cryptography package')
+        key = bytes(key)
+        if len(key) != 16:
+            raise yubico_exception.InputError('AES128 key must be exactly 16 bytes')
+        cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
+        self._encryptor = cipher.encryptor()
+        self._decryptor = cipher.decryptor()
+
+    def __repr__(self):
+        return '<%s instance at %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            )
+
+    def encrypt_block(self, block):
+        """ Encrypt one 16 byte block. """
+        if len(block) != BLOCK_SIZE:
+            raise yubico_exception.InputError('AES block must be exactly 16 bytes')
+        return self._encryptor.update(bytes(block))
+
+    def decrypt_block(self, block):
+        """ Decrypt one 16 byte block. """
+        if len(block) != BLOCK_SIZE:
+            raise yubico_exception.InputError('AES block must be exactly 16 bytes')
+        return self._decryptor.update(bytes(block))
+
+    def decrypt_blocks(self, data):
+        """ Decrypt a multiple of 16 bytes, block by block (ECB). """
+        if len(data) % BLOCK_SIZE:
+            raise yubico_exception.InputError('AES data must be a multiple of 16 bytes')
+        return self._decryptor.update(bytes(data))
@@ -0,0 +1,291 @@
+"""
+module for verifying OATH-HOTP and TOTP codes
+
+A YubiKey programmed with YubiKeyConfig.mode_oath_hotp() outputs HOTP
+codes (RFC 4226) from a secret and a counter. An OATHVerifier holds the
+secrets and counters of many YubiKeys (or TOTP authenticators, RFC 6238)
+and checks codes against a window of counters (or time steps) ahead of
+the last one accepted.
+
+The HMACs of a whole window are computed together, and truncated to codes
+with hotp_truncate_many(), which uses NumPy if it is installed. Verifying
+many codes at once with verify_many() truncates all their windows in one
+go.
+
+Example usage :
+
+    from yubico.yubico_oath import OATHVerifier, HOTPCredential
+
+    verifier = OATHVerifier(window=10)
+    verifier.add('alice', HOTPCredential(b'h:' + secret_hex, digits=6))
+    if verifier.verify('alice', '755224'):
+        print "Welcome, alice"
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    'hotp_truncate_many',
+    # classes
+    'OATHVerifier',
+    'HOTPCredential',
+    'TOTPCredential',
+]
+
+import hmac
+import time
+import struct
+import hashlib
+import threading
+
+from .yubico_version import __version__
+from . import yubico_util
+from . import yubico_exception
+from .yubikey_defs import SHA1_DIGEST_SIZE
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_COUNTER = struct.Struct('>Q')
+_CODE = struct.Struct('>I')
+
+
+def hotp_truncate_many(hmac_results, length=6, use_numpy=None):
+    """
+    Perform the HOTP Algorithm truncating on many HMAC-SHA-1 results.
+
+    Input is a list of 20 byte bytestrings, or their concatenation.
+    Returns a list of integer codes, like hotp_truncate() of each.
+    """
+    if not isinstance(hmac_results, (bytes, bytearray)):
+        hmac_results = b''.join(hmac_results)
+    if len(hmac_results) % SHA1_DIGEST_SIZE:
+        raise yubico_exception.YubicoError("HMAC-SHA-1 not 20 bytes long")
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and hmac_results:
+        digests = numpy.frombuffer(hmac_results, dtype=numpy.uint8).reshape(-1, SHA1_DIGEST_SIZE)
+        offsets = (digests[:, SHA1_DIGEST_SIZE - 1] & 0xf)[:, None] + numpy.arange(4)
+        parts = digests[numpy.arange(len(digests))[:, None], offsets].astype(numpy.uint32)
+        codes = (parts[:, 0] & 0x7f) << 24 | parts[:, 1] << 16 | parts[:, 2] << 8 | parts[:, 3]
+        return (codes % (10 ** length)).tolist()
+    data = bytearray(hmac_results)
+    res = []
+    for start in range(0, len(data), SHA1_DIGEST_SIZE):
+        offset = start + (data[start + SHA1_DIGEST_SIZE - 1] & 0xf)
+        res.append((_CODE.unpack_from(data, offset)[0] & 0x7fffffff) % (10 ** length))
+    return res
+
+
+class _OATHCredential(object):
+    """ The secret and number of digits shared by HOTP and TOTP credentials. """
+
+    __slots__ = ('digits', '_mac')
+
+    def __init__(self, secret, digits):
+        if digits not in (6, 8):
+            raise yubico_exception.InputError('OATH digits must be 6 or 8')
+        self.digits = digits
+        # keyed once, and copied for every counter
+        self._mac = hmac.new(yubico_util.decode_input_string(secret), digestmod=hashlib.sha1)
+
+    def _digests(self, counters):
+        res = []
+        for counter in counters:
+            mac = self._mac.copy()
+            mac.update(_COUNTER.pack(counter))
+            res.append(mac.digest())
+        return b''.join(res)
+
+
+class HOTPCredential(_OATHCredential):
+    """
+    An OATH-HOTP secret.
+
+    Attributes :
+        digits  -- number of digits in the codes (6 or 8)
+        counter -- the next counter value expected (one more than the
+                   counter of the last code accepted)
+
+    The secret may be given as bytes, or with an 'h:' (hex) or 'm:'
+    (modhex) prefix.
+    """
+
+    __slots__ = ('counter',)
+
+    def __init__(self, secret, counter=0, digits=6):
+        _OATHCredential.__init__(self, secret, digits)
+        self.counter = counter
+
+    def __repr__(self):
+        return '<%s instance at %s: %i digits, counter %i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.digits,
+            self.counter,
+            )
+
+    def _window(self, verifier):
+        return range(self.counter, self.counter + verifier.window)
+
+    def _accept(self, counter, verifier):
+        self.counter = counter + 1
+
+
+class TOTPCredential(_OATHCredential):
+    """
+    An OATH-TOTP secret.
+
+    Attributes :
+        digits    -- number of digits in the codes (6 or 8)
+        period    -- seconds per time step
+        drift     -- time steps the authenticator was off by at the last
+                     code accepted, and the window is centered on
+        last_step -- time step of the last code accepted (a code is
+                     accepted once)
+    """
+
+    __slots__ = ('period', 'drift', 'last_step')
+
+    def __init__(self, secret, digits=6, period=30, drift=0, last_step=-1):
+        _OATHCredential.__init__(self, secret, digits)
+        self.period = period
+        self.drift = drift
+        self.last_step = last_step
+
+    def __repr__(self):
+        return '<%s instance at %s: %i digits, %is period, drift %i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.digits,
+            self.period,
+            self.drift,
+            )
+
+    def _window(self, verifier):
+        step = int(verifier.clock() // self.period) + self.drift
+        return range(max(step - verifier.totp_window, self.last_step + 1), step + verifier.totp_window + 1)
+
+    def _accept(self, step, verifier):
+        self.drift = step - int(verifier.clock() // self.period)
+        self.last_step = step
+
+
+def _code_value(code, digits):
+    """ Return a submitted code as an int, or None if it can't be one. """
+    if isinstance(code, int):
+        return code
+    if not isinstance(code, bytes):
+        code = code.encode('ascii', 'replace')
+    if len(code) != digits or not code.isdigit():
+        return None
+    return int(code)
+
+
+class OATHVerifier(object):
+    """
+    Verifies OATH codes against the HOTPCredentials and TOTPCredentials it
+    holds, by name.
+
+    Accepted codes advance the counter (or last time step) of their
+    credential, so a code is only accepted once. A verifier can be used
+    from several threads.
+
+    Attributes :
+        window        -- HOTP counters to look ahead
+        resync_window -- HOTP counters to look ahead for resync()
+        totp_window   -- TOTP time steps to accept on either side of the
+                         current one (corrected by the drift)
+        clock         -- function returning the time, for TOTP
+        use_numpy     -- use NumPy to truncate (default: if installed)
+    """
+
+    def __init__(self, credentials=None, window=10, resync_window=100, totp_window=1,
+                 clock=time.time, use_numpy=None):
+        self.credentials = dict(credentials or {})
+        self.window = window
+        self.resync_window = resync_window
+        self.totp_window = totp_window
+        self.clock = clock
+        self.use_numpy = use_numpy
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s instance at %s: %i credentials>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            len(self.credentials),
+            )
+
+    def add(self, name, credential):
+        """ Add (or replace) the credential called `name'. """
+        with self._lock:
+            self.credentials[name] = credential
+
+    def verify(self, name, code):
+        """ Check `code' for the credential called `name'. """
+        return self.verify_many([(name, code)])[0]
+
+    def verify_many(self, codes):
+        """
+        Check a batch of (name, code), returning a list of True/False in the
+        same order.
+
+        The windows of all the codes are truncated together. Codes for the
+        same credential are checked in the order given.
+        """
+        res = [False] * len(codes)
+        with self._lock:
+            # (index, credential, code, window), and their HMACs in order
+            checks = []
+            digests = {}
+            for (i, (name, code)) in enumerate(codes):
+                credential = self.credentials.get(name)
+                if credential is None:
+                    continue
+                code = _code_value(code, credential.digits)
+                if code is None:
+                    continue
+                window = credential._window(self)
+                checks.append((i, credential, code, window))
+                digests.setdefault(credential.digits, []).append(credential._digests(window))
+            truncated = {}
+            for (digits, these) in digests.items():
+                truncated[digits] = iter(hotp_truncate_many(b''.join(these), digits, self.use_numpy))
+            for (i, credential, code, window) in checks:
+                candidates = [next(truncated[credential.digits]) for _ in window]
+                # an earlier code for the same credential may have moved it on
+                current = credential._window(self)
+                for (moving_factor, candidate) in zip(window, candidates):
+                    if candidate == code and moving_factor in current:
+                        credential._accept(moving_factor, self)
+                        res[i] = True
+                        break
+        return res
+
+    def resync(self, name, code1, code2):
+        """
+        Resynchronize the HOTP credential called `name' with two consecutive
+        codes, searched for within resync_window counters.
+
+        Returns True if the codes were found, and the counter moved past them.
+        """
+        with self._lock:
+            credential = self.credentials[name]
+            if not isinstance(credential, HOTPCredential):
+                raise yubico_exception.InputError('Only HOTP credentials can be resynchronized')
+            code1 = _code_value(code1, credential.digits)
+            code2 = _code_value(code2, credential.digits)
+            if code1 is None or code2 is None:
+                return False
+            window = range(credential.counter, credential.counter + self.resync_window + 1)
+            candidates = hotp_truncate_many(credential._digests(window), credential.digits, self.use_numpy)
+            for n in range(len(candidates) - 1):
+                if candidates[n] == code1 and candidates[n + 1] == code2:
+                    credential._accept(window[n + 1], self)
+                    return True
+        return False
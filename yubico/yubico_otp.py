@@ -0,0 +1,283 @@
+"""
+module for validating Yubico OTPs offline
+
+A YubiKey programmed with YubiKeyConfig.mode_yubikey_otp() outputs OTPs
+made of its public ID (the fixed string) and a ticket encrypted with its
+AES key, both in modhex. An OTPValidator holds the AES keys and private
+UIDs of many YubiKeys, indexed by public ID, and checks OTPs against them
+without any validation server: the ticket must decrypt to the right
+private UID with a valid CRC, and its counters must be higher than those
+of the last OTP accepted from the YubiKey (to refuse replayed OTPs).
+
+Example usage :
+
+    from yubico.yubico_otp import OTPValidator, OTPCredential
+
+    validator = OTPValidator()
+    validator.add(OTPCredential(b'm:ccccccbcgujh', b'h:' + private_uid_hex, b'h:' + aes_key_hex))
+    result = validator.validate(otp)
+    if result.ok:
+        print "Welcome, %s" % result.public_id
+
+For many OTPs, validate_many() decodes them in one go and decrypts the
+OTPs of each YubiKey together.
+
+OTPCredential requires the `cryptography' package for AES (install
+python-yubico[otp]).
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'RESULTS',
+    # functions
+    # classes
+    'OTPValidator',
+    'OTPCredential',
+    'OTPValidationResult',
+]
+
+import hmac
+import struct
+import binascii
+import threading
+
+from .yubico_version import __version__
+from . import yubico_util
+from . import yubico_exception
+from . import yubikey_defs
+from . import yubico_aes
+from .yubico_aes import BLOCK_SIZE
+
+# result of a validation
+RESULTS = ['ok', 'malformed', 'unknown_id', 'bad_ticket', 'replayed']
+
+# the ticket, in modhex, at the end of every OTP
+_TICKET_SIZE = BLOCK_SIZE * 2
+_MAX_PUBLIC_ID_SIZE = 16 * 2
+
+# From ykdef.h :
+#
+# typedef struct {
+#         unsigned char uid[UID_SIZE];    /* Unique (secret) ID */
+#         unsigned short useCtr;          /* Use counter (incremented by 1 at first use after power up) + usage flag in msb */
+#         unsigned short tstpl;           /* Timestamp incremented by approx 8Hz (low part) */
+#         unsigned char tstph;            /* Timestamp (high part) */
+#         unsigned char sessionCtr;       /* Number of times used within session. 0 for first use. After it wraps from 0xff to 1 */
+#         unsigned short rnd;             /* Pseudo-random value */
+#         unsigned short crc;             /* CRC16 value of all fields */
+# } TICKET;
+_TICKET = struct.Struct('<%is H H B B H H' % yubikey_defs.UID_SIZE)
+# the msb of useCtr is a usage flag, not part of the counter
+_USE_COUNTER_MASK = 0x7fff
+
+
+def _otp_bytes(otp):
+    """ Return `otp' as lower case bytes, or None if it isn't ASCII. """
+    if not isinstance(otp, bytes):
+        try:
+            otp = otp.encode('ascii')
+        except (AttributeError, UnicodeError):
+            return None
+    return otp.lower()
+
+
+class OTPCredential(object):
+    """
+    The secrets of one YubiKey configured for Yubico OTP, and the counters
+    of the last OTP accepted from it.
+
+    Attributes :
+        public_id       -- the public ID (fixed string) in modhex, as it
+                           starts the OTPs
+        private_uid     -- the 6 byte private UID
+        use_counter     -- use counter of the last OTP accepted
+        session_counter -- session counter of the last OTP accepted
+
+    The public ID, private UID and AES key may be given as bytes, or with
+    an 'h:' (hex) or 'm:' (modhex) prefix.
+    """
+
+    __slots__ = ('public_id', 'private_uid', 'use_counter', 'session_counter', '_aes')
+
+    def __init__(self, public_id, private_uid, aes_key, use_counter=0, session_counter=0):
+        public_id = yubico_util.decode_input_string(public_id)
+        if len(public_id) > _MAX_PUBLIC_ID_SIZE // 2:
+            raise yubico_exception.InputError('Public ID must be at most %i bytes' % (_MAX_PUBLIC_ID_SIZE // 2))
+        private_uid = yubico_util.decode_input_string(private_uid)
+        if len(private_uid) != yubikey_defs.UID_SIZE:
+            raise yubico_exception.InputError('Private UID must be %i bytes' % (yubikey_defs.UID_SIZE))
+        aes_key = yubico_util.decode_input_string(aes_key)
+        self.public_id = yubico_util.modhex_encode(public_id)
+        self.private_uid = private_uid
+        self.use_counter = use_counter
+        self.session_counter = session_counter
+        self._aes = yubico_aes.AES128(aes_key)
+
+    def __repr__(self):
+        return '<%s instance at %s: %s, counter %i/%i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.public_id.decode('ascii'),
+            self.use_counter,
+            self.session_counter,
+            )
+
+
+class OTPValidationResult(object):
+    """
+    The outcome of validating an OTP.
+
+    Attributes :
+        otp             -- the OTP validated
+        result          -- 'ok', 'malformed' (not an OTP), 'unknown_id' (no
+                           credential with the public ID), 'bad_ticket'
+                           (wrong private UID or CRC after decryption) or
+                           'replayed' (counters not above the last accepted)
+        public_id       -- the public ID of the OTP, in modhex
+        use_counter     -- the counters and timestamp of the ticket, if it
+        session_counter    decrypted correctly
+        timestamp
+    """
+
+    __slots__ = ('otp', 'result', 'public_id', 'use_counter', 'session_counter', 'timestamp')
+
+    def __init__(self, otp, result, public_id=None, use_counter=None, session_counter=None, timestamp=None):
+        self.otp = otp
+        self.result = result
+        self.public_id = public_id
+        self.use_counter = use_counter
+        self.session_counter = session_counter
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.result,
+            )
+
+    @property
+    def ok(self):
+        return self.result == 'ok'
+
+
+class OTPValidator(object):
+    """
+    Validates Yubico OTPs against the OTPCredentials it holds.
+
+    Accepted OTPs advance the counters of their credential, so an OTP
+    is only accepted once. A validator can be used from several threads.
+    """
+
+    def __init__(self, credentials=()):
+        self._credentials = {}
+        self._lock = threading.Lock()
+        for credential in credentials:
+            self.add(credential)
+
+    def __repr__(self):
+        return '<%s instance at %s: %i credentials>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            len(self._credentials),
+            )
+
+    def __len__(self):
+        return len(self._credentials)
+
+    def add(self, credential):
+        """ Add (or replace) the credential for its public ID. """
+        with self._lock:
+            self._credentials[credential.public_id] = credential
+
+    def remove(self, public_id):
+        """ Remove the credential of a public ID (in modhex). """
+        with self._lock:
+            del self._credentials[_otp_bytes(public_id)]
+
+    def get(self, public_id):
+        """ Return the credential of a public ID (in modhex), or None. """
+        return self._credentials.get(_otp_bytes(public_id))
+
+    def validate(self, otp):
+        """ Validate one OTP, returning an OTPValidationResult. """
+        return self.validate_many([otp])[0]
+
+    def validate_many(self, otps):
+        """
+        Validate a batch of OTPs, returning a list of OTPValidationResult in
+        the same order.
+
+        The modhex of the whole batch is decoded at once, and the tickets of
+        each YubiKey are decrypted together. OTPs from the same YubiKey are
+        checked for replay in the order given.
+        """
+        results = [None] * len(otps)
+        # public ID -> [(index, ticket in hex)]
+        tickets = {}
+        decoded, offsets = self._decode(otps, results)
+        for (i, start) in offsets:
+            otp = results[i]
+            end = start + len(otp)
+            public_id = otp[:-_TICKET_SIZE]
+            tickets.setdefault(public_id, []).append((i, decoded[end - _TICKET_SIZE:end]))
+        with self._lock:
+            for (public_id, these) in tickets.items():
+                credential = self._credentials.get(public_id)
+                if credential is None:
+                    for (i, _) in these:
+                        results[i] = OTPValidationResult(otps[i], 'unknown_id', public_id)
+                    continue
+                plain = credential._aes.decrypt_blocks(binascii.unhexlify(b''.join(t for (_, t) in these)))
+                for (n, (i, _)) in enumerate(these):
+                    ticket = plain[n * BLOCK_SIZE:(n + 1) * BLOCK_SIZE]
+                    results[i] = self._check(credential, otps[i], ticket)
+        return results
+
+    def _decode(self, otps, results):
+        """
+        Decode the modhex of all well formed OTPs in one go, filling in
+        `results' for the malformed ones and putting the lower case OTP in
+        for the others. Return the decoded (hex) bytes, and the (index,
+        offset) in them of every well formed OTP.
+        """
+        offsets = []
+        parts = []
+        pos = 0
+        for (i, otp) in enumerate(otps):
+            data = _otp_bytes(otp)
+            if data is None or len(data) % 2 or \
+                    not _TICKET_SIZE <= len(data) <= _TICKET_SIZE + _MAX_PUBLIC_ID_SIZE:
+                results[i] = OTPValidationResult(otp, 'malformed')
+                continue
+            results[i] = data
+            offsets.append((i, pos))
+            parts.append(data)
+            pos += len(data)
+        joined = b''.join(parts)
+        if joined.translate(None, yubico_util.MODHEX_ALPHABET):
+            # something isn't modhex, weed it out
+            good = []
+            for (i, start) in offsets:
+                if results[i].translate(None, yubico_util.MODHEX_ALPHABET):
+                    results[i] = OTPValidationResult(otps[i], 'malformed')
+                else:
+                    good.append((i, start))
+            offsets = good
+        return (yubico_util.modhex_decode(joined), offsets)
+
+    def _check(self, credential, otp, ticket):
+        if not yubico_util.validate_crc16(ticket) or \
+                not hmac.compare_digest(ticket[:yubikey_defs.UID_SIZE], credential.private_uid):
+            return OTPValidationResult(otp, 'bad_ticket', credential.public_id)
+        (_, use_counter, ts_low, ts_high, session_counter, _, _) = _TICKET.unpack(ticket)
+        use_counter &= _USE_COUNTER_MASK
+        result = OTPValidationResult(otp, 'replayed', credential.public_id, use_counter,
+                                     session_counter, ts_high << 16 | ts_low)
+        if (use_counter, session_counter) > (credential.use_counter, credential.session_counter):
+            credential.use_counter = use_counter
+            credential.session_counter = session_counter
+            result.result = 'ok'
+        return result
@@ -6,17 +6,22 @@ utility functions for Yubico modules
 
 __all__ = [
     # constants
+    'MODHEX_ALPHABET',
     # functions
     'crc16',
     'validate_crc16',
     'hexdump',
     'modhex_decode',
+    'modhex_encode',
+    'decode_input_string',
     'hotp_truncate',
     # classes
+    'Crc16',
+    'Hexdump',
 ]
 
 import sys
-import string
+import binascii
 
 from .yubico_version import __version__
 from . import yubikey_defs
@@ -39,29 +44,90 @@ def chr_byte(number):
     else:
         return bytes([number])
 
-def crc16(data):
+def _crc16_table():
+    """ Build the lookup table for the reflected ISO13239 polynomial 0x8408. """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+_CRC_TABLE = _crc16_table()
+
+def _byte_values(data):
     """
-    Calculate an ISO13239 CRC checksum of the input buffer (bytestring).
+    Return something iterating over the integer byte values of data.
+
+    Accepts bytes, bytearray and memoryview, without copying on Python 3.
     """
-    m_crc = 0xffff
-    for this in data:
-        m_crc ^= ord_byte(this)
-        for _ in range(8):
-            j = m_crc & 1
-            m_crc >>= 1
-            if j:
-                m_crc ^= 0x8408
+    if isinstance(data, memoryview) and data.format != 'B':
+        data = data.cast('B')
+    if sys.version_info < (3, 0) and not isinstance(data, bytearray):
+        return bytearray(data)
+    return data
+
+def _crc16_update(m_crc, data):
+    table = _CRC_TABLE
+    for this in _byte_values(data):
+        m_crc = (m_crc >> 8) ^ table[(m_crc ^ this) & 0xff]
     return m_crc
 
+def crc16(data):
+    """
+    Calculate an ISO13239 CRC checksum of the input buffer.
+
+    The input can be a bytestring, bytearray or memoryview.
+    """
+    return _crc16_update(0xffff, data)
+
 def validate_crc16(data):
     """
     Validate that the CRC of the contents of buffer is the residual OK value.
 
-    The input is a bytestring.
+    The input can be a bytestring, bytearray or memoryview.
     """
     return crc16(data) == _CRC_OK_RESIDUAL
 
 
+class Crc16(object):
+    """
+    Incremental ISO13239 CRC checksum, for data arriving in chunks.
+
+    Example :
+
+        crc = Crc16()
+        for chunk in chunks:
+            crc.update(chunk)
+        if not crc.valid():
+            ...
+    """
+
+    def __init__(self, data=b''):
+        self.value = 0xffff
+        self.update(data)
+
+    def __repr__(self):
+        return '<%s instance at %s: 0x%04x>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.value,
+            )
+
+    def update(self, data):
+        """ Add data to the checksum. Returns self. """
+        self.value = _crc16_update(self.value, data)
+        return self
+
+    def valid(self):
+        """ Check if the data seen so far ends with a valid CRC (the OK residual). """
+        return self.value == _CRC_OK_RESIDUAL
+
+
 class DumpColors:
     """ Class holding ANSI colors for colorization of hexdump output """
 
@@ -92,48 +158,102 @@ class DumpColors:
         """ Disable colorization """
         self.enabled = False
 
+# hex strings of all byte values, for hexdump()
+_HEX_BYTES = ['%02x' % x for x in range(256)]
+
+# colors used by hexdump(), disable() to not colorize any hexdumps
+_DUMP_COLORS = DumpColors()
+
 def hexdump(src, length=8, colorize=False):
     """ Produce a string hexdump of src, for debug output.
 
-    Input: bytestring; output: text string
+    Input: bytestring (or bytearray/memoryview); output: text string
     """
     if not src:
         return str(src)
-    if type(src) is not bytes:
+    if not isinstance(src, (bytes, bytearray, memoryview)):
         raise yubico_exception.InputError('Hexdump \'src\' must be bytestring (got %s)' % type(src))
-    offset = 0
-    result = ''
-    for this in group(src, length):
+    values = bytearray(src)
+    if colorize:
+        reset = _DUMP_COLORS.get('RESET')
+        blue = _DUMP_COLORS.get('BLUE')
+        green = _DUMP_COLORS.get('GREEN')
+    out = []
+    for offset in range(0, len(values), length):
+        this = values[offset:offset + length]
+        out.append('%04X   ' % offset)
         if colorize:
-            last, this = this[-1], this[:-1]
-            colors = DumpColors()
-            color = colors.get('RESET')
-            if ord_byte(last) & yubikey_defs.RESP_PENDING_FLAG:
+            last = this[-1]
+            color = reset
+            if last & yubikey_defs.RESP_PENDING_FLAG:
                 # write to key
-                color = colors.get('BLUE')
-            elif ord_byte(last) & yubikey_defs.SLOT_WRITE_FLAG:
-                color = colors.get('GREEN')
-            hex_s = color + ' '.join(["%02x" % ord_byte(x) for x in this]) + colors.get('RESET')
-            hex_s += " %02x" % ord_byte(last)
+                color = blue
+            elif last & yubikey_defs.SLOT_WRITE_FLAG:
+                color = green
+            out.append(color)
+            out.append(' '.join([_HEX_BYTES[x] for x in this[:-1]]))
+            out.append(reset)
+            out.append(' ')
+            out.append(_HEX_BYTES[last])
         else:
-            hex_s = ' '.join(["%02x" % ord_byte(x) for x in this])
-        result += "%04X   %s\n" % (offset, hex_s)
-        offset += length
-    return result
+            out.append(' '.join([_HEX_BYTES[x] for x in this]))
+        out.append('\n')
+    return ''.join(out)
+
+class Hexdump(object):
+    """
+    A hexdump() that is only produced when converted to a string, e.g. when
+    passed as argument to a logging call that is actually emitted.
+
+    With `strip', the trailing newline is left out.
+    """
+
+    def __init__(self, src, length=8, colorize=False, strip=False):
+        self.src = src
+        self.length = length
+        self.colorize = colorize
+        self.strip = strip
+
+    def __str__(self):
+        res = hexdump(self.src, self.length, self.colorize)
+        if self.strip:
+            res = res.rstrip('\n')
+        return res
 
 def group(data, num):
     """ Split data into chunks of num chars each """
     return [data[i:i+num] for i in range(0, len(data), num)]
 
+try:
+    _maketrans = bytes.maketrans
+except AttributeError:
+    # Python 2
+    from string import maketrans as _maketrans
+
+MODHEX_ALPHABET = b"cbdefghijklnrtuv"
+_MODHEX_DECODE = _maketrans(MODHEX_ALPHABET, b"0123456789abcdef")
+_MODHEX_ENCODE = _maketrans(b"0123456789abcdef", MODHEX_ALPHABET)
+
 def modhex_decode(data):
     """ Convert a modhex bytestring to ordinary hex. """
-    try:
-        maketrans = string.maketrans
-    except AttributeError:
-        # Python 3
-        maketrans = bytes.maketrans
-    t_map = maketrans(b"cbdefghijklnrtuv", b"0123456789abcdef")
-    return data.translate(t_map)
+    return data.translate(_MODHEX_DECODE)
+
+def modhex_encode(data):
+    """ Convert a bytestring to modhex. """
+    return binascii.hexlify(data).translate(_MODHEX_ENCODE)
+
+def decode_input_string(data):
+    """
+    Decode an input string : 'm:' followed by modhex, 'h:' followed by hex,
+    or anything else as is.
+    """
+    if sys.version_info >= (3, 0) and isinstance(data, str):
+        data = data.encode('ascii')
+    if data.startswith(b'm:'):
+        data = b'h:' + modhex_decode(data[2:])
+    if data.startswith(b'h:'):
+        return binascii.unhexlify(data[2:])
+    return data
 
 def hotp_truncate(hmac_result, length=6):
     """ Perform the HOTP Algorithm truncating.
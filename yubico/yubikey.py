@@ -26,19 +26,45 @@ __all__ = [
     'SLOT_WRITE_FLAG',
     # functions
     'find_key',
+    'key_class',
+    'enumerate_keys',
     # classes
     'YubiKey',
+    'YubiKeyInfo',
     'YubiKeyTimeout',
 ]
 
+try:
+    from concurrent import futures
+except ImportError:
+    # Python 2, without the futures backport
+    futures = None
+
 from .yubico_version  import __version__
+from . import yubico_exception
 from .yubikey_base import YubiKeyError, YubiKeyTimeout, YubiKeyVersionError, YubiKeyCapabilities, YubiKey
-from .yubikey_usb_hid import YubiKeyUSBHID, YubiKeyHIDDevice, YubiKeyUSBHIDError
+from .yubikey_usb_hid import YubiKeyUSBHID, YubiKeyHIDDevice, YubiKeyUSBHIDError, find_usb_devices
 from .yubikey_neo_usb_hid import YubiKeyNEO_USBHID
 from .yubikey_4_usb_hid import YubiKey4_USBHID
 
 
-def find_key(debug=False, skip=0):
+def key_class(yk_version):
+    """
+    Return the YubiKey class to use for a YubiKey with firmware `yk_version'.
+
+    Attributes :
+        yk_version -- tuple (major, minor, build)
+    """
+    if (2, 1, 4) <= yk_version <= (2, 1, 9):
+        return YubiKeyNEO_USBHID
+    if yk_version < (3, 0, 0):
+        return YubiKeyUSBHID
+    if yk_version < (4, 0, 0):
+        return YubiKeyNEO_USBHID
+    return YubiKey4_USBHID
+
+
+def find_key(debug=False, skip=0, poller=None, instrument=None):
     """
     Locate a connected YubiKey. Throws an exception if none is found.
 
@@ -46,22 +72,111 @@ def find_key(debug=False, skip=0):
     appear in the future.
 
     Attributes :
-        skip  -- number of YubiKeys to skip
-        debug -- True or False
+        skip   -- number of YubiKeys to skip
+        debug  -- True or False
+        poller -- yubikey_poll.YubiKeyPoller to use for status polling
+        instrument -- yubikey_instrument.YubiKeyInstrument to report to
     """
     try:
-        hid_device = YubiKeyHIDDevice(debug, skip)
-        yk_version = hid_device.status().ykver()
-        if (2, 1, 4) <= yk_version <= (2, 1, 9):
-            return YubiKeyNEO_USBHID(debug, skip, hid_device)
-        if yk_version < (3, 0, 0):
-            return YubiKeyUSBHID(debug, skip, hid_device)
-        if yk_version < (4, 0, 0):
-            return YubiKeyNEO_USBHID(debug, skip, hid_device)
-        return YubiKey4_USBHID(debug, skip, hid_device)
+        hid_device = YubiKeyHIDDevice(debug, skip, poller, instrument=instrument)
+        return key_class(hid_device.status().ykver())(debug, skip, hid_device)
     except YubiKeyUSBHIDError as inst:
         if 'No USB YubiKey found' in str(inst):
             # generalize this error
             raise YubiKeyError('No YubiKey found')
         else:
             raise
+
+
+def enumerate_keys(debug=False, poller=None, workers=0, instrument=None):
+    """
+    Generate a YubiKeyInfo for every connected YubiKey.
+
+    The USB bus is walked only once. The YubiKeys are not opened until
+    something is asked of the YubiKeyInfo, unless `workers' is non-zero,
+    in which case that many threads open all YubiKeys and read their
+    status and serial number in parallel before they are generated (one
+    after the other with a single worker, or without concurrent.futures).
+
+    Attributes :
+        debug   -- True or False
+        poller  -- yubikey_poll.YubiKeyPoller to use for status polling
+        workers -- number of threads to probe the YubiKeys with (0 for lazy)
+        instrument -- yubikey_instrument.YubiKeyInstrument to report to
+    """
+    infos = [YubiKeyInfo(usb_device, debug, poller, instrument) for usb_device in find_usb_devices()]
+    if not workers:
+        for info in infos:
+            yield info
+        return
+    if workers == 1 or futures is None:
+        for info in [info.probe() for info in infos]:
+            yield info
+        return
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for info in executor.map(YubiKeyInfo.probe, infos):
+            yield info
+
+
+class YubiKeyInfo(object):
+    """
+    A connected YubiKey, as found by enumerate_keys().
+
+    The YubiKey is opened on first use, and its serial number is
+    remembered once read.
+    """
+
+    def __init__(self, usb_device, debug=False, poller=None, instrument=None):
+        self.usb_device = usb_device
+        self.pid = usb_device.idProduct
+        self.debug = debug
+        self.poller = poller
+        self.instrument = instrument
+        self._key = None
+        self._serial = None
+
+    def __repr__(self):
+        return '<%s instance at %s: PID 0x%04x%s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.pid,
+            ', %s' % self._key if self._key is not None else '',
+            )
+
+    def key(self):
+        """ Return the YubiKey object (YubiKeyUSBHID etc.), opening the YubiKey if needed. """
+        if self._key is None:
+            hid_device = YubiKeyHIDDevice(self.debug, poller=self.poller,
+                                          usb_device=self.usb_device,
+                                          instrument=self.instrument)
+            self._key = key_class(hid_device.status().ykver())(self.debug, 0, hid_device)
+        return self._key
+
+    def status(self):
+        """ Return the status of the YubiKey, as read when it was opened. """
+        return self.key().last_status()
+
+    def version(self):
+        """ Get the YubiKey's version as a string. """
+        return self.key().version()
+
+    def serial(self, may_block=False):
+        """
+        Get the YubiKey's serial number, or None if it can't be read.
+
+        This never waits for a button press unless `may_block' is True.
+        """
+        if self._serial is None:
+            try:
+                self._serial = self.key().serial(may_block=may_block)
+            except yubico_exception.YubicoError:
+                return None
+        return self._serial
+
+    def probe(self):
+        """ Open the YubiKey and read its serial number. Returns self. """
+        try:
+            self.serial()
+        except yubico_exception.YubicoError:
+            pass
+        return self
@@ -102,12 +102,14 @@ class YubiKey4_USBHID(yubikey_neo_usb_hid.YubiKeyNEO_USBHID):
         """ Read the capabilities list from a YubiKey >= 4.0.0 """
 
         frame = yubikey_frame.YubiKeyFrame(command=SLOT.YK4_CAPABILITIES)
-        self._device._write(frame)
-        response = self._device._read_response()
+        with self._device._lock:
+            self._device._write(frame)
+            response = self._device._read_response()
         r_len = yubico_util.ord_byte(response[0])
 
         # 1 byte length, 2 byte CRC.
         if not yubico_util.validate_crc16(response[:r_len+3]):
+            self._crc_failure()
             raise YubiKey4_USBHIDError("Read from device failed CRC check")
 
         return response[1:r_len+1]
@@ -0,0 +1,275 @@
+"""
+module for using a USB HID YubiKey from asyncio
+
+The methods of YubiKeyUSBHID block the calling thread while the YubiKey
+is busy, for up to 20 seconds when a button press is required. The
+AsyncYubiKey wrapper does the same operations as coroutines, sleeping
+with asyncio.sleep() between status polls so that other tasks can run.
+
+Requires Python 3.5 or later.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_async import AsyncYubiKey
+
+    async def main():
+        YK = AsyncYubiKey(yubico.find_yubikey())
+        response = await YK.challenge_response(challenge, slot=2, timeout=15)
+
+Progress of operations requiring the YubiKey button to be pressed can be
+followed with an async iterator :
+
+        progress = YK.challenge_response_progress(challenge, slot=2)
+        async for seconds_left in progress:
+            print('Touch your YubiKey (%i seconds left)' % seconds_left)
+        response = await progress
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    # classes
+    'AsyncYubiKey',
+    'TouchProgress',
+]
+
+import asyncio
+import logging
+import weakref
+
+from .yubico_version import __version__
+from . import yubikey_base
+from . import yubikey_defs
+from . import yubikey_frame
+from . import yubikey_usb_hid
+from .yubikey_defs import SLOT
+
+# one lock per YubiKeyHIDDevice and event loop (asyncio locks are bound to
+# a loop before Python 3.10), shared by all AsyncYubiKeys using it there.
+# Loops in different threads are kept apart by the device lock.
+_LOCKS = weakref.WeakKeyDictionary()
+
+# seconds between attempts to take the device lock from threads using it
+_DEVICE_LOCK_INTERVAL = 0.005
+
+
+class AsyncYubiKey(object):
+    """
+    asyncio front-end for a YubiKeyUSBHID (or NEO/YubiKey 4) object.
+
+    Operations on the same YubiKey are done one at a time. All operations
+    take an optional `timeout' in seconds, and can be cancelled; a
+    cancelled operation resets the read mode of the YubiKey so that the
+    next operation starts afresh.
+
+    Only the waiting is asynchronous, each USB transfer (a few
+    milliseconds at most) is still done in the event loop thread.
+
+    The YubiKey can also be used from other threads at the same time:
+    every operation holds the lock of the YubiKeyHIDDevice while talking
+    to it, like the blocking API does, and waits for it without blocking
+    the event loop.
+    """
+
+    def __init__(self, yubikey):
+        self.yubikey = yubikey
+        self._device = yubikey._device
+
+    def __repr__(self):
+        return '<%s instance at %s: %r>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.yubikey,
+            )
+
+    @property
+    def _lock(self):
+        loop = asyncio.get_event_loop()
+        locks = _LOCKS.get(self._device)
+        if locks is None:
+            locks = _LOCKS[self._device] = weakref.WeakKeyDictionary()
+        lock = locks.get(loop)
+        if lock is None:
+            lock = locks[loop] = asyncio.Lock()
+        return lock
+
+    async def status(self, timeout=None):
+        """ Poll YubiKey for status. """
+        return await self._run(self._status(), timeout)
+
+    async def serial(self, may_block=True, timeout=None):
+        """ Get the YubiKey serial number (requires YubiKey 2.2). """
+        YK = self.yubikey
+        if not YK.capabilities.have_serial_number():
+            raise yubikey_base.YubiKeyVersionError("Serial number unsupported in YubiKey %s" % YK.version() )
+        return await self._run(self._serial(may_block), timeout)
+
+    async def challenge_response(self, challenge, mode='HMAC', slot=1, variable=True, may_block=True, timeout=None):
+        """ Issue a challenge to the YubiKey and return the response (requires YubiKey 2.2). """
+        YK = self.yubikey
+        if not YK.capabilities.have_challenge_response(mode):
+            raise yubikey_base.YubiKeyVersionError("%s challenge-response unsupported in YubiKey %s" % (mode, YK.version()) )
+        (frame, response_len) = YK._challenge_frame(challenge, mode, slot, variable)
+        return await self._run(self._challenge_response(frame, response_len, may_block), timeout)
+
+    def challenge_response_progress(self, challenge, mode='HMAC', slot=1, variable=True, timeout=None):
+        """
+        Start a challenge-response (see challenge_response()), returning a
+        TouchProgress iterating over the seconds left to press the button.
+        """
+        YK = self.yubikey
+        if not YK.capabilities.have_challenge_response(mode):
+            raise yubikey_base.YubiKeyVersionError("%s challenge-response unsupported in YubiKey %s" % (mode, YK.version()) )
+        (frame, response_len) = YK._challenge_frame(challenge, mode, slot, variable)
+        progress = TouchProgress()
+        progress._start(self._run(self._challenge_response(frame, response_len, True, progress._seen),
+                                  timeout))
+        return progress
+
+    async def write_config(self, cfg, slot=1, timeout=None):
+        """ Write a configuration to the YubiKey. """
+        self.yubikey._check_config(cfg, slot)
+        return await self._run(self._write_config(cfg, slot), timeout)
+
+    async def _run(self, coro, timeout):
+        """ Run `coro' holding the device locks, resetting the YubiKey if it is aborted. """
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._exclusive(coro), timeout)
+            except asyncio.TimeoutError:
+                raise yubikey_base.YubiKeyTimeout('Timed out after %s seconds' % timeout)
+
+    async def _exclusive(self, coro):
+        """ Run `coro' holding the (threading) lock of the YubiKeyHIDDevice. """
+        lock = self._device._lock
+        try:
+            while not lock.acquire(blocking=False):
+                await asyncio.sleep(_DEVICE_LOCK_INTERVAL)
+        except BaseException:
+            coro.close()
+            raise
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            # cancelled, or timed out in wait_for()
+            self._abort()
+            raise
+        finally:
+            lock.release()
+
+    def _abort(self):
+        """ Leave any pending response, so that the next operation starts afresh. """
+        try:
+            self._device._raw_write(yubikey_usb_hid._RESET_REPORT)
+        except (IOError, yubikey_usb_hid.YubiKeyUSBHIDError):
+            pass
+
+    async def _status(self):
+        return self._device.status()
+
+    async def _serial(self, may_block):
+        frame = yubikey_frame.YubiKeyFrame(command=SLOT.DEVICE_SERIAL)
+        await self._write(frame)
+        response = await self._read_response(may_block, yubikey_usb_hid._SERIAL_RESPONSE_SIZE)
+        return self.yubikey._parse_serial(response)
+
+    async def _challenge_response(self, frame, response_len, may_block, touch_callback=None):
+        await self._write(frame)
+        response = await self._read_response(may_block, response_len + 2, touch_callback)
+        return response[:response_len]
+
+    async def _write_config(self, cfg, slot):
+        device = self._device
+        old_pgm_seq = device._status.pgm_seq
+        frame = cfg.to_frame(slot=slot)
+        await self._write(frame)
+        await self._waitfor('nand', yubikey_defs.SLOT_WRITE_FLAG, False, command=frame.command)
+        device.status()
+        device._check_pgm_seq(old_pgm_seq, slot)
+
+    async def _write(self, frame):
+        """ Write a YubiKeyFrame, waiting for YubiKey readiness before each report (see YubiKeyHIDDevice._write). """
+        device = self._device
+        device._command = frame.command
+        debug = device.debug or yubikey_usb_hid._log.isEnabledFor(logging.DEBUG)
+        for data in frame._feature_reports(debug=debug):
+            debug_str = None
+            if debug:
+                (data, debug_str) = data
+            if not device._writes.writable():
+                await self._waitfor('nand', yubikey_defs.SLOT_WRITE_FLAG, False)
+            device._raw_write(data, debug_str)
+
+    async def _read_response(self, may_block, length=None, touch_callback=None):
+        """ Wait for a response to become available, and read it (see YubiKeyHIDDevice._read_response). """
+        device = self._device
+        this = await self._waitfor('and', yubikey_defs.RESP_PENDING_FLAG, may_block,
+                                   command=device._command, touch_callback=touch_callback)
+        res = device._read_pending(this, length)
+        device._raw_write(yubikey_usb_hid._RESET_REPORT)
+        await self._waitfor('nand', yubikey_defs.SLOT_WRITE_FLAG, False)
+        return res
+
+    async def _waitfor(self, mode, mask, may_block, timeout=2, command=None, touch_callback=None):
+        """ Wait for the YubiKey to turn ON ('and') or OFF ('nand') the bits in 'mask'. """
+        device = self._device
+        wait = yubikey_usb_hid._StatusWait(device, mode, mask, may_block, timeout, command, touch_callback)
+        for sleep in wait.intervals():
+            if device.instrument is not None:
+                device.instrument.poll(device, command, sleep)
+            await asyncio.sleep(sleep)
+            this = device._read()
+            if wait.done(this):
+                return this
+
+
+class TouchProgress(object):
+    """
+    Async iterator over the seconds left to press the YubiKey button
+    during an operation, as indicated by the YubiKey. The iteration ends
+    when the operation is done, and awaiting the TouchProgress returns
+    its result (or raises its exception).
+
+    Nothing is iterated over if the operation doesn't require the button
+    to be pressed.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self._task,
+            )
+
+    def _start(self, coro):
+        self._task = asyncio.ensure_future(coro)
+        self._task.add_done_callback(lambda task: self._queue.put_nowait(None))
+
+    def _seen(self, seconds_left):
+        if seconds_left is not None:
+            self._queue.put_nowait(seconds_left)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        seconds_left = await self._queue.get()
+        if seconds_left is None:
+            # the operation is done, make sure it is seen again by later iterations
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+        return seconds_left
+
+    def __await__(self):
+        return self._task.__await__()
+
+    def cancel(self):
+        """ Cancel the operation (resetting the YubiKey). """
+        return self._task.cancel()
@@ -17,7 +17,6 @@ __all__ = [
 
 from .yubico_version import __version__
 
-import sys
 import struct
 import binascii
 from . import yubico_util
@@ -25,7 +24,8 @@ from . import yubikey_defs
 from . import yubikey_frame
 from . import yubico_exception
 from . import yubikey_base
-from .yubikey_config_util import YubiKeyConfigBits, YubiKeyConfigFlag, YubiKeyExtendedFlag, YubiKeyTicketFlag
+from .yubikey_config_util import YubiKeyConfigBits, YubiKeyConfigFlag, YubiKeyExtendedFlag, YubiKeyTicketFlag, \
+    YubiKeyFlagFamily
 from .yubikey_defs import SLOT
 
 
@@ -100,6 +100,10 @@ ExtendedFlags = [
     YubiKeyExtendedFlag('DORMANT',		0x40, min_ykver=(2, 3), doc='Dormant configuration (can be woken up and flag removed = requires update flag)'),
     ]
 
+_TICKET_FLAGS = YubiKeyFlagFamily('ticket', TicketFlags)
+_CONFIG_FLAGS = YubiKeyFlagFamily('config', ConfigFlags)
+_EXTENDED_FLAGS = YubiKeyFlagFamily('extended', ExtendedFlags)
+
 
 class YubiKeyConfigError(yubico_exception.YubicoError):
     """
@@ -197,7 +201,7 @@ class YubiKeyConfig(object):
         """
         old = self.fixed
         if data != None:
-            new = self._decode_input_string(data)
+            new = yubico_util.decode_input_string(data)
             if len(new) <= 16:
                 self.fixed = new
             else:
@@ -246,7 +250,7 @@ class YubiKeyConfig(object):
         """
         old = self.key
         if data:
-            new = self._decode_input_string(data)
+            new = yubico_util.decode_input_string(data)
             if len(new) == 16:
                 self.key = new
             else:
@@ -323,7 +327,7 @@ class YubiKeyConfig(object):
         if digits == 8:
             self.config_flag('OATH_HOTP8', True)
         if omp or tt or mui:
-            decoded_mui = self._decode_input_string(mui)
+            decoded_mui = yubico_util.decode_input_string(mui)
             fixed = yubico_util.chr_byte(omp) + yubico_util.chr_byte(tt) + decoded_mui
             self.fixed_string(fixed)
         if factor_seed:
@@ -366,7 +370,7 @@ class YubiKeyConfig(object):
         'which' can be either a string ('APPEND_CR' etc.), or an integer.
         You should ALWAYS use a string, unless you really know what you are doing.
         """
-        flag = _get_flag(which, TicketFlags)
+        flag = _TICKET_FLAGS.get(which)
         if flag:
             if not self.capabilities.have_ticket_flag(flag):
                 raise yubikey_base.YubiKeyVersionError('Ticket flag %s requires %s, and this is %s %d.%d'
@@ -389,7 +393,7 @@ class YubiKeyConfig(object):
         'which' can be either a string ('PACING_20MS' etc.), or an integer.
         You should ALWAYS use a string, unless you really know what you are doing.
         """
-        flag = _get_flag(which, ConfigFlags)
+        flag = _CONFIG_FLAGS.get(which)
         if flag:
             if not self.capabilities.have_config_flag(flag):
                 raise yubikey_base.YubiKeyVersionError('Config flag %s requires %s, and this is %s %d.%d'
@@ -412,7 +416,7 @@ class YubiKeyConfig(object):
         'which' can be either a string ('SERIAL_API_VISIBLE' etc.), or an integer.
         You should ALWAYS use a string, unless you really know what you are doing.
         """
-        flag = _get_flag(which, ExtendedFlags)
+        flag = _EXTENDED_FLAGS.get(which)
         if flag:
             if not self.capabilities.have_extended_flag(flag):
                 raise yubikey_base.YubiKeyVersionError('Extended flag %s requires %s, and this is %s %d.%d'
@@ -505,15 +509,6 @@ class YubiKeyConfig(object):
         if new_ver > self.yk_req_version:
             self.yk_req_version = new_ver
 
-    def _decode_input_string(self, data):
-        if sys.version_info >= (3, 0) and isinstance(data, str):
-            data = data.encode('ascii')
-        if data.startswith(b'm:'):
-            data = b'h:' + yubico_util.modhex_decode(data[2:])
-        if data.startswith(b'h:'):
-            return(binascii.unhexlify(data[2:]))
-        else:
-            return(data)
 
     def _change_mode(self, mode, major, minor):
         """ Change mode of operation, with some sanity checks. """
@@ -545,13 +540,3 @@ class YubiKeyConfig(object):
             self.uid = new[16:]
         else:
             raise yubico_exception.InputError('HMAC key must be exactly 20 bytes')
-
-
-def _get_flag(which, flags):
-    """ Find 'which' entry in 'flags'. """
-    res = [this for this in flags if this.is_equal(which)]
-    if len(res) == 0:
-        return None
-    if len(res) == 1:
-        return res[0]
-    assert()
@@ -0,0 +1,366 @@
+"""
+module for compiling a configuration for many YubiKeys at once
+
+When programming a batch of YubiKeys that only differ in a few fields
+(secrets, public IDs, access codes), building a YubiKeyConfig and a
+YubiKeyFrame per YubiKey is needlessly slow. A YubiKeyConfigBatch takes a
+template configuration and the per-key fields, and produces the config
+structures, frame payloads, CRCs and feature reports of all the YubiKeys
+in a few flat buffers. NumPy is used for this if it is installed.
+
+Every entry of the result can be passed to write_config() as is.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_config_batch import YubiKeyConfigBatch
+
+    template = YK.init_config()
+    template.mode_yubikey_otp(b'h:000000000000', b'h:' + b'0' * 32)
+    template.ticket_flag('APPEND_CR', True)
+    batch = YubiKeyConfigBatch(template, slot=1)
+    configs = batch.compile(uid=uids, aes_key=keys, fixed=public_ids)
+    for cfg in configs:
+        YK = wait_for_next_yubikey()
+        YK.write_config(cfg, slot=1)
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    # classes
+    'YubiKeyConfigBatch',
+    'CompiledConfigs',
+    'CompiledConfig',
+]
+
+import struct
+
+from .yubico_version import __version__
+from . import yubico_util
+from . import yubico_exception
+from . import yubikey_defs
+from . import yubikey_frame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# layout of struct config_st (see YubiKeyConfig.to_string())
+_FIXED = (0, 16)
+_UID = (16, 22)
+_KEY = (22, 38)
+_ACC_CODE = (38, 44)
+_FIXED_SIZE = 44
+_CONFIG_CRC = 50
+
+_PAYLOAD_SIZE = 64
+_FRAME_SIZE = yubikey_frame._FRAME_SIZE
+_NUM_REPORTS = yubikey_frame._NUM_REPORTS
+_REPORT_SIZE = yubikey_frame._REPORT_SIZE
+_REPORT_DATA_SIZE = yubikey_frame._REPORT_DATA_SIZE
+_REPORTS_SIZE = _NUM_REPORTS * _REPORT_SIZE
+
+# per-key fields : (offset, size, fixed size)
+_FIELDS = {
+    'uid': (_UID[0], _UID[1] - _UID[0], True),
+    'aes_key': (_KEY[0], _KEY[1] - _KEY[0], True),
+    'access_code': (_ACC_CODE[0], _ACC_CODE[1] - _ACC_CODE[0], True),
+    'fixed': (_FIXED[0], _FIXED[1] - _FIXED[0], False),
+}
+
+
+class YubiKeyConfigBatch(object):
+    """
+    Compiles a template YubiKeyConfig for many YubiKeys.
+
+    Attributes :
+        template  -- the YubiKeyConfig with the settings shared by all keys
+        slot      -- slot the configurations are for
+        use_numpy -- use NumPy (True/False), or None to use it if installed
+    """
+
+    def __init__(self, template, slot=1, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise yubico_exception.InputError('NumPy is not installed')
+        self.template = template
+        self.slot = slot
+        self.use_numpy = use_numpy
+        # also checks the slot
+        frame = template.to_frame(slot=slot)
+        self.command = frame.command
+        self._payload = frame.payload
+        if frame.command not in yubikey_frame._CONFIG_COMMANDS or frame.command == yubikey_defs.SLOT.SWAP \
+                or frame.payload is yubikey_frame._EMPTY_PAYLOAD:
+            raise yubico_exception.InputError('Template is not a configuration (command 0x%02x)' % frame.command)
+
+    def __repr__(self):
+        return '<%s instance at %s: slot %i, command 0x%02x>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.slot,
+            self.command,
+            )
+
+    def compile(self, uid=None, aes_key=None, fixed=None, access_code=None):
+        """
+        Compile the configurations of a batch of YubiKeys.
+
+        Each argument is either None (keep the template value), a sequence
+        of bytestrings (one per key) or a 2-dimensional uint8 array with one
+        row per key. Fields of fixed size (uid 6 bytes, aes_key 16 bytes,
+        access_code 6 bytes) must have exactly that size. fixed is 0..16
+        bytes, and must be a sequence to vary in length between keys.
+
+        Returns a CompiledConfigs.
+        """
+        fields = {'uid': uid, 'aes_key': aes_key, 'access_code': access_code, 'fixed': fixed}
+        fields = dict((name, value) for (name, value) in fields.items() if value is not None)
+        counts = set(len(value) for value in fields.values())
+        if len(counts) > 1:
+            raise yubico_exception.InputError('Per-key fields of different lengths (%s)' % sorted(counts))
+        if not counts:
+            raise yubico_exception.InputError('No per-key fields')
+        count = counts.pop()
+        if self.use_numpy:
+            return self._compile_numpy(count, fields)
+        return self._compile_python(count, fields)
+
+    def _compile_python(self, count, fields):
+        payloads = bytearray(self._payload * count)
+        for (name, values) in fields.items():
+            (offset, size, fixed_size) = _FIELDS[name]
+            for (i, value) in enumerate(values):
+                value = bytes(bytearray(value))
+                _check_size(name, value, size, fixed_size)
+                pos = i * _PAYLOAD_SIZE + offset
+                payloads[pos:pos + size] = value.ljust(size, b'\x00')
+                if not fixed_size:
+                    payloads[i * _PAYLOAD_SIZE + _FIXED_SIZE] = len(value)
+
+        tail = struct.pack('<B', self.command)
+        view = memoryview(payloads)
+        crcs = []
+        reports = bytearray(_REPORTS_SIZE * count)
+        sent = []
+        for i in range(count):
+            pos = i * _PAYLOAD_SIZE
+            config_crc = 0xffff - yubico_util.crc16(view[pos:pos + _CONFIG_CRC])
+            struct.pack_into('<H', payloads, pos + _CONFIG_CRC, config_crc)
+            crc = yubico_util.crc16(view[pos:pos + _PAYLOAD_SIZE])
+            crcs.append(crc)
+            data = bytes(payloads[pos:pos + _PAYLOAD_SIZE]) + tail + struct.pack('<H', crc) + b'\x00' * 3
+            these = []
+            for seq in range(_NUM_REPORTS):
+                start = seq * _REPORT_DATA_SIZE
+                if 0 < seq < _NUM_REPORTS - 1 and \
+                        data.count(b'\x00', start, start + _REPORT_DATA_SIZE) == _REPORT_DATA_SIZE:
+                    continue
+                offset = i * _REPORTS_SIZE + seq * _REPORT_SIZE
+                reports[offset:offset + _REPORT_DATA_SIZE] = data[start:start + _REPORT_DATA_SIZE]
+                reports[offset + _REPORT_DATA_SIZE] = yubikey_defs.SLOT_WRITE_FLAG + seq
+                these.append(seq)
+            sent.append(these)
+        return CompiledConfigs(self, count, payloads, crcs, reports, sent)
+
+    def _compile_numpy(self, count, fields):
+        template = numpy.frombuffer(self._payload, dtype=numpy.uint8)
+        payloads = numpy.tile(template, (count, 1))
+        for (name, values) in fields.items():
+            (offset, size, fixed_size) = _FIELDS[name]
+            if isinstance(values, numpy.ndarray):
+                if values.ndim != 2 or values.shape[1] > size or (fixed_size and values.shape[1] != size):
+                    raise yubico_exception.InputError('%s must be %s%i bytes (got shape %s)'
+                                                      % (name, '' if fixed_size else '0..', size, values.shape))
+                width = values.shape[1]
+                payloads[:, offset:offset + width] = values
+                payloads[:, offset + width:offset + size] = 0
+                if not fixed_size:
+                    payloads[:, _FIXED_SIZE] = width
+                continue
+            for (i, value) in enumerate(values):
+                value = bytes(bytearray(value))
+                _check_size(name, value, size, fixed_size)
+                payloads[i, offset:offset + size] = numpy.frombuffer(value.ljust(size, b'\x00'), dtype=numpy.uint8)
+                if not fixed_size:
+                    payloads[i, _FIXED_SIZE] = len(value)
+
+        config_crc = 0xffff - _crc16_rows(payloads[:, :_CONFIG_CRC])
+        payloads[:, _CONFIG_CRC] = config_crc & 0xff
+        payloads[:, _CONFIG_CRC + 1] = config_crc >> 8
+        crcs = _crc16_rows(payloads)
+
+        frames = numpy.zeros((count, _FRAME_SIZE), dtype=numpy.uint8)
+        frames[:, :_PAYLOAD_SIZE] = payloads
+        frames[:, _PAYLOAD_SIZE] = self.command
+        frames[:, _PAYLOAD_SIZE + 1] = crcs & 0xff
+        frames[:, _PAYLOAD_SIZE + 2] = crcs >> 8
+        frames = frames.reshape(count, _NUM_REPORTS, _REPORT_DATA_SIZE)
+
+        reports = numpy.zeros((count, _NUM_REPORTS, _REPORT_SIZE), dtype=numpy.uint8)
+        send = frames.any(axis=2)
+        send[:, 0] = True
+        send[:, -1] = True
+        reports[:, :, :_REPORT_DATA_SIZE] = frames
+        reports[:, :, _REPORT_DATA_SIZE] = yubikey_defs.SLOT_WRITE_FLAG + numpy.arange(_NUM_REPORTS)
+        reports[~send] = 0
+        sent = [numpy.flatnonzero(row).tolist() for row in send]
+        return CompiledConfigs(self, count, payloads.reshape(-1), crcs.tolist(), reports.reshape(-1), sent)
+
+
+class CompiledConfigs(object):
+    """
+    The configurations of a batch of YubiKeys, as produced by
+    YubiKeyConfigBatch.compile().
+
+    The buffers are flat, with a fixed size per key (NumPy arrays if NumPy
+    was used, otherwise bytearrays) :
+
+    Attributes :
+        count    -- number of YubiKeys
+        command  -- SLOT command of the frames
+        payloads -- 64 byte frame payloads (config_st and unlock code)
+        crcs     -- list of frame payload CRCs
+        reports  -- 80 bytes of feature reports per key, with the
+                    reports not sent (all zero) left zero
+        sent     -- list of the sequence numbers of the reports to send,
+                    per key
+    """
+
+    def __init__(self, batch, count, payloads, crcs, reports, sent):
+        self.batch = batch
+        self.count = count
+        self.command = batch.command
+        self.payloads = payloads
+        self.crcs = crcs
+        self.reports = reports
+        self.sent = sent
+        self._reports = memoryview(reports)
+
+    def __repr__(self):
+        return '<%s instance at %s: %i configurations, command 0x%02x>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.count,
+            self.command,
+            )
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('configuration index out of range')
+        return CompiledConfig(self, index)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield CompiledConfig(self, index)
+
+    def payload(self, index):
+        """ Return the 64 byte frame payload of a key, as bytes. """
+        pos = index * _PAYLOAD_SIZE
+        return memoryview(self.payloads)[pos:pos + _PAYLOAD_SIZE].tobytes()
+
+    def feature_reports(self, index):
+        """ Return the feature reports to send to a key, as memoryviews. """
+        pos = index * _REPORTS_SIZE
+        view = self._reports
+        return [view[pos + seq * _REPORT_SIZE:pos + (seq + 1) * _REPORT_SIZE] for seq in self.sent[index]]
+
+    def iter_reports(self):
+        """ Iterate over the feature reports to send to each key (see feature_reports()). """
+        for index in range(self.count):
+            yield self.feature_reports(index)
+
+
+class CompiledConfig(object):
+    """
+    One configuration of a CompiledConfigs, usable as a YubiKeyConfig with
+    write_config() : it has version_required() and to_frame().
+    """
+
+    def __init__(self, configs, index):
+        self.configs = configs
+        self.index = index
+
+    def __repr__(self):
+        return '<%s instance at %s: %i of %i, command 0x%02x>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.index,
+            self.configs.count,
+            self.configs.command,
+            )
+
+    def version_required(self):
+        """ Return the (major, minor) versions of YubiKey required for this configuration. """
+        return self.configs.batch.template.version_required()
+
+    def to_string(self):
+        """ Return the frame payload (config_st and unlock code), always 64 bytes. """
+        return self.configs.payload(self.index)
+
+    def to_frame(self, slot=None):
+        """ Return a frame with the feature reports of this configuration. """
+        if slot is not None and slot != self.configs.batch.slot:
+            raise yubico_exception.InputError('Configuration compiled for slot %i, not %i'
+                                              % (self.configs.batch.slot, slot))
+        return _CompiledFrame(self.configs, self.index)
+
+
+class _CompiledFrame(object):
+    """ The frame of a CompiledConfig, used like a YubiKeyFrame by YubiKeyHIDDevice. """
+
+    def __init__(self, configs, index):
+        self.command = configs.command
+        self.crc = configs.crcs[index]
+        self._configs = configs
+        self._index = index
+
+    @property
+    def payload(self):
+        return self._configs.payload(self._index)
+
+    def to_feature_reports(self, debug=False):
+        """ Return the feature reports of the frame, as bytes (see YubiKeyFrame.to_feature_reports()). """
+        if debug:
+            return [(data.tobytes(), annotation) for (data, annotation) in self._feature_reports(debug)]
+        return [data.tobytes() for data in self._feature_reports()]
+
+    def _feature_reports(self, debug=False):
+        """ Like to_feature_reports(), but with memoryviews of the batch buffer, for writing. """
+        reports = self._configs.feature_reports(self._index)
+        if debug:
+            return [(data, yubikey_frame._CONFIG_ANNOTATIONS.get(yubico_util.ord_byte(data[-1])
+                                                                 - yubikey_defs.SLOT_WRITE_FLAG, ''))
+                    for data in reports]
+        return reports
+
+
+def _check_size(name, value, size, fixed_size):
+    if (fixed_size and len(value) != size) or len(value) > size:
+        raise yubico_exception.InputError('%s must be %s%i bytes (got %i)'
+                                          % (name, '' if fixed_size else '0..', size, len(value)))
+
+
+_CRC_TABLE_NUMPY = None
+
+
+def _crc16_rows(rows):
+    """ ISO13239 CRC of each row of a 2-dimensional uint8 array. """
+    global _CRC_TABLE_NUMPY
+    if _CRC_TABLE_NUMPY is None:
+        _CRC_TABLE_NUMPY = numpy.array(yubico_util._CRC_TABLE, dtype=numpy.uint32)
+    table = _CRC_TABLE_NUMPY
+    crc = numpy.full(rows.shape[0], 0xffff, dtype=numpy.uint32)
+    for column in rows.T:
+        crc = (crc >> 8) ^ table[(crc ^ column) & 0xff]
+    return crc
@@ -7,19 +7,30 @@ utility functions used in yubikey_config.
 __all__ = [
     # constants
     # functions
+    'compatible_flags',
     # classes
     'YubiKeyConfigBits',
     'YubiKeyConfigFlag',
     'YubiKeyExtendedFlag',
     'YubiKeyTicketFlag',
+    'YubiKeyFlagFamily',
 ]
 
+import threading
+from collections import OrderedDict
+
+# number of (family, model, version) compatibility bitmasks kept
+_COMPATIBLE_CACHE_SIZE = 128
+
 
 class YubiKeyFlag(object):
     """
     A flag value, and associated metadata.
     """
 
+    __slots__ = ('key', 'value', 'doc', 'min_ykver', 'max_ykver', 'models',
+                 'family', 'bit')
+
     def __init__(self, key, value, doc=None, min_ykver=(0, 0), max_ykver=None, models=['YubiKey', 'YubiKey NEO', 'YubiKey 4']):
         """
         Metadata about a ticket/config/extended flag bit.
@@ -46,6 +57,9 @@ class YubiKeyFlag(object):
         self.min_ykver = min_ykver
         self.max_ykver = max_ykver
         self.models = models
+        # set when added to a YubiKeyFlagFamily
+        self.family = None
+        self.bit = 0
 
         return None
 
@@ -85,6 +99,12 @@ class YubiKeyFlag(object):
 
     def is_compatible(self, model, version):
         """ Check if this flag is compatible with a YubiKey of version 'ver'. """
+        if self.family is not None:
+            return bool(compatible_flags(self.family, model, version) & self.bit)
+        return self._is_compatible(model, version)
+
+    def _is_compatible(self, model, version):
+        """ Check compatibility from the metadata of this flag. """
         if not model in self.models:
             return False
         if self.max_ykver:
@@ -99,12 +119,16 @@ class YubiKeyTicketFlag(YubiKeyFlag):
     A ticket flag value, and associated metadata.
     """
 
+    __slots__ = ()
+
 
 class YubiKeyConfigFlag(YubiKeyFlag):
     """
     A config flag value, and associated metadata.
     """
 
+    __slots__ = ('mode',)
+
     def __init__(self, key, value, mode='', doc=None, min_ykver=(0, 0), max_ykver=None):
         if type(mode) is not str:
             assert()
@@ -118,6 +142,8 @@ class YubiKeyExtendedFlag(YubiKeyFlag):
     An extended flag value, and associated metadata.
     """
 
+    __slots__ = ('mode',)
+
     def __init__(self, key, value, mode='', doc=None, min_ykver=(2, 2), max_ykver=None):
         if type(mode) is not str:
             assert()
@@ -126,10 +152,99 @@ class YubiKeyExtendedFlag(YubiKeyFlag):
         super(YubiKeyExtendedFlag, self).__init__(key, value, doc=doc, min_ykver=min_ykver, max_ykver=max_ykver)
 
 
+class YubiKeyFlagFamily(object):
+    """
+    The ticket, config or extended flags, indexed.
+
+    Flags are looked up by name in a dict, and the flags compatible with a
+    YubiKey are given by a bitmask (see compatible_flags()) with the `bit'
+    of each flag set, in the order of `flags'.
+    """
+
+    def __init__(self, name, flags):
+        self.name = name
+        self.flags = tuple(flags)
+        self._by_key = {}
+        for (index, flag) in enumerate(self.flags):
+            if flag.key in self._by_key or flag.family is not None:
+                assert()
+            self._by_key[flag.key] = flag
+            flag.family = self
+            flag.bit = 1 << index
+
+    def __repr__(self):
+        return '<%s instance at %s: %s (%i flags)>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.name,
+            len(self.flags),
+            )
+
+    def get(self, which):
+        """ Return the flag named 'which', or None. """
+        try:
+            return self._by_key.get(which)
+        except TypeError:
+            # unhashable
+            return None
+
+    def mask(self, model, version):
+        """ Compute the bitmask of the flags compatible with a model and version. """
+        res = 0
+        for flag in self.flags:
+            if flag._is_compatible(model, version):
+                res |= flag.bit
+        return res
+
+
+class _LRUCache(object):
+    """ A dict of at most `size' entries, dropping the least recently used. """
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """ Return the value for `key', calling compute(*key) if it isn't cached. """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                value = compute(*key)
+                if len(self._data) >= self.size:
+                    self._data.popitem(last=False)
+            self._data[key] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_COMPATIBLE = _LRUCache(_COMPATIBLE_CACHE_SIZE)
+
+
+def _compatible_mask(family, model, version):
+    return family.mask(model, version)
+
+
+def compatible_flags(family, model, version):
+    """
+    Return the bitmask of the flags in a YubiKeyFlagFamily that are
+    compatible with a YubiKey model and version. Computed once per
+    (family, model, version), in a cache shared by everyone.
+    """
+    return _COMPATIBLE.get((family, model, tuple(version)), _compatible_mask)
+
+
 class YubiKeyConfigBits(object):
     """
     Class to hold bit values for configuration.
     """
+
+    __slots__ = ('value',)
+
     def __init__(self, default=0x0):
         self.value = default
         return None
@@ -0,0 +1,420 @@
+"""
+module emulating a USB HID YubiKey in software
+
+YubiKeyEmulator speaks the YubiKey side of the HID feature report protocol
+(the same controlMsg() calls as a pyusb device handle), so the whole
+transport in yubikey_usb_hid can be exercised, tested and benchmarked
+without a YubiKey attached. Supported are status reads, serial number,
+HMAC-SHA1 and Yubico OTP challenge-response (the latter with the
+`cryptography' package, see yubico_aes), configuration writes
+(with pgm_seq, access codes, update, swap and zap) and YubiKey 4
+capabilities. How long each command takes can be configured.
+
+Example usage :
+
+    from yubico import yubikey_emulator
+
+    emulator = yubikey_emulator.YubiKeyEmulator(version=(4, 3, 7), serial=1234567)
+    cfg = yubico.yubikey_config.YubiKeyConfig()
+    cfg.mode_challenge_response(b'h:303132333435363738393a3b3c3d3e3f40414243')
+    emulator.load_config(2, cfg)
+
+    YK = yubikey_emulator.emulate(emulator)
+    print YK.challenge_response(b'Sample #2', slot=2)
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'TYPICAL_LATENCY',
+    # functions
+    'emulate',
+    # classes
+    'YubiKeyEmulator',
+    'YubiKeyEmulatorError',
+    'EmulatedHIDDevice',
+]
+
+import hmac
+import struct
+import hashlib
+import time
+import os
+
+from .yubico_version import __version__
+from . import yubico_util
+from . import yubico_exception
+from . import yubikey_defs
+from . import yubikey_usb_hid
+from . import yubikey_transport
+from . import yubico_aes
+from .yubikey_defs import SLOT, YK4_CAPA, SLOT_WRITE_FLAG, RESP_PENDING_FLAG, \
+    RESP_TIMEOUT_WAIT_FLAG
+
+# monotonic clock, where available
+_now = getattr(time, 'monotonic', time.time)
+
+# Rough estimates of how long a YubiKey takes to process each command, in
+# seconds. Measure your own YubiKey before drawing conclusions from these.
+TYPICAL_LATENCY = {
+    SLOT.CHAL_HMAC1: 0.013,
+    SLOT.CHAL_HMAC2: 0.013,
+    SLOT.CHAL_OTP1: 0.008,
+    SLOT.CHAL_OTP2: 0.008,
+    SLOT.DEVICE_SERIAL: 0.002,
+    SLOT.YK4_CAPABILITIES: 0.002,
+    SLOT.CONFIG: 0.050,
+    SLOT.CONFIG2: 0.050,
+}
+
+# from ykdef.h, layout of config_st
+_CONFIG_FMT = '<16s6s16s6sBBBBH'
+_CONFIG_SIZE = 52
+_ACC_CODE_SIZE = 6
+
+_TKTFLAG_CHAL_RESP = 0x40
+_CFGFLAG_CHAL_MASK = 0x22
+_CFGFLAG_CHAL_HMAC = 0x22
+_CFGFLAG_CHAL_YUBICO = 0x20
+_CFGFLAG_HMAC_LT64 = 0x04
+_CFGFLAG_CHAL_BTN_TRIG = 0x08
+
+# seconds to wait for a button press
+_BUTTON_TIMEOUT = 15
+
+_CMD_SLOT = {
+    SLOT.CHAL_HMAC1: 1,
+    SLOT.CHAL_HMAC2: 2,
+    SLOT.CHAL_OTP1: 1,
+    SLOT.CHAL_OTP2: 2,
+    SLOT.CONFIG: 1,
+    SLOT.CONFIG2: 2,
+    SLOT.UPDATE1: 1,
+    SLOT.UPDATE2: 2,
+}
+
+
+class YubiKeyEmulatorError(yubico_exception.YubicoError):
+    """ Exception raised when the host breaks the protocol (in strict mode). """
+
+
+class YubiKeyEmulator(object):
+    """
+    A software YubiKey, answering HID feature report requests.
+
+    Attributes :
+        version       -- firmware version (major, minor, build)
+        serial        -- serial number
+        capabilities  -- YubiKey 4 capability bits (YK4_CAPA)
+        latency       -- seconds each command takes, either a number or a
+                         dict of SLOT commands (missing ones take no time)
+        write_latency -- seconds SLOT_WRITE_FLAG stays set after each report
+        touch_after   -- seconds until the button is pressed when a command
+                         requires it (None to never press it, see touch())
+        strict        -- raise YubiKeyEmulatorError when the host writes
+                         while SLOT_WRITE_FLAG is set, instead of dropping
+                         the report like a YubiKey does
+        clock         -- function returning the current time in seconds
+    """
+
+    def __init__(self, version=(4, 3, 7), serial=1234567,
+                 capabilities=YK4_CAPA.OTP | YK4_CAPA.U2F | YK4_CAPA.CCID,
+                 latency=None, write_latency=0.0, touch_after=None, strict=False,
+                 clock=_now):
+        self.version = tuple(version)
+        self.serial = serial
+        self.capabilities = capabilities
+        if latency is None:
+            latency = {}
+        self.latency = latency
+        self.write_latency = write_latency
+        self.touch_after = touch_after
+        self.strict = strict
+        self.clock = clock
+
+        self.pgm_seq = 0
+        self.configs = {1: None, 2: None}
+        self.other = {}          # NDEF, DEVICE_CONFIG and SCAN_MAP payloads
+        self.use_counter = 1     # Yubico OTP counters
+        self.session_counter = 0
+        self.reads = 0           # feature reports read by the host
+        self.writes = 0          # feature reports written by the host
+        self.overruns = 0        # reports written while SLOT_WRITE_FLAG was set
+
+        self._frame = bytearray(70)
+        self._write_busy_until = 0
+        self._response = None
+        self._response_pos = 0
+        self._pending_at = 0
+        self._touch_started = None
+        self._touch_deadline = None
+        self._touched_at = None
+
+    def __repr__(self):
+        return '<%s instance at %s: version %s, serial %s, pgm_seq %i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            '.'.join(str(x) for x in self.version),
+            self.serial,
+            self.pgm_seq,
+            )
+
+    def load_config(self, slot, cfg):
+        """ Program `slot' with a YubiKeyConfig, as if written by the host. """
+        self._store_config(slot, cfg.to_string()[:_CONFIG_SIZE])
+
+    def touch(self):
+        """ Press the button, if a command is waiting for it. """
+        if self._touch_deadline is not None:
+            self._touched_at = self.clock()
+
+    # usb.legacy.DeviceHandle interface
+
+    def controlMsg(self, requestType, request, buffer, value=0, index=0, timeout=100):
+        """ Handle a GET_REPORT or SET_REPORT control transfer. """
+        if value != yubikey_transport._REPORT_TYPE_FEATURE << 8:
+            raise YubiKeyEmulatorError('Not a feature report request (value 0x%x)' % value)
+        if request == yubikey_transport._HID_GET_REPORT:
+            if requestType & yubikey_transport._USB_ENDPOINT_IN != yubikey_transport._USB_ENDPOINT_IN:
+                raise YubiKeyEmulatorError('GET_REPORT with OUT direction')
+            return bytearray(self._get_report())[:buffer]
+        if request == yubikey_transport._HID_SET_REPORT:
+            data = bytearray(buffer)
+            if len(data) != yubikey_transport._FEATURE_RPT_SIZE:
+                raise YubiKeyEmulatorError('SET_REPORT of %i bytes' % len(data))
+            self._set_report(data)
+            return len(data)
+        raise YubiKeyEmulatorError('Unknown HID request 0x%x' % request)
+
+    def claimInterface(self, interface):
+        pass
+
+    def releaseInterface(self):
+        pass
+
+    def setConfiguration(self, configuration):
+        pass
+
+    def detachKernelDriver(self, interface):
+        pass
+
+    # protocol
+
+    def _status(self, flags=0):
+        touch_level = 0
+        if self.configs[1] is not None:
+            touch_level |= yubikey_usb_hid.YubiKeyUSBHIDStatus.CONFIG1_VALID
+        if self.configs[2] is not None:
+            touch_level |= yubikey_usb_hid.YubiKeyUSBHIDStatus.CONFIG2_VALID
+        major, minor, build = self.version
+        return struct.pack('<xBBBBHB', major, minor, build, self.pgm_seq, touch_level, flags)
+
+    def _get_report(self):
+        self.reads += 1
+        now = self.clock()
+        flags = 0
+        if now < self._write_busy_until:
+            flags |= SLOT_WRITE_FLAG
+        if self._response is not None:
+            if self._touch_deadline is not None:
+                if self.touch_after is not None and self._touched_at is None and \
+                        now >= self._touch_started + self.touch_after:
+                    self._touched_at = now
+                if self._touched_at is None:
+                    if now >= self._touch_deadline:
+                        # timed out waiting for the button
+                        self._response = None
+                        self._touch_deadline = None
+                        return self._status(flags)
+                    seconds_left = int(self._touch_deadline - now) + 1
+                    return self._status(flags | RESP_TIMEOUT_WAIT_FLAG | min(seconds_left, yubikey_defs.RESP_TIMEOUT_WAIT_MASK))
+                self._pending_at = max(self._pending_at, self._touched_at)
+                self._touch_deadline = None
+            if now >= self._pending_at:
+                report = self._response[self._response_pos]
+                self._response_pos = (self._response_pos + 1) % len(self._response)
+                return report
+        return self._status(flags)
+
+    def _set_report(self, data):
+        self.writes += 1
+        now = self.clock()
+        if now < self._write_busy_until:
+            self.overruns += 1
+            if self.strict:
+                raise YubiKeyEmulatorError('Report written while SLOT_WRITE_FLAG set')
+            return
+        self._write_busy_until = now + self.write_latency
+        flags = data[7]
+        if flags == (SLOT_WRITE_FLAG | 0x0f):
+            # dummy write, resetting read mode
+            self._response = None
+            self._touch_deadline = None
+            return
+        if not flags & SLOT_WRITE_FLAG:
+            return
+        seq = flags & 0x1f
+        if seq == 0:
+            self._frame = bytearray(70)
+        if seq > 9:
+            return
+        self._frame[seq * 7:seq * 7 + 7] = data[:7]
+        if seq == 9:
+            frame, self._frame = bytes(self._frame), bytearray(70)
+            payload, command, crc = struct.unpack('<64sBH3x', frame)
+            if crc != yubico_util.crc16(payload):
+                return
+            self._execute(command, payload, now)
+
+    def _latency(self, command):
+        if isinstance(self.latency, dict):
+            return self.latency.get(command, 0.0)
+        return self.latency
+
+    def _execute(self, command, payload, now):
+        done = now + self._latency(command)
+        self._response = None
+        if command in (SLOT.CONFIG, SLOT.CONFIG2, SLOT.UPDATE1, SLOT.UPDATE2, SLOT.SWAP):
+            self._write_config(command, payload)
+            self._write_busy_until = max(self._write_busy_until, done)
+        elif command in (SLOT.NDEF, SLOT.NDEF2, SLOT.DEVICE_CONFIG, SLOT.SCAN_MAP):
+            self.other[command] = payload
+            self.pgm_seq += 1
+            self._write_busy_until = max(self._write_busy_until, done)
+        elif command == SLOT.DEVICE_SERIAL:
+            self._respond(struct.pack('>L', self.serial), done)
+        elif command == SLOT.YK4_CAPABILITIES and self.version >= (4, 1, 0):
+            tlv = struct.pack('>BBB', YK4_CAPA.TAG.CAPA, 1, self.capabilities) + \
+                struct.pack('>BBL', YK4_CAPA.TAG.SERIAL, 4, self.serial)
+            self._respond(struct.pack('B', len(tlv)) + tlv, done)
+        elif command in (SLOT.CHAL_HMAC1, SLOT.CHAL_HMAC2, SLOT.CHAL_OTP1, SLOT.CHAL_OTP2):
+            self._challenge(command, payload, done)
+
+    def _respond(self, data, done, touch=False):
+        """ Make data (with CRC appended) available as response at time `done'. """
+        data += struct.pack('<H', 0xffff - yubico_util.crc16(data))
+        data = data.ljust((len(data) + 6) // 7 * 7, b'\x00')
+        self._response = [data[i:i + 7] + struct.pack('B', RESP_PENDING_FLAG | (i // 7))
+                          for i in range(0, len(data), 7)]
+        self._response_pos = 0
+        # the response is computed after the last report has been processed
+        self._pending_at = max(done, self._write_busy_until)
+        self._touched_at = None
+        self._touch_deadline = None
+        if touch:
+            self._touch_started = self.clock()
+            self._touch_deadline = self._touch_started + _BUTTON_TIMEOUT
+
+    def _challenge(self, command, payload, done):
+        config = self.configs[_CMD_SLOT[command]]
+        if config is None or not config['tkt_flags'] & _TKTFLAG_CHAL_RESP:
+            return
+        chal_mode = config['cfg_flags'] & _CFGFLAG_CHAL_MASK
+        touch = bool(config['cfg_flags'] & _CFGFLAG_CHAL_BTN_TRIG)
+        if command in (SLOT.CHAL_HMAC1, SLOT.CHAL_HMAC2):
+            if chal_mode != _CFGFLAG_CHAL_HMAC:
+                return
+            challenge = payload
+            if config['cfg_flags'] & _CFGFLAG_HMAC_LT64:
+                # variable length, the last byte value is padding
+                challenge = payload.rstrip(payload[-1:])
+            secret = config['key'] + config['uid'][:4]
+            self._respond(hmac.new(secret, challenge, hashlib.sha1).digest(), done, touch)
+        else:
+            if chal_mode != _CFGFLAG_CHAL_YUBICO:
+                return
+            self._respond(self._otp_ticket(config, payload[:yubikey_defs.UID_SIZE]), done, touch)
+
+    def _otp_ticket(self, config, uid):
+        """ Return an encrypted Yubico OTP ticket with `uid' in it. """
+        self.session_counter = (self.session_counter + 1) & 0xff
+        timestamp = int(self.clock() * 8) & 0xffffff
+        ticket = uid + struct.pack('<HHBBH', self.use_counter, timestamp & 0xffff,
+                                   timestamp >> 16, self.session_counter,
+                                   struct.unpack('<H', os.urandom(2))[0])
+        ticket += struct.pack('<H', 0xffff - yubico_util.crc16(ticket))
+        return yubico_aes.AES128(config['key']).encrypt_block(ticket)
+
+    def _write_config(self, command, payload):
+        if command == SLOT.SWAP:
+            self.configs[1], self.configs[2] = self.configs[2], self.configs[1]
+            self.pgm_seq += 1
+            return
+        slot = _CMD_SLOT[command]
+        old = self.configs[slot]
+        unlock_code = payload[_CONFIG_SIZE:_CONFIG_SIZE + _ACC_CODE_SIZE]
+        if old is not None and old['acc_code'] != b'\x00' * _ACC_CODE_SIZE and \
+                old['acc_code'] != unlock_code:
+            # wrong access code, refused (pgm_seq doesn't change)
+            return
+        config = payload[:_CONFIG_SIZE]
+        if command in (SLOT.UPDATE1, SLOT.UPDATE2):
+            if old is None or not yubico_util.validate_crc16(config):
+                return
+            new = self._parse_config(config)
+            old.update(dict((k, new[k]) for k in ('acc_code', 'ext_flags', 'tkt_flags', 'cfg_flags')))
+            self.pgm_seq += 1
+            return
+        if not any(bytearray(payload)):
+            # zap
+            self.configs[slot] = None
+            if self.configs[1] is None and self.configs[2] is None:
+                self.pgm_seq = 0
+            else:
+                self.pgm_seq += 1
+            return
+        if not yubico_util.validate_crc16(config):
+            return
+        self._store_config(slot, config)
+
+    def _store_config(self, slot, config):
+        self.configs[slot] = self._parse_config(config)
+        self.pgm_seq += 1
+
+    @staticmethod
+    def _parse_config(config):
+        (fixed, uid, key, acc_code, fixed_size, ext_flags, tkt_flags, cfg_flags, _rfu) = \
+            struct.unpack(_CONFIG_FMT, config[:_CONFIG_SIZE - 2])
+        return {'fixed': fixed[:fixed_size],
+                'uid': uid,
+                'key': key,
+                'acc_code': acc_code,
+                'ext_flags': ext_flags,
+                'tkt_flags': tkt_flags,
+                'cfg_flags': cfg_flags,
+                }
+
+
+class EmulatedHIDDevice(yubikey_usb_hid.YubiKeyHIDDevice):
+    """
+    YubiKeyHIDDevice talking to a YubiKeyEmulator instead of a USB device.
+
+    Pass it as `hid_device' to YubiKeyUSBHID, YubiKeyNEO_USBHID or
+    YubiKey4_USBHID (or use emulate()).
+    """
+
+    def __init__(self, emulator=None, debug=False, poller=None, instrument=None, conformance=False):
+        if emulator is None:
+            emulator = YubiKeyEmulator()
+        self.emulator = emulator
+        super(EmulatedHIDDevice, self).__init__(debug, poller=poller, instrument=instrument,
+                                                conformance=conformance)
+
+    def _open(self, skip=0):
+        self._transport = yubikey_transport.ControlMsgTransport(self.emulator)
+        return True
+
+    def _close(self):
+        self._transport = None
+        return True
+
+
+def emulate(emulator=None, debug=False, poller=None, instrument=None, conformance=False):
+    """
+    Return a YubiKey object of the right class for the emulator's version,
+    like find_key() does for real YubiKeys.
+    """
+    from . import yubikey
+    hid_device = EmulatedHIDDevice(emulator, debug, poller, instrument, conformance)
+    return yubikey.key_class(hid_device.status().ykver())(debug, 0, hid_device)
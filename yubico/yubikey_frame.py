@@ -20,7 +20,47 @@ from .yubico_version import __version__
 
 from .yubikey_defs import SLOT
 
-class YubiKeyFrame:
+# size of a frame (see to_string()), and of its feature reports
+_FRAME_SIZE = 70
+_REPORT_DATA_SIZE = 7
+_REPORT_SIZE = 8
+_NUM_REPORTS = _FRAME_SIZE // _REPORT_DATA_SIZE
+
+_EMPTY_PAYLOAD = b'\x00' * 64
+_EMPTY_CRC = yubico_util.crc16(_EMPTY_PAYLOAD)
+
+# feature reports of payload-less frames (e.g. DEVICE_SERIAL), by command
+_EMPTY_REPORTS = {}
+
+# annotation of configuration frames according to config_st (see ykdef.h), by sequence number
+_CONFIG_ANNOTATIONS = {
+    0: "FFFFFFF",  # F = Fixed data (16 bytes)
+    1: "FFFFFFF",
+    2: "FFUUUUU",  # U = UID (6 bytes)
+    3: "UKKKKKK",  # K = Key (16 bytes)
+    4: "KKKKKKK",
+    5: "KKKAAAA",  # A = Access code to set (6 bytes)
+    6: "AAlETCr",  # l = Length of fixed field (1 byte)
+                   # E = extFlags (1 byte)
+                   # T = tktFlags (1 byte)
+                   # C = cfgFlags (1 byte)
+                   # r = RFU (2 bytes)
+    7: "rCRaaaa",  # CR = CRC16 checksum (2 bytes)
+                   # a = Access code to use (6 bytes)
+    8: 'aa',
+    # after payload
+    9: " Scr",
+}
+
+_CONFIG_COMMANDS = frozenset([
+    SLOT.CONFIG,
+    SLOT.CONFIG2,
+    SLOT.UPDATE1,
+    SLOT.UPDATE2,
+    SLOT.SWAP,
+])
+
+class YubiKeyFrame(object):
     """
     Class containing an YKFRAME (as defined in ykdef.h).
 
@@ -30,16 +70,22 @@ class YubiKeyFrame:
     flags.
     """
 
+    __slots__ = ('payload', 'command', 'crc', '_reports')
+
     def __init__(self, command, payload=b''):
         if not payload:
-            payload = b'\x00' * 64
+            payload = _EMPTY_PAYLOAD
         if len(payload) != 64:
             raise yubico_exception.InputError('payload must be empty or 64 bytes')
         if not isinstance(payload, bytes):
             raise yubico_exception.InputError('payload must be a bytestring')
         self.payload = payload
         self.command = command
-        self.crc = yubico_util.crc16(payload)
+        if payload is _EMPTY_PAYLOAD:
+            self.crc = _EMPTY_CRC
+        else:
+            self.crc = yubico_util.crc16(payload)
+        self._reports = None
 
     def __repr__(self):
         return '<%s.%s instance at %s: %s>' % (
@@ -71,24 +117,54 @@ class YubiKeyFrame:
         """
         Return the frame as an array of 8-byte parts, ready to be sent to a YubiKey.
         """
-        rest = self.to_string()
-        seq = 0
-        out = []
-        # When sending a frame to the YubiKey, we can (should) remove any
-        # 7-byte serie that only consists of '\x00', besides the first
-        # and last serie.
-        while rest:
-            this, rest = rest[:7], rest[7:]
-            if seq > 0 and rest:
-                # never skip first or last serie
-                if this != b'\x00\x00\x00\x00\x00\x00\x00':
-                    this += yubico_util.chr_byte(yubikey_defs.SLOT_WRITE_FLAG + seq)
-                    out.append(self._debug_string(debug, this))
+        if debug:
+            return [(data.tobytes(), annotation) for (data, annotation) in self._feature_reports(debug)]
+        return [data.tobytes() for data in self._feature_reports()]
+
+    def _feature_reports(self, debug=False):
+        """
+        Like to_feature_reports(), but the parts are read-only memoryviews
+        of one buffer holding all the reports, which is encoded once per
+        frame (and once per command for frames without payload). Used when
+        writing the frame.
+        """
+        reports = self._reports
+        if reports is None:
+            if self.payload is _EMPTY_PAYLOAD:
+                reports = _EMPTY_REPORTS.get(self.command)
+                if reports is None:
+                    reports = _EMPTY_REPORTS[self.command] = self._encode()
             else:
-                this += yubico_util.chr_byte(yubikey_defs.SLOT_WRITE_FLAG + seq)
-                out.append(self._debug_string(debug, this))
-            seq += 1
-        return out
+                reports = self._encode()
+            self._reports = reports
+        if debug:
+            return [self._debug_string(debug, data) for data in reports]
+        return list(reports)
+
+    def _encode(self):
+        """
+        Encode the frame into feature reports, in one 80 byte buffer.
+
+        Returns a tuple of read-only memoryviews of the reports to send.
+        """
+        data = self.to_string()
+        buf = bytearray(_NUM_REPORTS * _REPORT_SIZE)
+        sent = []
+        for seq in range(_NUM_REPORTS):
+            pos = seq * _REPORT_DATA_SIZE
+            # When sending a frame to the YubiKey, we can (should) remove any
+            # 7-byte serie that only consists of '\x00', besides the first
+            # and last serie.
+            if 0 < seq < _NUM_REPORTS - 1 and \
+                    data.count(b'\x00', pos, pos + _REPORT_DATA_SIZE) == _REPORT_DATA_SIZE:
+                continue
+            offset = seq * _REPORT_SIZE
+            buf[offset:offset + _REPORT_DATA_SIZE] = data[pos:pos + _REPORT_DATA_SIZE]
+            buf[offset + _REPORT_DATA_SIZE] = yubikey_defs.SLOT_WRITE_FLAG + seq
+            sent.append(offset)
+        # shared with whoever writes the frame, so make sure it isn't modified
+        view = memoryview(bytes(buf))
+        return tuple(view[offset:offset + _REPORT_SIZE] for offset in sent)
 
     def _debug_string(self, debug, data):
         """
@@ -96,39 +172,8 @@ class YubiKeyFrame:
         """
         if not debug:
             return data
-        if self.command in [
-            SLOT.CONFIG,
-            SLOT.CONFIG2,
-            SLOT.UPDATE1,
-            SLOT.UPDATE2,
-            SLOT.SWAP,
-        ]:
-            # annotate according to config_st (see ykdef.h)
-            if yubico_util.ord_byte(data[-1]) == 0x80:
-                return (data, "FFFFFFF")  # F = Fixed data (16 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x81:
-                return (data, "FFFFFFF")
-            if yubico_util.ord_byte(data[-1]) == 0x82:
-                return (data, "FFUUUUU")  # U = UID (6 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x83:
-                return (data, "UKKKKKK")  # K = Key (16 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x84:
-                return (data, "KKKKKKK")
-            if yubico_util.ord_byte(data[-1]) == 0x85:
-                return (data, "KKKAAAA")  # A = Access code to set (6 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x86:
-                return (data, "AAlETCr")  # l = Length of fixed field (1 byte)
-                                          # E = extFlags (1 byte)
-                                          # T = tktFlags (1 byte)
-                                          # C = cfgFlags (1 byte)
-                                          # r = RFU (2 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x87:
-                return (data, "rCRaaaa")  # CR = CRC16 checksum (2 bytes)
-                                          # a = Access code to use (6 bytes)
-            if yubico_util.ord_byte(data[-1]) == 0x88:
-                return (data, 'aa')
-            # after payload
-            if yubico_util.ord_byte(data[-1]) == 0x89:
-                return (data, " Scr")
-
+        if self.command in _CONFIG_COMMANDS:
+            annotation = _CONFIG_ANNOTATIONS.get(yubico_util.ord_byte(data[-1]) - yubikey_defs.SLOT_WRITE_FLAG)
+            if annotation is not None:
+                return (data, annotation)
         return (data, '')
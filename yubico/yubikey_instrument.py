@@ -0,0 +1,357 @@
+"""
+module for instrumenting the USB HID transport
+
+A YubiKeyInstrument passed to YubiKeyHIDDevice (or find_key(),
+enumerate_keys(), YubiKeySession etc.) is called for every feature report
+read and written, every status poll, every completed wait for the YubiKey,
+and for timeouts, CRC failures and retries. Timestamps are taken from the
+monotonic clock, and durations are in seconds.
+
+Without an instrument (the default), the transport only checks that
+`instrument' is None.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_instrument import CountingInstrument
+
+    counts = CountingInstrument()
+    YK = yubico.find_yubikey(instrument=counts)
+    YK.challenge_response(challenge, slot=2)
+    print counts
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'DEFAULT_BUCKETS',
+    # functions
+    'command_name',
+    # classes
+    'YubiKeyInstrument',
+    'CountingInstrument',
+    'PrometheusInstrument',
+    'Counter',
+    'Histogram',
+]
+
+import threading
+
+from .yubico_version import __version__
+from .yubikey_defs import SLOT
+
+# histogram buckets in seconds, from a single USB transfer to a button press
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 15.0)
+
+_COMMAND_NAMES = dict((value, name) for (name, value) in vars(SLOT).items()
+                      if not name.startswith('_'))
+
+
+def command_name(command):
+    """ Return the SLOT name of a command, e.g. 'CHAL_HMAC2' (or 'none'). """
+    if command is None:
+        return 'none'
+    return _COMMAND_NAMES.get(command, '0x%02x' % command)
+
+
+class YubiKeyInstrument(object):
+    """
+    Base class for instruments. Every method does nothing, so subclasses
+    only override what they are interested in.
+
+    The methods are called from whatever thread is using the YubiKey, with
+    `device' being the YubiKeyHIDDevice and `command' the SLOT command the
+    YubiKey is processing (None if none).
+    """
+
+    def report_read(self, device, start, elapsed, data):
+        """ A feature report was read (GET_REPORT), starting at `start'. """
+        pass
+
+    def report_write(self, device, start, elapsed, data):
+        """ A feature report was written (SET_REPORT), starting at `start'. """
+        pass
+
+    def poll(self, device, command, sleep):
+        """ A status poll is about to be done, after sleeping `sleep' seconds. """
+        pass
+
+    def wait(self, device, command, start, elapsed, polls):
+        """ A wait for the YubiKey, started at `start', ended after `polls' status reads. """
+        pass
+
+    def timeout(self, device, command, start, elapsed):
+        """ A wait for the YubiKey, started at `start', timed out. """
+        pass
+
+    def crc_failure(self, device, command):
+        """ A response failed its CRC check. """
+        pass
+
+    def retry(self, device, reason):
+        """
+        An operation on `device' (None if it could not be opened) failed
+        with `reason' (an exception), and is retried.
+        """
+        pass
+
+
+class CountingInstrument(YubiKeyInstrument):
+    """
+    Instrument keeping counts and total durations.
+
+    Attributes :
+        reads        -- feature reports read
+        read_time    -- seconds spent reading feature reports
+        writes       -- feature reports written
+        write_time   -- seconds spent writing feature reports
+        polls        -- status polls
+        sleep_time   -- seconds slept between status polls
+        waits        -- completed waits for the YubiKey
+        wait_time    -- seconds spent in completed waits
+        timeouts     -- waits that timed out
+        crc_failures -- responses failing their CRC check
+        retries      -- operations retried
+    """
+
+    _FIELDS = ['reads', 'read_time', 'writes', 'write_time', 'polls', 'sleep_time',
+               'waits', 'wait_time', 'timeouts', 'crc_failures', 'retries']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            ', '.join('%s=%s' % (name, value) for (name, value) in self.as_dict().items()),
+            )
+
+    def reset(self):
+        """ Zero all counters. """
+        with self._lock:
+            for name in self._FIELDS:
+                setattr(self, name, 0)
+
+    def as_dict(self):
+        """ Return the counters as a dict. """
+        with self._lock:
+            return dict((name, getattr(self, name)) for name in self._FIELDS)
+
+    def report_read(self, device, start, elapsed, data):
+        with self._lock:
+            self.reads += 1
+            self.read_time += elapsed
+
+    def report_write(self, device, start, elapsed, data):
+        with self._lock:
+            self.writes += 1
+            self.write_time += elapsed
+
+    def poll(self, device, command, sleep):
+        with self._lock:
+            self.polls += 1
+            self.sleep_time += sleep
+
+    def wait(self, device, command, start, elapsed, polls):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += elapsed
+
+    def timeout(self, device, command, start, elapsed):
+        with self._lock:
+            self.timeouts += 1
+
+    def crc_failure(self, device, command):
+        with self._lock:
+            self.crc_failures += 1
+
+    def retry(self, device, reason):
+        with self._lock:
+            self.retries += 1
+
+
+class _Metric(object):
+    """ A labelled metric, holding one child per set of label values. """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.name,
+            )
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._child()
+            return child
+
+    def samples(self):
+        """ Return a list of (name, {label: value}, value) for the current values. """
+        res = []
+        with self._lock:
+            children = sorted(self._children.items())
+        for (key, child) in children:
+            labels = dict(zip(self.labelnames, key))
+            for (suffix, extra, value) in child.samples():
+                these = dict(labels)
+                these.update(extra)
+                res.append((self.name + suffix, these, value))
+        return res
+
+
+class _CounterChild(object):
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [('_total', {}, self.value)]
+
+
+class _HistogramChild(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, amount):
+        with self._lock:
+            self.count += 1
+            self.sum += amount
+            for (i, bound) in enumerate(self.buckets):
+                if amount <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def samples(self):
+        res = []
+        cumulative = 0
+        for (bound, count) in zip(self.buckets, self.counts):
+            cumulative += count
+            res.append(('_bucket', {'le': repr(float(bound))}, cumulative))
+        res.append(('_bucket', {'le': '+Inf'}, self.count))
+        res.append(('_count', {}, self.count))
+        res.append(('_sum', {}, self.sum))
+        return res
+
+
+class Counter(_Metric):
+    """
+    Minimal Prometheus-style counter, used when prometheus_client is not installed.
+    """
+
+    def _child(self):
+        return _CounterChild()
+
+
+class Histogram(_Metric):
+    """
+    Minimal Prometheus-style histogram, used when prometheus_client is not installed.
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+
+class PrometheusInstrument(YubiKeyInstrument):
+    """
+    Instrument updating Prometheus counters and histograms.
+
+    The metrics are created with prometheus_client (in `registry', or the
+    default registry) if it is installed, otherwise with the minimal
+    Counter and Histogram classes of this module, whose samples() can be
+    exported by other means. The metrics are available as attributes :
+
+        <prefix>_reports_total{direction}          -- feature reports read/written
+        <prefix>_transfer_seconds{direction}       -- histogram of transfer durations
+        <prefix>_polls_total{command}              -- status polls
+        <prefix>_poll_sleep_seconds_total{command} -- time slept between polls
+        <prefix>_wait_seconds{command}             -- histogram of wait durations
+        <prefix>_timeouts_total{command}           -- waits timed out
+        <prefix>_crc_failures_total{command}       -- responses failing CRC check
+        <prefix>_retries_total{reason}             -- operations retried
+    """
+
+    def __init__(self, prefix='yubikey', registry=None, buckets=DEFAULT_BUCKETS):
+        try:
+            import prometheus_client
+            extra = {}
+            if registry is not None:
+                extra['registry'] = registry
+            counter = lambda name, doc, labels: prometheus_client.Counter(name, doc, labels, **extra)
+            histogram = lambda name, doc, labels: prometheus_client.Histogram(
+                name, doc, labels, buckets=buckets, **extra)
+        except ImportError:
+            counter = Counter
+            histogram = lambda name, doc, labels: Histogram(name, doc, labels, buckets=buckets)
+        self.reports = counter(prefix + '_reports', 'Feature reports transferred', ['direction'])
+        self.transfer_seconds = histogram(prefix + '_transfer_seconds',
+                                          'Feature report transfer duration', ['direction'])
+        self.polls = counter(prefix + '_polls', 'Status polls', ['command'])
+        self.poll_sleep = counter(prefix + '_poll_sleep_seconds', 'Time slept between status polls', ['command'])
+        self.wait_seconds = histogram(prefix + '_wait_seconds', 'Time waited for the YubiKey', ['command'])
+        self.timeouts = counter(prefix + '_timeouts', 'Waits for the YubiKey timed out', ['command'])
+        self.crc_failures = counter(prefix + '_crc_failures', 'Responses failing CRC check', ['command'])
+        self.retries = counter(prefix + '_retries', 'Operations retried', ['reason'])
+
+    def __repr__(self):
+        return '<%s instance at %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            )
+
+    def metrics(self):
+        """ Return all the metrics. """
+        return [self.reports, self.transfer_seconds, self.polls, self.poll_sleep,
+                self.wait_seconds, self.timeouts, self.crc_failures, self.retries]
+
+    def report_read(self, device, start, elapsed, data):
+        self.reports.labels(direction='read').inc()
+        self.transfer_seconds.labels(direction='read').observe(elapsed)
+
+    def report_write(self, device, start, elapsed, data):
+        self.reports.labels(direction='write').inc()
+        self.transfer_seconds.labels(direction='write').observe(elapsed)
+
+    def poll(self, device, command, sleep):
+        name = command_name(command)
+        self.polls.labels(command=name).inc()
+        if sleep:
+            self.poll_sleep.labels(command=name).inc(sleep)
+
+    def wait(self, device, command, start, elapsed, polls):
+        self.wait_seconds.labels(command=command_name(command)).observe(elapsed)
+
+    def timeout(self, device, command, start, elapsed):
+        self.timeouts.labels(command=command_name(command)).inc()
+
+    def crc_failure(self, device, command):
+        self.crc_failures.labels(command=command_name(command)).inc()
+
+    def retry(self, device, reason):
+        self.retries.labels(reason=reason.__class__.__name__).inc()
@@ -0,0 +1,166 @@
+"""
+module with strategies for polling the YubiKey status byte
+
+While the YubiKey is busy (processing a written frame, or computing a
+challenge-response), the host has to poll the status feature report
+until certain flags are set or cleared. How long to sleep between those
+polls is decided by a poller object, see YubiKeyPoller.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_poll import FixedIntervalPoller
+
+    YK = yubico.find_yubikey(poller=FixedIntervalPoller(0.005))
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    # classes
+    'YubiKeyPoller',
+    'BackoffPoller',
+    'SpinBackoffPoller',
+    'FixedIntervalPoller',
+    'DeadlinePoller',
+    'AdaptivePoller',
+]
+
+import itertools
+
+from .yubico_version import __version__
+
+
+class YubiKeyPoller(object):
+    """
+    Base class for status polling strategies.
+
+    A poller hands out the sequence of sleeps to do between status reads
+    through intervals(), and is told through observe() how long a wait for
+    a command actually took. `command' is a SLOT value (such as
+    SLOT.CHAL_HMAC1), or None when the wait is not tied to a command.
+    """
+
+    def intervals(self, command=None):
+        """
+        Return an (endless) iterator of seconds to sleep before each status read.
+        """
+        raise NotImplementedError()
+
+    def observe(self, command, elapsed):
+        """
+        Register that waiting for `command' took `elapsed' seconds.
+        """
+        pass
+
+    def __repr__(self):
+        return '<%s instance at %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            )
+
+
+class BackoffPoller(YubiKeyPoller):
+    """
+    Sleep `initial' seconds, then double the sleep up to `maximum'.
+
+    This is how python-yubico has always polled the YubiKey.
+    """
+
+    def __init__(self, initial=0.01, maximum=0.5):
+        self.initial = initial
+        self.maximum = maximum
+
+    def intervals(self, command=None):
+        sleep = self.initial
+        while True:
+            yield sleep
+            sleep = min(sleep + sleep, self.maximum)
+
+
+class SpinBackoffPoller(YubiKeyPoller):
+    """
+    Read the status right away, then do `spins' reads `spin_interval'
+    seconds apart before falling back to exponential backoff.
+    """
+
+    def __init__(self, spins=4, spin_interval=0.001, initial=0.002, maximum=0.5):
+        self.spins = spins
+        self.spin_interval = spin_interval
+        self.backoff = BackoffPoller(initial, maximum)
+
+    def intervals(self, command=None):
+        return itertools.chain([0],
+                               itertools.repeat(self.spin_interval, self.spins),
+                               self.backoff.intervals(command))
+
+
+class FixedIntervalPoller(YubiKeyPoller):
+    """
+    Sleep the same `interval' seconds before every status read.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+
+    def intervals(self, command=None):
+        return itertools.repeat(self.interval)
+
+
+class DeadlinePoller(YubiKeyPoller):
+    """
+    Sleep until the command is expected to have finished, then poll
+    every `interval' seconds.
+
+    `expected' is a dict mapping commands to their expected duration in
+    seconds. Commands not listed use `default'.
+    """
+
+    def __init__(self, expected=None, default=0.0, interval=0.002, maximum=0.5):
+        self.expected = dict(expected or {})
+        self.default = default
+        self.interval = interval
+        self.maximum = maximum
+
+    def intervals(self, command=None):
+        deadline = self.expected.get(command, self.default)
+        return itertools.chain([deadline], BackoffPoller(self.interval, self.maximum).intervals(command))
+
+
+class AdaptivePoller(YubiKeyPoller):
+    """
+    Learn the typical latency of each command, and sleep just short of it.
+
+    The latency is tracked as an exponentially weighted moving average
+    (weight `alpha' for new samples). The first sleep is `fraction' of the
+    learned latency, after which the YubiKey is polled as with
+    SpinBackoffPoller. Commands without any samples yet start polling at
+    once.
+    """
+
+    def __init__(self, alpha=0.25, fraction=0.8, spins=4, spin_interval=0.001, initial=0.002, maximum=0.5):
+        self.alpha = alpha
+        self.fraction = fraction
+        self.spinner = SpinBackoffPoller(spins, spin_interval, initial, maximum)
+        self._latency = {}
+
+    def latency(self, command):
+        """ Return the learned latency for `command', or None if unknown. """
+        return self._latency.get(command)
+
+    def intervals(self, command=None):
+        spin = self.spinner.intervals(command)
+        latency = self._latency.get(command)
+        if latency:
+            next(spin)  # replace the immediate first read
+            return itertools.chain([latency * self.fraction], spin)
+        return spin
+
+    def observe(self, command, elapsed):
+        old = self._latency.get(command)
+        if old is None:
+            self._latency[command] = elapsed
+        else:
+            self._latency[command] = old + self.alpha * (elapsed - old)
@@ -0,0 +1,154 @@
+"""
+module for spreading challenge-response work over several YubiKeys
+
+When a number of YubiKeys are programmed with the same challenge-response
+secret, they all give the same responses, and a YubiKeyPool can use them
+interchangeably to get more responses per second, and to keep working
+when one of them stops responding.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_pool import YubiKeyPool
+
+    pool = YubiKeyPool([info.key() for info in yubico.enumerate_keys()])
+    response = pool.challenge_response(challenge, slot=2)
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    # classes
+    'YubiKeyPool',
+]
+
+import threading
+import time
+
+try:
+    from concurrent import futures
+except ImportError:
+    # Python 2, without the futures backport
+    futures = None
+
+from .yubico_version import __version__
+from .yubikey_base import YubiKeyError, YubiKeyTimeout
+from .yubikey_usb_hid import YubiKeyUSBHIDError
+
+# monotonic clock for the cool-down, where available
+_now = getattr(time, 'monotonic', time.time)
+
+
+class _PoolMember(object):
+    """ A YubiKey in a pool, and its bookkeeping. """
+
+    def __init__(self, key):
+        self.key = key
+        self.busy = 0          # calls in progress
+        self.served = 0        # calls completed
+        self.failures = 0      # calls failed
+        self.down_until = 0    # don't use before this time, after a failure
+
+    def __repr__(self):
+        return '<%s instance at %s: %s busy=%i served=%i failures=%i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.key,
+            self.busy,
+            self.served,
+            self.failures,
+            )
+
+
+class YubiKeyPool(object):
+    """
+    A thread-safe pool of YubiKeys programmed with the same secret.
+
+    Every call goes to the least busy YubiKey. If it times out (or the
+    device fails), the YubiKey is left alone for `cooldown' seconds and
+    the call is retried on another one, until all of them have been tried.
+    Such retries are reported to `instrument' (a YubiKeyInstrument), if any.
+    """
+
+    def __init__(self, keys, cooldown=5.0, instrument=None):
+        if not keys:
+            raise YubiKeyError('No YubiKey found')
+        self.cooldown = cooldown
+        self.instrument = instrument
+        self._members = [_PoolMember(key) for key in keys]
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<%s instance at %s: %i YubiKeys>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            len(self._members),
+            )
+
+    def __len__(self):
+        return len(self._members)
+
+    def keys(self):
+        """ Return the YubiKeys in the pool. """
+        return [member.key for member in self._members]
+
+    def challenge_response(self, challenge, mode='HMAC', slot=1, variable=True, may_block=False):
+        """ Issue a challenge to one of the YubiKeys, and return the response. """
+        return self.run(lambda key: key.challenge_response(challenge, mode=mode, slot=slot,
+                                                           variable=variable, may_block=may_block))
+
+    def challenge_response_many(self, challenges, mode='HMAC', slot=1, variable=True, may_block=False):
+        """
+        Issue a sequence of challenges, using all the YubiKeys at once.
+
+        Returns the list of responses, in the order of `challenges'. The
+        challenges are issued one at a time without concurrent.futures.
+        """
+        def one(challenge):
+            return self.challenge_response(challenge, mode, slot, variable, may_block)
+        if futures is None:
+            return [one(challenge) for challenge in challenges]
+        with futures.ThreadPoolExecutor(max_workers=len(self._members)) as executor:
+            return list(executor.map(one, challenges))
+
+    def run(self, func):
+        """
+        Call func(key) with the least busy YubiKey, failing over to the others.
+        """
+        tried = set()
+        while True:
+            member = self._acquire(tried)
+            failed = False
+            try:
+                return func(member.key)
+            except (YubiKeyTimeout, YubiKeyUSBHIDError, IOError) as inst:
+                # fail over to another YubiKey; other errors are the caller's
+                failed = True
+                tried.add(member)
+                if len(tried) == len(self._members):
+                    raise
+                if self.instrument is not None:
+                    self.instrument.retry(getattr(member.key, '_device', None), inst)
+            finally:
+                self._release(member, failed=failed)
+
+    def _acquire(self, tried):
+        """ Pick the least busy YubiKey not in `tried', preferring ones not cooling down. """
+        with self._lock:
+            now = _now()
+            candidates = [member for member in self._members if member not in tried]
+            healthy = [member for member in candidates if member.down_until <= now]
+            member = min(healthy or candidates, key=lambda member: (member.busy, member.served))
+            member.busy += 1
+            return member
+
+    def _release(self, member, failed=False):
+        with self._lock:
+            member.busy -= 1
+            if failed:
+                member.failures += 1
+                member.down_until = _now() + self.cooldown
+            else:
+                member.served += 1
@@ -0,0 +1,387 @@
+"""
+module for programming configurations into many YubiKeys
+
+A YubiKeyProvisioner takes a stream of jobs (a serial number, a slot and
+a configuration to write there) and runs them on the attached YubiKeys,
+one thread per YubiKey. Every write is verified by the programming
+sequence (pgm_seq) of the YubiKey, timeouts are retried, and each result
+is appended to a journal. A run that is interrupted can be resumed with
+the same jobs and journal, skipping the YubiKeys already programmed.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_provision import YubiKeyProvisioner, ProvisioningJob, ProvisioningJournal
+
+    jobs = (ProvisioningJob(serial, cfg, slot=1) for (serial, cfg) in configs)
+    with ProvisioningJournal('station1.journal') as journal:
+        provisioner = YubiKeyProvisioner(yubico.enumerate_keys(workers=8), journal=journal)
+        for result in provisioner.run(jobs):
+            print result
+
+Jobs can also be read from a file of JSON lines (see read_jobs()).
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'RESULTS',
+    # functions
+    'read_jobs',
+    'job_line',
+    # classes
+    'YubiKeyProvisioner',
+    'ProvisioningJob',
+    'ProvisioningResult',
+    'ProvisioningJournal',
+    'FrameConfig',
+]
+
+import binascii
+import json
+import os
+import threading
+import time
+
+try:
+    from concurrent import futures
+except ImportError:
+    # Python 2, without the futures backport
+    futures = None
+
+from .yubico_version import __version__
+from . import yubico_exception
+from . import yubikey_frame
+from .yubikey_base import YubiKeyTimeout
+from .yubikey_defs import SLOT
+
+# result of a job
+RESULTS = ['ok', 'skipped', 'absent', 'failed']
+
+_CONFIG_COMMANDS = {
+    (1, False): SLOT.CONFIG,
+    (2, False): SLOT.CONFIG2,
+    (1, True): SLOT.UPDATE1,
+    (2, True): SLOT.UPDATE2,
+}
+
+
+class ProvisioningJob(object):
+    """
+    A configuration to write to a YubiKey.
+
+    Attributes :
+        serial -- serial number of the YubiKey
+        config -- YubiKeyConfig (or anything with to_frame() and
+                  version_required(), such as a CompiledConfig)
+        slot   -- slot to write it to
+    """
+
+    def __init__(self, serial, config, slot=1):
+        self.serial = serial
+        self.config = config
+        self.slot = slot
+
+    def __repr__(self):
+        return '<%s instance at %s: serial %s, slot %i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.serial,
+            self.slot,
+            )
+
+
+class ProvisioningResult(object):
+    """
+    The outcome of a ProvisioningJob.
+
+    Attributes :
+        job      -- the ProvisioningJob
+        result   -- 'ok', 'skipped' (already done according to the journal),
+                    'absent' (YubiKey not attached) or 'failed'
+        attempts -- number of writes attempted
+        pgm_seq  -- programming sequence after the write (if written)
+        error    -- the last exception, if any
+        elapsed  -- seconds spent on the job
+    """
+
+    def __init__(self, job, result, attempts=0, pgm_seq=None, error=None, elapsed=0.0):
+        self.job = job
+        self.result = result
+        self.attempts = attempts
+        self.pgm_seq = pgm_seq
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return '<%s instance at %s: serial %s, slot %i: %s%s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.job.serial,
+            self.job.slot,
+            self.result,
+            ' (%s)' % self.error if self.error is not None else '',
+            )
+
+    def to_dict(self):
+        """ Return the result as a dict, as recorded in the journal. """
+        res = {'serial': self.job.serial,
+               'slot': self.job.slot,
+               'result': self.result,
+               'attempts': self.attempts,
+               }
+        if self.pgm_seq is not None:
+            res['pgm_seq'] = self.pgm_seq
+        if self.error is not None:
+            res['error'] = str(self.error)
+        return res
+
+
+class ProvisioningJournal(object):
+    """
+    Append-only journal of provisioning results, one JSON object per line.
+
+    The jobs recorded as 'ok' when the journal is opened are done(), and
+    skipped by YubiKeyProvisioner. Every line is flushed (and, if `sync',
+    fsynced) when written, so that at most the job in progress is lost.
+    """
+
+    def __init__(self, path, sync=True):
+        self.path = path
+        self.sync = sync
+        self._done = set()
+        self._lock = threading.Lock()
+        complete = True
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    complete = line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by an interruption
+                        continue
+                    if entry.get('result') == 'ok':
+                        self._done.add((entry['serial'], entry['slot']))
+        self._file = open(path, 'a')
+        if not complete:
+            # don't append to the line cut short
+            self._file.write('\n')
+
+    def __repr__(self):
+        return '<%s instance at %s: %s, %i done>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.path,
+            len(self._done),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def done(self, serial, slot):
+        """ Check if writing to `slot' of YubiKey `serial' is recorded as done. """
+        with self._lock:
+            return (serial, slot) in self._done
+
+    def record(self, result):
+        """ Append a ProvisioningResult (except skipped ones) to the journal. """
+        if result.result == 'skipped':
+            return
+        entry = result.to_dict()
+        entry['time'] = round(time.time(), 3)
+        line = json.dumps(entry, sort_keys=True, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            if result.result == 'ok':
+                self._done.add((result.job.serial, result.job.slot))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class FrameConfig(object):
+    """
+    A configuration given as its 64 byte frame payload (YubiKeyConfig.to_string()
+    padded with zeros), as read from a job file.
+    """
+
+    def __init__(self, payload, update=False, version=(2, 0)):
+        if len(payload) != 64:
+            raise yubico_exception.InputError('Configuration payload must be 64 bytes (got %i)' % len(payload))
+        self.payload = payload
+        self.update = update
+        self.version = tuple(version)
+
+    def __repr__(self):
+        return '<%s instance at %s: update=%s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.update,
+            )
+
+    def version_required(self):
+        return self.version
+
+    def to_frame(self, slot=1):
+        return yubikey_frame.YubiKeyFrame(command=_CONFIG_COMMANDS[(slot, self.update)],
+                                          payload=self.payload)
+
+
+def job_line(serial, config, slot=1):
+    """ Return the line for a job in a job file (see read_jobs()). """
+    frame = config.to_frame(slot=slot)
+    if frame.command not in _CONFIG_COMMANDS.values():
+        raise yubico_exception.InputError('Not a configuration for slot %i (command 0x%02x)'
+                                          % (slot, frame.command))
+    entry = {'serial': serial,
+             'slot': slot,
+             'config': binascii.hexlify(frame.payload).decode('ascii'),
+             }
+    if frame.command in (SLOT.UPDATE1, SLOT.UPDATE2):
+        entry['update'] = True
+    version = config.version_required()
+    if version:
+        entry['version'] = list(version)
+    return json.dumps(entry, sort_keys=True, separators=(',', ':')) + '\n'
+
+
+def read_jobs(f):
+    """
+    Generate ProvisioningJobs from a file (or iterable) of JSON lines, like :
+
+        {"serial": 1234567, "slot": 1, "config": "<64 bytes of hex>"}
+
+    with the optional keys "update" (true to update, rather than replace,
+    the configuration) and "version" (the YubiKey version required).
+    Empty lines and lines starting with '#' are ignored.
+    """
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        entry = json.loads(line)
+        config = FrameConfig(binascii.unhexlify(entry['config']),
+                             update=entry.get('update', False),
+                             version=entry.get('version', (2, 0)))
+        yield ProvisioningJob(entry['serial'], config, slot=entry.get('slot', 1))
+
+
+class YubiKeyProvisioner(object):
+    """
+    Runs ProvisioningJobs on the attached YubiKeys, concurrently.
+
+    Attributes :
+        keys    -- dict of serial number to YubiKey, or an iterable of
+                   YubiKeyInfo (as from enumerate_keys()) or YubiKey objects
+        journal -- ProvisioningJournal to skip done jobs with and record
+                   results in (default: None)
+        retries -- number of times a write timing out is retried
+        pending -- jobs queued per YubiKey, bounding how far ahead of the
+                   writes the jobs are read
+    """
+
+    def __init__(self, keys, journal=None, retries=2, pending=2):
+        if not isinstance(keys, dict):
+            by_serial = {}
+            for key in keys:
+                serial = key.serial()
+                if serial is not None:
+                    by_serial[serial] = key.key() if hasattr(key, 'key') else key
+            keys = by_serial
+        self.keys = keys
+        self.journal = journal
+        self.retries = retries
+        self.pending = pending
+        self._locks = dict((serial, threading.Lock()) for serial in keys)
+
+    def __repr__(self):
+        return '<%s instance at %s: %i YubiKeys>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            len(self.keys),
+            )
+
+    def run(self, jobs):
+        """
+        Run `jobs' (an iterable of ProvisioningJob, read as needed), and
+        generate a ProvisioningResult for each, in the order they finish.
+
+        Without concurrent.futures, the jobs are run one at a time.
+        """
+        if futures is None:
+            for job in jobs:
+                yield self._finish(self.provision(job))
+            return
+        workers = max(len(self.keys), 1)
+        in_flight = set()
+        with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            for job in jobs:
+                if job.serial not in self.keys or self._skip(job):
+                    yield self._finish(self._quick_result(job))
+                    continue
+                in_flight.add(executor.submit(self.provision, job))
+                while len(in_flight) >= workers * self.pending:
+                    (done, in_flight) = futures.wait(in_flight, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield self._finish(future.result())
+            while in_flight:
+                (done, in_flight) = futures.wait(in_flight, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    yield self._finish(future.result())
+
+    def provision(self, job):
+        """ Run one job, returning its ProvisioningResult. """
+        key = self.keys.get(job.serial)
+        if key is None or self._skip(job):
+            return self._quick_result(job)
+        start = time.time()
+        attempts = 0
+        with self._locks[job.serial]:
+            while True:
+                attempts += 1
+                old_pgm_seq = None
+                try:
+                    old_pgm_seq = key.status().pgm_seq
+                    key.write_config(job.config, slot=job.slot)
+                    return ProvisioningResult(job, 'ok', attempts, key.status().pgm_seq,
+                                              elapsed=time.time() - start)
+                except YubiKeyTimeout as error:
+                    # the configuration may have been written anyway. Any change
+                    # counts, pgm_seq wraps, and is 0 once no slot is configured
+                    try:
+                        status = key.status()
+                        if old_pgm_seq is not None and status.pgm_seq != old_pgm_seq:
+                            return ProvisioningResult(job, 'ok', attempts, status.pgm_seq,
+                                                      elapsed=time.time() - start)
+                    except (yubico_exception.YubicoError, IOError):
+                        pass
+                    if attempts > self.retries:
+                        return ProvisioningResult(job, 'failed', attempts, error=error,
+                                                  elapsed=time.time() - start)
+                except (yubico_exception.YubicoError, IOError) as error:
+                    return ProvisioningResult(job, 'failed', attempts, error=error,
+                                              elapsed=time.time() - start)
+
+    def _skip(self, job):
+        return self.journal is not None and self.journal.done(job.serial, job.slot)
+
+    def _quick_result(self, job):
+        if job.serial not in self.keys:
+            return ProvisioningResult(job, 'absent')
+        return ProvisioningResult(job, 'skipped')
+
+    def _finish(self, result):
+        if self.journal is not None:
+            self.journal.record(result)
+        return result
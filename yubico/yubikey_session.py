@@ -0,0 +1,196 @@
+"""
+module for long-lived access to the attached YubiKeys
+
+find_key() walks the USB bus and opens a YubiKey every time it is called.
+Programs talking to YubiKeys over and over again (daemons, servers) should
+instead keep a YubiKeySession, which enumerates the bus once and hands out
+the same open YubiKey objects until a device error or an explicit
+refresh() says the set of attached devices has changed.
+
+Example usage :
+
+    from yubico.yubikey_session import YubiKeySession
+
+    session = YubiKeySession()
+    for this in range(len(session)):
+        print "%s : %s" % (session.key(this), session.status(this))
+
+    response = session.run(lambda YK: YK.challenge_response(challenge, slot=2))
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    # classes
+    'YubiKeySession',
+]
+
+from .yubico_version import __version__
+from . import yubikey
+from .yubikey_base import YubiKeyError
+from .yubikey_usb_hid import YubiKeyHIDDevice, YubiKeyUSBHIDError, \
+    find_usb_devices, usb_device_id
+
+
+class YubiKeySession(object):
+    """
+    Keeps track of the attached YubiKeys, and keeps them open.
+
+    A session doesn't watch the USB bus : call refresh() after YubiKeys
+    were plugged in or out. Without that, a YubiKey plugged in is only
+    found when key() is asked for an index beyond those enumerated, and
+    one unplugged when it fails in run() or status(refresh=True), which
+    close it and enumerate the YubiKeys again on next use.
+    """
+
+    def __init__(self, debug=False, poller=None, instrument=None):
+        """
+        Attributes :
+            debug      -- True or False
+            poller     -- yubikey_poll.YubiKeyPoller to use for opened YubiKeys
+            instrument -- yubikey_instrument.YubiKeyInstrument for opened YubiKeys
+        """
+        self.debug = debug
+        self.poller = poller
+        self.instrument = instrument
+        self._devices = None
+        self._keys = {}
+        # set when a YubiKey was invalidated, and the others may have moved
+        self._stale = False
+
+    def __repr__(self):
+        return '<%s instance at %s: %s devices, %i open>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            len(self._devices) if self._devices is not None else 'unknown',
+            len(self._keys),
+            )
+
+    def __len__(self):
+        return len(self.devices())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def devices(self):
+        """
+        Return the list of attached YubiKey USB devices (enumerating them only once).
+        """
+        if self._devices is None or self._stale:
+            self.refresh()
+        return self._devices
+
+    def refresh(self):
+        """
+        Enumerate the attached YubiKeys again, e.g. after a device was plugged in.
+
+        Open YubiKeys that are still attached are kept open (but may get a new index).
+        """
+        old = {}
+        if self._devices is not None:
+            old = dict((usb_device_id(self._devices[index]), key)
+                       for (index, key) in self._keys.items())
+        self._devices = find_usb_devices()
+        self._keys = {}
+        self._stale = False
+        for (index, device) in enumerate(self._devices):
+            key = old.pop(usb_device_id(device), None)
+            if key is not None:
+                self._keys[index] = key
+        for key in old.values():
+            self._close_key(key)
+        return self._devices
+
+    def key(self, index=0):
+        """
+        Return an open YubiKey object for the index'th attached YubiKey.
+
+        The object is of the right class for the model (YubiKeyUSBHID,
+        YubiKeyNEO_USBHID or YubiKey4_USBHID), and is the same object every
+        time until the device is invalidated.
+        """
+        if self._stale:
+            self.refresh()
+        key = self._keys.get(index)
+        if key is not None:
+            return key
+        devices = self.devices()
+        if index >= len(devices):
+            # might have been plugged in after we enumerated
+            devices = self.refresh()
+            if index >= len(devices):
+                raise YubiKeyError('No YubiKey found')
+        hid_device = YubiKeyHIDDevice(self.debug, poller=self.poller,
+                                      usb_device=devices[index],
+                                      instrument=self.instrument)
+        key_class = yubikey.key_class(hid_device.status().ykver())
+        key = key_class(self.debug, index, hid_device)
+        self._keys[index] = key
+        return key
+
+    def status(self, index=0, refresh=False):
+        """
+        Return the status of the index'th YubiKey.
+
+        The status read last (see YubiKeyUSBHID.last_status()) is returned,
+        unless `refresh' is True. A YubiKey failing to give its status is
+        invalidated.
+        """
+        key = self.key(index)
+        if not refresh:
+            return key.last_status()
+        try:
+            return key.status()
+        except (YubiKeyUSBHIDError, IOError):
+            self.invalidate(index)
+            raise
+
+    def invalidate(self, index=None):
+        """
+        Close the index'th YubiKey (or all of them), and forget the enumeration.
+
+        When only one YubiKey is closed, the others stay open, and are found
+        again (possibly at another index) when the YubiKeys are next enumerated.
+        """
+        if index is None:
+            keys = list(self._keys.values())
+            self._keys = {}
+            self._devices = None
+        else:
+            keys = [self._keys.pop(index)] if index in self._keys else []
+            self._stale = True
+        for key in keys:
+            self._close_key(key)
+
+    def run(self, func, index=0):
+        """
+        Call func(key) with the index'th YubiKey, and return the result.
+
+        If the device fails (is unplugged, re-plugged etc.), the YubiKeys are
+        enumerated and opened again and the call is retried once.
+        """
+        key = None
+        try:
+            key = self.key(index)
+            return func(key)
+        except (YubiKeyUSBHIDError, IOError) as inst:
+            if self.instrument is not None:
+                self.instrument.retry(key._device if key is not None else None, inst)
+            self.invalidate()
+        return func(self.key(index))
+
+    def close(self):
+        """ Close all open YubiKeys. """
+        self.invalidate()
+
+    def _close_key(self, key):
+        try:
+            if key._device._transport:
+                key._device._close()
+        except (IOError, AttributeError, YubiKeyUSBHIDError):
+            pass
@@ -0,0 +1,355 @@
+"""
+module for producing OATH-TOTP codes with a YubiKey, from a resident agent
+
+A YubiKey slot configured for HMAC-SHA1 challenge-response can produce
+TOTP codes (RFC 6238) when given the time step as challenge. Finding and
+opening the YubiKey takes much longer than the challenge itself, so a
+TOTPAgent keeps the YubiKey open, computes the response for the next time
+step shortly before it begins, and keeps the codes of a time step until
+it ends. A TOTPAgentServer serves the codes to other processes over a
+Unix socket, one JSON object per line, and request_code() asks for one.
+
+Example usage :
+
+    import yubico
+    from yubico.yubikey_totp import TOTPAgent, TOTPAgentServer
+
+    agent = TOTPAgent(yubico.find_yubikey(), slot=2)
+    agent.start()
+    TOTPAgentServer(agent, '/run/user/1000/yubikey-totp').serve_forever()
+
+and in another process :
+
+    from yubico.yubikey_totp import request_code
+    print request_code('/run/user/1000/yubikey-totp', digits=6)
+
+For the codes of many time steps at once, use totp_codes().
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    # functions
+    'totp_challenge',
+    'totp_codes',
+    'request_code',
+    # classes
+    'TOTPAgent',
+    'TOTPAgentServer',
+    'TOTPAgentError',
+]
+
+import os
+import json
+import stat
+import time
+import socket
+import struct
+import threading
+
+try:
+    import socketserver
+except ImportError:
+    # Python 2
+    import SocketServer as socketserver
+
+from .yubico_version import __version__
+from . import yubico_util
+from . import yubico_exception
+
+
+class TOTPAgentError(yubico_exception.YubicoError):
+    """ Exception raised for errors reported by (or talking to) a TOTP agent. """
+
+
+def totp_challenge(step):
+    """
+    Return the challenge for time step number `step'.
+
+    The YubiKey slot should be configured with HMAC_LT64, so that the
+    challenge is the 8 byte time step (and not padded to 64 bytes).
+    """
+    return struct.pack('>Q', step)
+
+
+def totp_codes(YK, start, count, period=30, digits=6, slot=2):
+    """
+    Generate (timestamp, code) for `count' consecutive time steps, from the
+    one at time `start'. The timestamp is the start of the time step.
+
+    All challenges are sent through the open YubiKey back to back (see
+    challenge_response_many()), and the codes generated as the responses
+    arrive.
+    """
+    first = int(start // period)
+    challenges = (totp_challenge(step) for step in range(first, first + count))
+    for (n, response) in enumerate(YK.challenge_response_many(challenges, slot=slot)):
+        yield ((first + n) * period, '%.*i' % (digits, yubico_util.hotp_truncate(response, length=digits)))
+
+
+def _valid_digits(digits):
+    """ Check that `digits' is 6 or 8 (and not e.g. 6.0 or True). """
+    return isinstance(digits, int) and not isinstance(digits, bool) and digits in (6, 8)
+
+
+def _valid_slot(slot):
+    """ Check that `slot' is 1 or 2 (and not e.g. 1.0 or True). """
+    return isinstance(slot, int) and not isinstance(slot, bool) and slot in (1, 2)
+
+
+class TOTPAgent(object):
+    """
+    Produces TOTP codes with an open YubiKey, precomputing them.
+
+    Attributes :
+        YK         -- the YubiKey
+        slot       -- default slot (configured for HMAC challenge-response)
+        period     -- seconds per time step
+        lead       -- seconds before a time step begins to compute its
+                      response, in the background (see start())
+        slots      -- slots to precompute responses for (by default, the
+                      slots codes have been asked for)
+        clock      -- function returning the time
+    """
+
+    def __init__(self, YK, slot=2, period=30, lead=1.0, slots=None, clock=time.time):
+        self.YK = YK
+        self.slot = slot
+        self.period = period
+        self.lead = lead
+        self.slots = set(slots or ())
+        self.clock = clock
+        self._fixed_slots = slots is not None
+        # (slot, step) -> response, and (slot, step, digits) -> code
+        self._responses = {}
+        self._codes = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        return '<%s instance at %s: slot %i, period %i, %i cached>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.slot,
+            self.period,
+            len(self._responses),
+            )
+
+    def code(self, slot=None, digits=6, at=None, period=None):
+        """
+        Return the TOTP code at time `at' (default: now) as a string.
+
+        If `period' is given, it must be the period of the agent. Only the
+        codes of the current and the next time step are cached.
+        """
+        if period is not None and period != self.period:
+            raise yubico_exception.InputError('Agent time step is %i seconds, not %s' % (self.period, period))
+        if not _valid_digits(digits):
+            raise yubico_exception.InputError('TOTP digits must be 6 or 8')
+        if slot is None:
+            slot = self.slot
+        if not _valid_slot(slot):
+            raise yubico_exception.InputError('Slot must be 1 or 2')
+        current = int(self.clock() // self.period)
+        step = current if at is None else int(at // self.period)
+        cache = current <= step <= current + 1
+        if cache:
+            try:
+                return self._codes[(slot, step, digits)]
+            except KeyError:
+                pass
+        response = self.response(slot, step, cache=cache)
+        code = '%.*i' % (digits, yubico_util.hotp_truncate(response, length=digits))
+        if cache:
+            self._codes[(slot, step, digits)] = code
+        return code
+
+    def response(self, slot, step, cache=True):
+        """
+        Return the HMAC response of `slot' for time step `step', caching it if
+        `cache'. Slots that gave a response to cache are precomputed from then on.
+        """
+        try:
+            return self._responses[(slot, step)]
+        except KeyError:
+            pass
+        with self._lock:
+            response = self._responses.get((slot, step))
+            if response is None:
+                response = self.YK.challenge_response(totp_challenge(step), slot=slot)
+                if cache:
+                    self._responses[(slot, step)] = response
+                    if not self._fixed_slots:
+                        self.slots.add(slot)
+        return response
+
+    def precompute(self, at=None):
+        """
+        Compute the responses of the time step after the one at `at' (default:
+        now), and forget those of the steps that have ended.
+        """
+        if at is None:
+            at = self.clock()
+        step = int(at // self.period)
+        self.expire(step)
+        with self._lock:
+            slots = sorted(self.slots)
+        for slot in slots:
+            self.response(slot, step + 1)
+
+    def expire(self, step):
+        """ Forget the responses and codes of time steps before `step'. """
+        for cache in (self._responses, self._codes):
+            for key in [key for key in list(cache) if key[1] < step]:
+                cache.pop(key, None)
+
+    def start(self):
+        """ Start precomputing in a background thread. """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='TOTPAgent')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Stop the background thread. """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = self.clock()
+            boundary = (int(now // self.period) + 1) * self.period
+            if self._stop.wait(max(boundary - self.lead - now, 0)):
+                break
+            try:
+                self.precompute()
+            except (yubico_exception.YubicoError, IOError):
+                # codes asked for will be computed (and fail) on demand
+                pass
+            # don't precompute the same step twice
+            self._stop.wait(max(boundary - self.clock(), 0))
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode('utf-8'))
+                digits = request.get('digits', 6)
+                if not _valid_digits(digits):
+                    raise ValueError('bad digits')
+                code = self.server.agent.code(slot=request.get('slot'),
+                                              digits=digits,
+                                              at=request.get('time'),
+                                              period=request.get('period'))
+                reply = {'code': code}
+            except (ValueError, TypeError, AttributeError):
+                reply = {'error': 'bad request'}
+            except yubico_exception.YubicoError as e:
+                reply = {'error': e.reason}
+            except IOError as e:
+                reply = {'error': str(e)}
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class TOTPAgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves the codes of a TOTPAgent on a Unix socket at `path'.
+
+    Every request is a line with a JSON object, with the optional keys
+    "slot", "digits", "time" and "period", answered with a line {"code": "..."} or
+    {"error": "..."}. The socket is only accessible by the user.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, agent, path):
+        self.agent = agent
+        self.path = path
+        # (st_dev, st_ino) of our socket, to only ever remove that one
+        self._socket_id = None
+        _remove_stale_socket(path)
+        umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.__init__(self, path, _AgentHandler)
+        finally:
+            os.umask(umask)
+        st = os.lstat(path)
+        self._socket_id = (st.st_dev, st.st_ino)
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.path,
+            )
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if self._socket_id is None:
+            return
+        try:
+            st = os.lstat(self.path)
+        except OSError:
+            return
+        if stat.S_ISSOCK(st.st_mode) and (st.st_dev, st.st_ino) == self._socket_id:
+            os.unlink(self.path)
+        self._socket_id = None
+
+
+def _remove_stale_socket(path):
+    """
+    Remove the socket at `path' if it was left behind by an agent that is
+    gone. Raises TOTPAgentError if `path' is something else, or an agent
+    still answers on it.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise TOTPAgentError('%s exists, and is not a socket' % (path))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        os.unlink(path)
+        return
+    finally:
+        sock.close()
+    raise TOTPAgentError('A TOTP agent is already listening on %s' % (path))
+
+
+def request_code(path, slot=None, digits=6, at=None, period=None, timeout=5.0):
+    """ Ask the TOTP agent listening at `path' for a code. """
+    request = {'digits': digits}
+    if slot is not None:
+        request['slot'] = slot
+    if at is not None:
+        request['time'] = at
+    if period is not None:
+        request['period'] = period
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise TOTPAgentError('TOTP agent closed the connection')
+            data += chunk
+    finally:
+        sock.close()
+    reply = json.loads(data.decode('utf-8'))
+    if 'error' in reply:
+        raise TOTPAgentError(reply['error'])
+    return reply['code']
@@ -0,0 +1,397 @@
+"""
+module for transferring HID feature reports to and from a YubiKey
+
+YubiKeyHIDDevice speaks the YubiKey protocol in 8 byte feature reports,
+and leaves moving them to a transport :
+
+  hidraw -- Linux /dev/hidraw* device, using the HIDIOCGFEATURE and
+            HIDIOCSFEATURE ioctls. The kernel HID driver stays attached,
+            so the YubiKey keeps typing OTPs while open.
+  core   -- PyUSB >= 1.0 control transfers, reading into a preallocated
+            buffer.
+  legacy -- the usb.legacy (PyUSB 0.4 compatible) controlMsg() API.
+
+open_transport() tries them in the order of TRANSPORTS, skipping those
+that are not available for the device or platform.
+
+Example usage :
+
+    from yubico import yubikey_transport
+    from yubico.yubikey_usb_hid import YubiKeyHIDDevice, find_usb_devices
+
+    usb_device = find_usb_devices()[0]
+    hid_device = YubiKeyHIDDevice(usb_device=usb_device, transport='core')
+"""
+# Copyright (c) 2026 Yubico AB
+# See the file COPYING for licence statement.
+
+__all__ = [
+    # constants
+    'TRANSPORTS',
+    # functions
+    'open_transport',
+    'hidraw_paths',
+    # classes
+    'YubiKeyTransport',
+    'YubiKeyTransportError',
+    'ControlMsgTransport',
+    'LegacyUSBTransport',
+    'CoreUSBTransport',
+    'HidrawTransport',
+]
+
+import os
+import sys
+import array
+
+from .yubico_version import __version__
+from . import yubico_exception
+
+# transports tried by open_transport(), in order
+TRANSPORTS = ['hidraw', 'core', 'legacy']
+
+# Various USB/HID parameters
+_USB_TYPE_CLASS         = (0x01 << 5)
+_USB_RECIP_INTERFACE    = 0x01
+_USB_ENDPOINT_IN        = 0x80
+_USB_ENDPOINT_OUT       = 0x00
+
+_HID_GET_REPORT         = 0x01
+_HID_SET_REPORT         = 0x09
+
+_USB_TIMEOUT_MS         = 2000
+
+# from ykcore_backend.h
+_FEATURE_RPT_SIZE       = 8
+_REPORT_TYPE_FEATURE    = 0x03
+
+_REQUEST_TYPE_IN = _USB_TYPE_CLASS | _USB_RECIP_INTERFACE | _USB_ENDPOINT_IN
+_REQUEST_TYPE_OUT = _USB_TYPE_CLASS | _USB_RECIP_INTERFACE | _USB_ENDPOINT_OUT
+# apparently required for YubiKey 1.3.2, but not 2.2.x
+_FEATURE_VALUE = _REPORT_TYPE_FEATURE << 8
+
+# from linux/hidraw.h, for reports with (9 bytes) and without (8 bytes) the report number
+def _ioc_rw(nr, size):
+    return (3 << 30) | (size << 16) | (ord('H') << 8) | nr
+_HIDIOCSFEATURE = _ioc_rw(0x06, _FEATURE_RPT_SIZE + 1)
+_HIDIOCGFEATURE = _ioc_rw(0x07, _FEATURE_RPT_SIZE + 1)
+
+# start of the report descriptor of the keyboard (OTP) interface :
+# Usage Page (Generic Desktop), Usage (Keyboard)
+_KEYBOARD_DESCRIPTOR = b'\x05\x01\x09\x06'
+
+_SYS_HIDRAW = '/sys/class/hidraw'
+
+if sys.version_info < (3, 0):
+    _bytes = lambda data: bytes(bytearray(data))
+    _array_bytes = array.array.tostring
+else:
+    _bytes = bytes
+    _array_bytes = array.array.tobytes
+
+
+class YubiKeyTransportError(yubico_exception.YubicoError):
+    """ Exception raised when a transport can't be opened. """
+
+
+class YubiKeyTransport(object):
+    """
+    Base class for transports. A transport is open from when it is
+    created until close() is called.
+    """
+
+    name = None
+
+    def __repr__(self):
+        return '<%s instance at %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            )
+
+    def read_report(self):
+        """ Read a feature report, returned as bytes (normally 8 of them). """
+        raise NotImplementedError()
+
+    def write_report(self, data):
+        """ Write an 8 byte feature report. Returns the number of bytes written. """
+        raise NotImplementedError()
+
+    def close(self):
+        """ Close the transport. """
+        pass
+
+
+class ControlMsgTransport(YubiKeyTransport):
+    """
+    Transport using the controlMsg() method of an already open handle,
+    e.g. a usb.legacy.DeviceHandle or a yubikey_emulator.YubiKeyEmulator.
+    """
+
+    name = 'legacy'
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def read_report(self):
+        recv = self.handle.controlMsg(_REQUEST_TYPE_IN,
+                                      _HID_GET_REPORT,
+                                      _FEATURE_RPT_SIZE,
+                                      value = _FEATURE_VALUE,
+                                      timeout = _USB_TIMEOUT_MS)
+        return _bytes(recv)
+
+    def write_report(self, data):
+        return self.handle.controlMsg(_REQUEST_TYPE_OUT,
+                                      _HID_SET_REPORT,
+                                      data,
+                                      value = _FEATURE_VALUE,
+                                      timeout = _USB_TIMEOUT_MS)
+
+
+class LegacyUSBTransport(ControlMsgTransport):
+    """
+    Transport opening a usb.legacy.Device (or PyUSB < 1.0 device).
+    """
+
+    def __init__(self, usb_device, debug=None):
+        import usb
+        self._debug = debug or (lambda out, *args: None)
+        usb_conf = usb_device.configurations[0]
+        self._usb_int = usb_conf.interfaces[0][0]
+        handle = usb_device.open()
+        try:
+            handle.detachKernelDriver(0)
+        except Exception as error:
+            if 'could not detach kernel driver from interface' in str(error):
+                self._debug('The in-kernel-HID driver has already been detached\n')
+            else:
+                self._debug("detachKernelDriver not supported!\n")
+
+        try:
+            handle.setConfiguration(1)
+        except usb.USBError:
+            self._debug("Unable to set configuration, ignoring...\n")
+        handle.claimInterface(self._usb_int)
+        super(LegacyUSBTransport, self).__init__(handle)
+
+    def close(self):
+        self.handle.releaseInterface()
+        try:
+            # If we're using PyUSB >= 1.0 we can re-attach the kernel driver here.
+            self.handle.dev.attach_kernel_driver(0)
+        except:
+            pass
+        self._usb_int = None
+        self.handle = None
+
+
+class CoreUSBTransport(YubiKeyTransport):
+    """
+    Transport doing PyUSB >= 1.0 control transfers on a usb.core.Device.
+
+    Feature reports are read into a buffer allocated once.
+    """
+
+    name = 'core'
+
+    def __init__(self, usb_device, debug=None):
+        import usb.core
+        import usb.util
+        self._debug = debug or (lambda out, *args: None)
+        self.dev = usb_device
+        self._reattach = False
+        try:
+            if usb_device.is_kernel_driver_active(0):
+                usb_device.detach_kernel_driver(0)
+                self._reattach = True
+        except (NotImplementedError, usb.core.USBError):
+            self._debug("detachKernelDriver not supported!\n")
+        try:
+            usb_device.set_configuration(1)
+        except usb.core.USBError:
+            self._debug("Unable to set configuration, ignoring...\n")
+        usb.util.claim_interface(usb_device, 0)
+        self._buf = array.array('B', [0] * _FEATURE_RPT_SIZE)
+
+    def read_report(self):
+        read = self.dev.ctrl_transfer(_REQUEST_TYPE_IN,
+                                      _HID_GET_REPORT,
+                                      _FEATURE_VALUE,
+                                      0,
+                                      self._buf,
+                                      _USB_TIMEOUT_MS)
+        data = _array_bytes(self._buf)
+        if read != _FEATURE_RPT_SIZE:
+            data = data[:read]
+        return data
+
+    def write_report(self, data):
+        return self.dev.ctrl_transfer(_REQUEST_TYPE_OUT,
+                                      _HID_SET_REPORT,
+                                      _FEATURE_VALUE,
+                                      0,
+                                      data,
+                                      _USB_TIMEOUT_MS)
+
+    def close(self):
+        import usb.util
+        usb.util.release_interface(self.dev, 0)
+        if self._reattach:
+            try:
+                self.dev.attach_kernel_driver(0)
+            except Exception:
+                pass
+        usb.util.dispose_resources(self.dev)
+        self.dev = None
+
+
+class HidrawTransport(YubiKeyTransport):
+    """
+    Transport using the Linux hidraw ioctls on a /dev/hidraw* device.
+
+    The YubiKey uses unnumbered reports, so report number 0 goes before
+    the 8 bytes of each report. The device never becomes readable for a
+    pending response (see yubikey_usb_hid._StatusWait), so the file
+    descriptor is only used for ioctls.
+    """
+
+    name = 'hidraw'
+
+    def __init__(self, path):
+        import fcntl
+        self._ioctl = fcntl.ioctl
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR)
+        self._rbuf = bytearray(_FEATURE_RPT_SIZE + 1)
+        self._wbuf = bytearray(_FEATURE_RPT_SIZE + 1)
+
+    def __repr__(self):
+        return '<%s instance at %s: %s>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.path,
+            )
+
+    def read_report(self):
+        buf = self._rbuf
+        buf[0] = 0
+        read = self._ioctl(self._fd, _HIDIOCGFEATURE, buf, True)
+        return bytes(buf[1:read])
+
+    def write_report(self, data):
+        self._wbuf[1:] = data
+        return self._ioctl(self._fd, _HIDIOCSFEATURE, self._wbuf, True) - 1
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _usb_address(usb_device):
+    """ Return (bus, address) of a core or legacy USB device, or None. """
+    dev = getattr(usb_device, 'dev', usb_device)
+    try:
+        return (int(dev.bus), int(dev.address))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _read_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def hidraw_paths(usb_device):
+    """
+    Return the /dev/hidraw* paths of the OTP (keyboard) interface of a USB device.
+
+    Always an empty list on other platforms than Linux.
+    """
+    address = _usb_address(usb_device)
+    if address is None or not os.path.isdir(_SYS_HIDRAW):
+        return []
+    res = []
+    for name in sorted(os.listdir(_SYS_HIDRAW)):
+        # .../<bus>-<port>/<bus>-<port>:<config>.<interface>/<hid device>
+        hid = os.path.realpath(os.path.join(_SYS_HIDRAW, name, 'device'))
+        usb_dir = os.path.dirname(os.path.dirname(hid))
+        busnum = _read_file(os.path.join(usb_dir, 'busnum'))
+        devnum = _read_file(os.path.join(usb_dir, 'devnum'))
+        if busnum is None or devnum is None:
+            continue
+        if (int(busnum), int(devnum)) != address:
+            continue
+        descriptor = _read_file(os.path.join(hid, 'report_descriptor'))
+        if descriptor is not None and descriptor.startswith(_KEYBOARD_DESCRIPTOR):
+            res.append(os.path.join('/dev', name))
+    return res
+
+
+def _open_hidraw(usb_device, debug):
+    for path in hidraw_paths(usb_device):
+        try:
+            return HidrawTransport(path)
+        except (IOError, OSError) as error:
+            debug("Unable to open %s: %s\n", path, error)
+    return None
+
+
+def _open_core(usb_device, debug):
+    try:
+        import usb.core
+    except ImportError:
+        return None
+    dev = getattr(usb_device, 'dev', usb_device)
+    if not isinstance(dev, usb.core.Device):
+        return None
+    return CoreUSBTransport(dev, debug)
+
+
+def _open_legacy(usb_device, debug):
+    if not hasattr(usb_device, 'configurations'):
+        try:
+            import usb.core
+            import usb.legacy
+        except ImportError:
+            return None
+        if not isinstance(usb_device, usb.core.Device):
+            return None
+        usb_device = usb.legacy.Device(usb_device)
+    return LegacyUSBTransport(usb_device, debug)
+
+
+_OPENERS = {
+    'hidraw': _open_hidraw,
+    'core': _open_core,
+    'legacy': _open_legacy,
+}
+
+
+def open_transport(usb_device, transport=None, debug=None):
+    """
+    Open a transport to `usb_device' (as returned by find_usb_devices()).
+
+    Attributes :
+        usb_device -- USB device to open
+        transport  -- name of the transport to use, or None to try those
+                      in TRANSPORTS in turn
+        debug      -- function called with debug messages and their arguments
+    """
+    if debug is None:
+        debug = lambda out, *args: None
+    if transport is None:
+        names = TRANSPORTS
+    elif transport in _OPENERS:
+        names = [transport]
+    else:
+        raise yubico_exception.InputError('Unknown transport %s' % transport)
+    for name in names:
+        res = _OPENERS[name](usb_device, debug)
+        if res is not None:
+            debug("Using %s transport\n", name)
+            return res
+    raise YubiKeyTransportError('No transport available for %s' % (usb_device,))
@@ -8,6 +8,8 @@ module for accessing a USB HID YubiKey
 __all__ = [
   # constants
   # functions
+  'find_usb_devices',
+  'usb_device_id',
   # classes
   'YubiKeyUSBHID',
   'YubiKeyUSBHIDError',
@@ -20,31 +22,40 @@ from . import yubico_util
 from . import yubico_exception
 from . import yubikey_frame
 from . import yubikey_config
+from . import yubikey_config_util
 from . import yubikey_defs
 from . import yubikey_base
+from . import yubikey_poll
+from . import yubikey_transport
+from .yubikey_transport import _FEATURE_RPT_SIZE
 from .yubikey_defs import SLOT, YUBICO_VID, PID
 from .yubikey_base import YubiKey
 import struct
 import time
 import sys
-import usb
+import logging
+import threading
 
-# Various USB/HID parameters
-_USB_TYPE_CLASS         = (0x01 << 5)
-_USB_RECIP_INTERFACE    = 0x01
-_USB_ENDPOINT_IN        = 0x80
-_USB_ENDPOINT_OUT       = 0x00
+# monotonic clock for timing waits, where available
+_now = getattr(time, 'monotonic', time.time)
 
-_HID_GET_REPORT         = 0x01
-_HID_SET_REPORT         = 0x09
+# debug output goes here unless `debug' is set, which writes it to stderr
+_log = logging.getLogger(__name__)
 
-_USB_TIMEOUT_MS         = 2000
+# a response is at most 32 feature reports (5 bits of sequence number)
+_MAX_RESPONSE_SIZE      = 32 * 7
 
-# from ykcore_backend.h
-_FEATURE_RPT_SIZE       = 8
-_REPORT_TYPE_FEATURE    = 0x03
+# YubiKeyUSBHIDStatus instances by (class, feature report), and at most how many
+_STATUS_CACHE = {}
+_STATUS_CACHE_SIZE = 1024
+
+# dummy write resetting the read mode of the YubiKey
+_RESET_REPORT           = b'\x00\x00\x00\x00\x00\x00\x00\x8f'
 
 # dict used to select command for mode+slot in _challenge_response
+# serial number (4 bytes) and CRC16
+_SERIAL_RESPONSE_SIZE = 6
+
 _CMD_CHALLENGE = {'HMAC': {1: SLOT.CHAL_HMAC1, 2: SLOT.CHAL_HMAC2},
                   'OTP': {1: SLOT.CHAL_OTP1, 2: SLOT.CHAL_OTP2},
                   }
@@ -59,12 +70,16 @@ class YubiKeyUSBHIDCapabilities(yubikey_base.YubiKeyCapabilities):
 
     Overrides just the functions from YubiKeyCapabilities() that are available
     in one or more versions, leaving the other ones at False through default_answer.
+
+    Flag compatibility is a bitmask per flag family (see
+    yubikey_config_util.compatible_flags()), looked up once per instance.
     """
     def __init__(self, model, version, default_answer):
         super(YubiKeyUSBHIDCapabilities, self).__init__(
             model=model,
             version=version,
             default_answer=default_answer)
+        self._flag_masks = {}
 
     def have_yubico_OTP(self):
         """ Yubico OTP support has always been available in the standard YubiKey. """
@@ -87,13 +102,23 @@ class YubiKeyUSBHIDCapabilities(yubikey_base.YubiKeyCapabilities):
         return (self.version >= (2, 2, 0,))
 
     def have_ticket_flag(self, flag):
-        return flag.is_compatible(model = self.model, version = self.version)
+        return self._have_flag(flag)
 
     def have_config_flag(self, flag):
-        return flag.is_compatible(model = self.model, version = self.version)
+        return self._have_flag(flag)
 
     def have_extended_flag(self, flag):
-        return flag.is_compatible(model = self.model, version = self.version)
+        return self._have_flag(flag)
+
+    def _have_flag(self, flag):
+        family = flag.family
+        if family is None:
+            return flag.is_compatible(model = self.model, version = self.version)
+        mask = self._flag_masks.get(family)
+        if mask is None:
+            mask = self._flag_masks[family] = yubikey_config_util.compatible_flags(
+                family, self.model, self.version)
+        return bool(mask & flag.bit)
 
     def have_extended_scan_code_mode(self):
         return (self.version >= (2, 0, 0,))
@@ -110,16 +135,47 @@ class YubiKeyHIDDevice(object):
     High-level wrapper for low-level HID commands for a HID based YubiKey.
     """
 
-    def __init__(self, debug=False, skip=0):
+    def __init__(self, debug=False, skip=0, poller=None, usb_device=None, instrument=None,
+                 transport=None, conformance=False, touch_interval=None, touch_callback=None):
         """
         Find and connect to a YubiKey (USB HID).
 
         Attributes :
-            skip  -- number of YubiKeys to skip
-            debug -- True or False
+            skip       -- number of YubiKeys to skip
+            debug      -- True or False
+            poller     -- yubikey_poll.YubiKeyPoller deciding the status poll sleeps
+                          (default: yubikey_poll.AdaptivePoller)
+            usb_device -- USB device to open (as returned by find_usb_devices()),
+                          instead of searching for one
+            instrument -- yubikey_instrument.YubiKeyInstrument to report transfers,
+                          polls and failures to (default: None)
+            transport  -- name of the yubikey_transport to use ('hidraw', 'core'
+                          or 'legacy'), or an open YubiKeyTransport
+                          (default: the first one available)
+            conformance -- read the status before every feature report written,
+                           and raise YubiKeyUSBHIDError if the YubiKey would
+                           have been written to while busy (default: False)
+            touch_interval -- seconds between status reads while the YubiKey waits
+                              for its button to be pressed, instead of following
+                              the poller (default: None, follow the poller)
+            touch_callback -- function called with the seconds left to press the
+                              button whenever that changes, and with None when
+                              the wait for the button is over (default: None)
         """
         self.debug = debug
-        self._usb_handle = None
+        self.instrument = instrument
+        if poller is None:
+            poller = yubikey_poll.AdaptivePoller()
+        self.poller = poller
+        self.touch_interval = touch_interval
+        self.touch_callback = touch_callback
+        # held for the duration of every exchange with the YubiKey
+        self._lock = threading.RLock()
+        self._command = None
+        self._writes = _WriteScheduler(self, conformance)
+        self._transport = None
+        self.transport = transport
+        self.usb_device = usb_device
         if not self._open(skip):
             raise YubiKeyUSBHIDError('YubiKey USB HID initialization failed')
         self.status()
@@ -128,28 +184,41 @@ class YubiKeyHIDDevice(object):
         """
         Poll YubiKey for status.
         """
-        data = self._read()
+        with self._lock:
+            data = self._read()
         self._status = YubiKeyUSBHIDStatus(data)
         return self._status
 
+    def last_status(self):
+        """
+        Return the status read last (when opened, or by the last operation),
+        without polling the YubiKey.
+        """
+        return self._status
+
     def __del__(self):
         try:
-            if self._usb_handle:
+            if self._transport:
                 self._close()
         except (IOError, AttributeError):
             pass
 
     def _write_config(self, cfg, slot):
         """ Write configuration to YubiKey. """
-        old_pgm_seq = self._status.pgm_seq
-        frame = cfg.to_frame(slot=slot)
-        self._debug("Writing %s frame :\n%s\n" % \
-                        (yubikey_config.command2str(frame.command), cfg))
-        self._write(frame)
-        self._waitfor_clear(yubikey_defs.SLOT_WRITE_FLAG)
-        # make sure we have a fresh pgm_seq value
-        self.status()
-        self._debug("Programmed slot %i, sequence %i -> %i\n" % (slot, old_pgm_seq, self._status.pgm_seq))
+        with self._lock:
+            old_pgm_seq = self._status.pgm_seq
+            frame = cfg.to_frame(slot=slot)
+            self._debug("Writing %s frame :\n%s\n",
+                        yubikey_config.command2str(frame.command), cfg)
+            self._write(frame)
+            self._waitfor_clear(yubikey_defs.SLOT_WRITE_FLAG, command=frame.command)
+            # make sure we have a fresh pgm_seq value
+            self.status()
+            self._check_pgm_seq(old_pgm_seq, slot)
+
+    def _check_pgm_seq(self, old_pgm_seq, slot):
+        """ Check that writing a configuration increased the programming sequence. """
+        self._debug("Programmed slot %i, sequence %i -> %i\n", slot, old_pgm_seq, self._status.pgm_seq)
 
         cfgs = self._status.valid_configs()
         if not cfgs and self._status.pgm_seq == 0:
@@ -160,53 +229,86 @@ class YubiKeyHIDDevice(object):
         raise YubiKeyUSBHIDError('YubiKey programming failed (seq %i not increased (%i))' % \
                                     (old_pgm_seq, self._status.pgm_seq))
 
-    def _read_response(self, may_block=False):
-        """ Wait for a response to become available, and read it. """
+    def _read_response(self, may_block=False, length=None):
+        """
+        Wait for a response to become available, and read it.
+
+        If the `length' of the response (including its CRC16) is known,
+        only that much is read, and the CRC is checked.
+        """
         # wait for response to become available
-        res = self._waitfor_set(yubikey_defs.RESP_PENDING_FLAG, may_block)[:7]
+        this = self._waitfor_set(yubikey_defs.RESP_PENDING_FLAG, may_block,
+                                 command=self._command)
+        res = self._read_pending(this, length)
+        self._write_reset()
+        return res
+
+    def _read_pending(self, this, length=None):
+        """
+        Read the rest of a response, `this' being the first report of it.
+
+        With `length', reading stops as soon as that many bytes have been
+        read, and the CRC16 at the end is checked as the reports arrive.
+        The reset of the read mode is left to the caller.
+        """
+        size = length or _MAX_RESPONSE_SIZE
+        res = bytearray(size)
+        crc = yubico_util.Crc16() if length else None
+        pos = 0
         # continue reading while response pending is set
         while True:
+            n = min(7, size - pos)
+            res[pos:pos + n] = this[:n]
+            if crc is not None:
+                crc.update(this[:n])
+            pos += n
+            if pos == size:
+                break
             this = self._read()
             flags = yubico_util.ord_byte(this[7])
-            if flags & yubikey_defs.RESP_PENDING_FLAG:
-                seq = flags & 0b00011111
-                if res and (seq == 0):
-                    break
-                res += this[:7]
-            else:
+            if not flags & yubikey_defs.RESP_PENDING_FLAG:
                 break
-        self._write_reset()
-        return res
+            if flags & 0b00011111 == 0:
+                # sequence number wrapped, all of it read
+                break
+        if crc is not None and (pos != length or not crc.valid()):
+            if self.instrument is not None:
+                self.instrument.crc_failure(self, self._command)
+            raise YubiKeyUSBHIDError("Read from device failed CRC check")
+        return bytes(res[:pos])
 
     def _read(self):
         """ Read a USB HID feature report from the YubiKey. """
-        request_type = _USB_TYPE_CLASS | _USB_RECIP_INTERFACE | _USB_ENDPOINT_IN
-        value = _REPORT_TYPE_FEATURE << 8    # apparently required for YubiKey 1.3.2, but not 2.2.x
-        recv = self._usb_handle.controlMsg(request_type,
-                                          _HID_GET_REPORT,
-                                          _FEATURE_RPT_SIZE,
-                                          value = value,
-                                          timeout = _USB_TIMEOUT_MS)
-        if len(recv) != _FEATURE_RPT_SIZE:
-            self._debug("Failed reading %i bytes (got %i) from USB HID YubiKey.\n"
-                        % (_FEATURE_RPT_SIZE, recv))
+        if self.instrument is not None:
+            start = _now()
+        data = self._transport.read_report()
+        if self.instrument is not None:
+            self.instrument.report_read(self, start, _now() - start, data)
+        if len(data) != _FEATURE_RPT_SIZE:
+            self._debug("Failed reading %i bytes (got %i) from USB HID YubiKey.\n",
+                        _FEATURE_RPT_SIZE, len(data))
             raise YubiKeyUSBHIDError('Failed reading from USB HID YubiKey')
-        data = b''.join(yubico_util.chr_byte(c) for c in recv)
-        self._debug("READ  : %s" % (yubico_util.hexdump(data, colorize=True)))
+        self._writes.seen(data)
+        if self.debug or _log.isEnabledFor(logging.DEBUG):
+            self._debug("READ  : %s\n", yubico_util.Hexdump(data, colorize=self.debug, strip=True))
         return data
 
     def _write(self, frame):
         """
         Write a YubiKeyFrame to the USB HID.
 
-        Includes polling for YubiKey readiness before each write.
+        Includes waiting for YubiKey readiness before each write, as
+        scheduled by _WriteScheduler.
         """
-        for data in frame.to_feature_reports(debug=self.debug):
+        self._command = frame.command
+        debug = self.debug or _log.isEnabledFor(logging.DEBUG)
+        for data in frame._feature_reports(debug=debug):
             debug_str = None
-            if self.debug:
+            if debug:
                 (data, debug_str) = data
             # first, we ensure the YubiKey will accept a write
-            self._waitfor_clear(yubikey_defs.SLOT_WRITE_FLAG)
+            if not self._writes.writable():
+                self._waitfor_clear(yubikey_defs.SLOT_WRITE_FLAG)
             self._raw_write(data, debug_str)
         return True
 
@@ -214,8 +316,7 @@ class YubiKeyHIDDevice(object):
         """
         Reset read mode by issuing a dummy write.
         """
-        data = b'\x00\x00\x00\x00\x00\x00\x00\x8f'
-        self._raw_write(data)
+        self._raw_write(_RESET_REPORT)
         self._waitfor_clear(yubikey_defs.SLOT_WRITE_FLAG)
         return True
 
@@ -223,133 +324,80 @@ class YubiKeyHIDDevice(object):
         """
         Write data to YubiKey.
         """
-        if self.debug:
-            if not debug_str:
-                debug_str = ''
-            hexdump = yubico_util.hexdump(data, colorize=True)[:-1] # strip LF
-            self._debug("WRITE : %s %s\n" % (hexdump, debug_str))
-        request_type = _USB_TYPE_CLASS | _USB_RECIP_INTERFACE | _USB_ENDPOINT_OUT
-        value = _REPORT_TYPE_FEATURE << 8    # apparently required for YubiKey 1.3.2, but not 2.2.x
-        sent = self._usb_handle.controlMsg(request_type,
-                                          _HID_SET_REPORT,
-                                          data,
-                                          value = value,
-                                          timeout = _USB_TIMEOUT_MS)
+        if self.debug or _log.isEnabledFor(logging.DEBUG):
+            self._debug("WRITE : %s %s\n", yubico_util.Hexdump(data, colorize=self.debug, strip=True),
+                        debug_str or '')
+        if self.instrument is not None:
+            start = _now()
+        self._writes.written()
+        sent = self._transport.write_report(data)
+        if self.instrument is not None:
+            self.instrument.report_write(self, start, _now() - start, data)
         if sent != _FEATURE_RPT_SIZE:
-            self.debug("Failed writing %i bytes (wrote %i) to USB HID YubiKey.\n"
-                       % (_FEATURE_RPT_SIZE, sent))
+            self._debug("Failed writing %i bytes (wrote %i) to USB HID YubiKey.\n",
+                        _FEATURE_RPT_SIZE, sent)
             raise YubiKeyUSBHIDError('Failed talking to USB HID YubiKey')
         return sent
 
-    def _waitfor_clear(self, mask, may_block=False):
+    def _waitfor_clear(self, mask, may_block=False, command=None):
         """
         Wait for the YubiKey to turn OFF the bits in 'mask' in status responses.
 
         Returns the 8 bytes last read.
         """
-        return self._waitfor('nand', mask, may_block)
+        return self._waitfor('nand', mask, may_block, command=command)
 
-    def _waitfor_set(self, mask, may_block=False):
+    def _waitfor_set(self, mask, may_block=False, command=None):
         """
         Wait for the YubiKey to turn ON the bits in 'mask' in status responses.
 
         Returns the 8 bytes last read.
         """
-        return self._waitfor('and', mask, may_block)
+        return self._waitfor('and', mask, may_block, command=command)
 
-    def _waitfor(self, mode, mask, may_block, timeout=2):
+    def _waitfor(self, mode, mask, may_block, timeout=2, command=None):
         """
         Wait for the YubiKey to either turn ON or OFF certain bits in the status byte.
 
         mode is either 'and' or 'nand'
-        timeout is a number of seconds (precision about ~0.5 seconds)
-        """
-        finished = False
-        sleep = 0.01
-        # After six sleeps, we've slept 0.64 seconds.
-        wait_num = (timeout * 2) - 1 + 6
-        resp_timeout = False    # YubiKey hasn't indicated RESP_TIMEOUT (yet)
-        while not finished:
-            time.sleep(sleep)
+        timeout is a number of seconds
+        command is the SLOT command being waited for (if any), used by the poller
+        """
+        wait = _StatusWait(self, mode, mask, may_block, timeout, command)
+        for sleep in wait.intervals():
+            if self.instrument is not None:
+                self.instrument.poll(self, command, sleep)
+            if sleep:
+                time.sleep(sleep)
             this = self._read()
-            flags = yubico_util.ord_byte(this[7])
-
-            if flags & yubikey_defs.RESP_TIMEOUT_WAIT_FLAG:
-                if not resp_timeout:
-                    resp_timeout = True
-                    seconds_left = flags & yubikey_defs.RESP_TIMEOUT_WAIT_MASK
-                    self._debug("Device indicates RESP_TIMEOUT (%i seconds left)\n" \
-                                    % (seconds_left))
-                    if may_block:
-                        # calculate new wait_num - never more than 20 seconds
-                        seconds_left = min(20, seconds_left)
-                        wait_num = (seconds_left * 2) - 1 + 6
-
-            if mode == 'nand':
-                if not flags & mask == mask:
-                    finished = True
-                else:
-                    self._debug("Status %s (0x%x) has not cleared bits %s (0x%x)\n"
-                                % (bin(flags), flags, bin(mask), mask))
-            elif mode == 'and':
-                if flags & mask == mask:
-                    finished = True
-                else:
-                    self._debug("Status %s (0x%x) has not set bits %s (0x%x)\n"
-                                % (bin(flags), flags, bin(mask), mask))
-            else:
-                assert()
-
-            if not finished:
-                wait_num -= 1
-                if wait_num == 0:
-                    if mode == 'nand':
-                        reason = 'Timed out waiting for YubiKey to clear status 0x%x' % mask
-                    else:
-                        reason = 'Timed out waiting for YubiKey to set status 0x%x' % mask
-                    raise yubikey_base.YubiKeyTimeout(reason)
-                sleep = min(sleep + sleep, 0.5)
-            else:
+            if wait.done(this):
                 return this
 
     def _open(self, skip=0):
         """ Perform HID initialization """
-        usb_device = self._get_usb_device(skip)
-
-        if usb_device:
-            usb_conf = usb_device.configurations[0]
-            self._usb_int = usb_conf.interfaces[0][0]
-        else:
+        if isinstance(self.transport, yubikey_transport.YubiKeyTransport):
+            self._transport = self.transport
+            return True
+
+        usb_device = self.usb_device
+        if usb_device is None:
+            usb_device = self._get_usb_device(skip)
+            self.usb_device = usb_device
+        if not usb_device:
             raise YubiKeyUSBHIDError('No USB YubiKey found')
 
         try:
-            self._usb_handle = usb_device.open()
-            self._usb_handle.detachKernelDriver(0)
-        except Exception as error:
-            if 'could not detach kernel driver from interface' in str(error):
-                self._debug('The in-kernel-HID driver has already been detached\n')
-            else:
-                self._debug("detachKernelDriver not supported!\n")
-
-        try:
-            self._usb_handle.setConfiguration(1)
-        except usb.USBError:
-            self._debug("Unable to set configuration, ignoring...\n")
-        self._usb_handle.claimInterface(self._usb_int)
+            self._transport = yubikey_transport.open_transport(usb_device, self.transport, self._debug)
+        except yubikey_transport.YubiKeyTransportError as error:
+            raise YubiKeyUSBHIDError(str(error))
         return True
 
     def _close(self):
         """
-        Release the USB interface again.
+        Close the transport to the YubiKey again.
         """
-        self._usb_handle.releaseInterface()
-        try:
-            # If we're using PyUSB >= 1.0 we can re-attach the kernel driver here.
-            self._usb_handle.dev.attach_kernel_driver(0)
-        except:
-            pass
-        self._usb_int = None
-        self._usb_handle = None
+        self._transport.close()
+        self._transport = None
         return True
 
     def _get_usb_device(self, skip=0):
@@ -358,34 +406,236 @@ class YubiKeyHIDDevice(object):
 
         Optionally allows you to skip n devices, to support multiple attached YubiKeys.
         """
-        try:
-            # PyUSB >= 1.0, this is a workaround for a problem with libusbx
-            # on Windows.
-            import usb.core
-            import usb.legacy
-            devices = [usb.legacy.Device(d) for d in usb.core.find(
-                find_all=True, idVendor=YUBICO_VID)]
-        except ImportError:
-            # Using PyUsb < 1.0.
-            import usb
-            devices = [d for bus in usb.busses() for d in bus.devices]
-        for device in devices:
-            if device.idVendor == YUBICO_VID:
-                if device.idProduct in PID.all(otp=True):
-                    if skip == 0:
-                        return device
-                    skip -= 1
+        devices = find_usb_devices()
+        if skip < len(devices):
+            return devices[skip]
         return None
 
-    def _debug(self, out, print_prefix=True):
-        """ Print out to stderr, if debugging is enabled. """
+    def _debug(self, out, *args):
+        """
+        Print out (formatted with args) to stderr if debugging is enabled,
+        otherwise log it at DEBUG level. Nothing is formatted unless output.
+        """
         if self.debug:
-            if print_prefix:
-                pre = self.__class__.__name__
-                if hasattr(self, 'debug_prefix'):
-                    pre = getattr(self, 'debug_prefix')
-                sys.stderr.write("%s: " % pre)
+            pre = self.__class__.__name__
+            if hasattr(self, 'debug_prefix'):
+                pre = getattr(self, 'debug_prefix')
+            sys.stderr.write("%s: " % pre)
+            if args:
+                out = out % args
             sys.stderr.write(out)
+        elif _log.isEnabledFor(logging.DEBUG):
+            _log.debug(out.rstrip('\n'), *args)
+
+
+class _WriteScheduler(object):
+    """
+    Decides when the next feature report can be written to the YubiKey,
+    from the last status seen.
+
+    The YubiKey only sets SLOT_WRITE_FLAG while processing a report written
+    to it, so once a report read shows neither SLOT_WRITE_FLAG nor
+    RESP_PENDING_FLAG, the next report can be written without reading the
+    status again. Otherwise the status is read at once, and the caller only
+    waits (sleeping as the poller says) if the YubiKey is still busy.
+
+    In conformance mode, the status is read before every write anyway, and
+    YubiKeyUSBHIDError is raised if a write would have been let through
+    while the YubiKey was busy.
+
+    Attributes :
+        clear   -- True if the last report read showed the YubiKey idle, and
+                   nothing has been written since
+        skipped -- status reads saved
+    """
+
+    _BUSY_FLAGS = yubikey_defs.SLOT_WRITE_FLAG | yubikey_defs.RESP_PENDING_FLAG
+
+    def __init__(self, device, conformance=False):
+        self.device = device
+        self.conformance = conformance
+        self.clear = False
+        self.skipped = 0
+
+    def __repr__(self):
+        return '<%s instance at %s: clear=%s, skipped=%i>' % (
+            self.__class__.__name__,
+            hex(id(self)),
+            self.clear,
+            self.skipped,
+            )
+
+    def seen(self, data):
+        """ Register a report read from the YubiKey. """
+        self.clear = not yubico_util.ord_byte(data[7]) & self._BUSY_FLAGS
+
+    def written(self):
+        """ Register a report written to the YubiKey. """
+        self.clear = False
+
+    def writable(self):
+        """
+        Return True if a report can be written right away, reading the
+        status (without sleeping) unless the YubiKey is known to be idle.
+        """
+        if self.clear and not self.conformance:
+            self.skipped += 1
+            return True
+        expected = self.clear
+        device = self.device
+        if device.instrument is not None:
+            device.instrument.poll(device, None, 0)
+        this = device._read()
+        if expected and not self.clear:
+            raise YubiKeyUSBHIDError('Write scheduled while YubiKey busy (status 0x%02x)'
+                                     % yubico_util.ord_byte(this[7]))
+        return self.clear
+
+
+class _StatusWait(object):
+    """
+    The state of a wait for the YubiKey to turn ON ('and') or OFF ('nand')
+    the bits in `mask' in the status byte.
+
+    Sleeping between the status reads is up to the caller, which takes
+    the sleeps from intervals() and passes each report read to done().
+
+    The status can only be polled : the YubiKey answers GET_REPORT for
+    its feature reports, but sends no input report when a response
+    becomes pending (or the button is pressed), so there is nothing to
+    select() on, even with hidraw. touch_interval shortens the sleeps
+    instead while the YubiKey waits for its button.
+    """
+
+    def __init__(self, device, mode, mask, may_block, timeout, command, touch_callback=None):
+        if mode not in ('and', 'nand'):
+            assert()
+        self.device = device
+        self.mode = mode
+        self.mask = mask
+        self.may_block = may_block
+        self.command = command
+        self.start = _now()
+        self.deadline = self.start + timeout
+        self.resp_timeout = False    # YubiKey hasn't indicated RESP_TIMEOUT (yet)
+        self.seconds_left = None
+        self.polls = 0
+        if touch_callback is None:
+            touch_callback = device.touch_callback
+        self.touch_callback = touch_callback
+
+    def intervals(self):
+        """
+        Return an iterator of seconds to sleep before each status read : those
+        of the poller, or the device's touch_interval (if set) once the YubiKey
+        waits for its button to be pressed.
+        """
+        device = self.device
+        for sleep in device.poller.intervals(self.command):
+            while self.resp_timeout and device.touch_interval is not None:
+                yield device.touch_interval
+            yield sleep
+
+    def _touch_progress(self, seconds_left):
+        if self.touch_callback is not None:
+            self.touch_callback(seconds_left)
+
+    def done(self, this):
+        """
+        Check a status report. Returns True if the wait is over, False if
+        not, and raises YubiKeyTimeout if it never will be.
+        """
+        flags = yubico_util.ord_byte(this[7])
+        mode, mask = self.mode, self.mask
+        self.polls += 1
+
+        if flags & yubikey_defs.RESP_TIMEOUT_WAIT_FLAG:
+            seconds_left = flags & yubikey_defs.RESP_TIMEOUT_WAIT_MASK
+            if seconds_left != self.seconds_left:
+                self.seconds_left = seconds_left
+                self._touch_progress(seconds_left)
+            if not self.resp_timeout:
+                self.resp_timeout = True
+                self.device._debug("Device indicates RESP_TIMEOUT (%i seconds left)\n",
+                                   self.seconds_left)
+                if self.may_block:
+                    # calculate new deadline - never more than 20 seconds
+                    self.deadline = _now() + min(20, self.seconds_left) + 1
+        elif self.seconds_left is not None:
+            # button pressed
+            self.seconds_left = None
+            self._touch_progress(None)
+
+        if mode == 'nand':
+            if not flags & mask == mask:
+                finished = True
+            else:
+                finished = False
+                self.device._debug("Status 0x%02x has not cleared bits 0x%02x\n", flags, mask)
+        else:
+            if flags & mask == mask:
+                finished = True
+            else:
+                finished = False
+                self.device._debug("Status 0x%02x has not set bits 0x%02x\n", flags, mask)
+
+        if finished:
+            elapsed = _now() - self.start
+            if not self.resp_timeout:
+                # waits for a button press say nothing about the command
+                self.device.poller.observe(self.command, elapsed)
+            if self.device.instrument is not None:
+                self.device.instrument.wait(self.device, self.command, self.start, elapsed, self.polls)
+            return True
+
+        now = _now()
+        if now >= self.deadline:
+            if self.seconds_left is not None:
+                self.seconds_left = None
+                self._touch_progress(None)
+            if self.device.instrument is not None:
+                self.device.instrument.timeout(self.device, self.command, self.start, now - self.start)
+            if mode == 'nand':
+                reason = 'Timed out waiting for YubiKey to clear status 0x%x' % mask
+            else:
+                reason = 'Timed out waiting for YubiKey to set status 0x%x' % mask
+            raise yubikey_base.YubiKeyTimeout(reason)
+        return False
+
+
+def find_usb_devices():
+    """
+    Return a list of all attached YubiKey USB devices with an OTP interface.
+
+    The bus is only walked once, so this is the function to use to look at
+    more than one YubiKey. Pass the entries as `usb_device' to
+    YubiKeyHIDDevice to open them.
+    """
+    try:
+        # PyUSB >= 1.0
+        import usb.core
+        devices = list(usb.core.find(find_all=True, idVendor=YUBICO_VID))
+    except ImportError:
+        # Using PyUsb < 1.0.
+        import usb
+        devices = [d for bus in usb.busses() for d in bus.devices]
+    otp_pids = PID.all(otp=True)
+    return [device for device in devices
+            if device.idVendor == YUBICO_VID and device.idProduct in otp_pids]
+
+
+def usb_device_id(device):
+    """
+    Return a value identifying the USB port `device' is attached to.
+
+    Used to tell whether a device found in a later enumeration is the same
+    as one found before.
+    """
+    # usb.core.Device, or usb.legacy.Device wrapping one
+    dev = getattr(device, 'dev', device)
+    if hasattr(dev, 'address'):
+        return (dev.bus, dev.address)
+    return (device.filename, device.devnum)
 
 
 class YubiKeyUSBHID(YubiKey):
@@ -440,6 +690,12 @@ class YubiKeyUSBHID(YubiKey):
         """
         return self._device.status()
 
+    def last_status(self):
+        """
+        Return the status read last, without polling the YubiKey.
+        """
+        return self._device.last_status()
+
     def version_num(self):
         """ Get the YubiKey version as a tuple (major, minor, build). """
         return self._device._status.ykver()
@@ -460,6 +716,18 @@ class YubiKeyUSBHID(YubiKey):
             raise yubikey_base.YubiKeyVersionError("%s challenge-response unsupported in YubiKey %s" % (mode, self.version()) )
         return self._challenge_response(challenge, mode, slot, variable, may_block)
 
+    def challenge_response_many(self, challenges, mode='HMAC', slot=1, variable=True, may_block=True):
+        """
+        Issue a sequence of challenges to the YubiKey, generating the responses.
+
+        `challenges' is any iterable of challenges, each as for
+        challenge_response(). The challenges are sent back to back, without
+        re-polling the YubiKey between one response and the next challenge.
+        """
+        if not self.capabilities.have_challenge_response(mode):
+            raise yubikey_base.YubiKeyVersionError("%s challenge-response unsupported in YubiKey %s" % (mode, self.version()) )
+        return self._challenge_response_many(challenges, mode, slot, variable, may_block)
+
     def init_config(self, **kw):
         """ Get a configuration object for this type of YubiKey. """
         return YubiKeyConfigUSBHID(ykver=self.version_num(), \
@@ -468,28 +736,54 @@ class YubiKeyUSBHID(YubiKey):
 
     def write_config(self, cfg, slot=1):
         """ Write a configuration to the YubiKey. """
+        self._check_config(cfg, slot)
+        return self._device._write_config(cfg, slot)
+
+    def _check_config(self, cfg, slot):
+        """ Check that a configuration can be written to this YubiKey. """
         cfg_req_ver = cfg.version_required()
         if cfg_req_ver > self.version_num():
             raise yubikey_base.YubiKeyVersionError('Configuration requires YubiKey version %i.%i (this is %s)' % \
                                                   (cfg_req_ver[0], cfg_req_ver[1], self.version()))
         if not self.capabilities.have_configuration_slot(slot):
             raise YubiKeyUSBHIDError("Can't write configuration to slot %i" % (slot))
-        return self._device._write_config(cfg, slot)
 
     def _read_serial(self, may_block):
         """ Read the serial number from a YubiKey > 2.2. """
 
         frame = yubikey_frame.YubiKeyFrame(command = SLOT.DEVICE_SERIAL)
-        self._device._write(frame)
-        response = self._device._read_response(may_block=may_block)
-        if not yubico_util.validate_crc16(response[:6]):
-            raise YubiKeyUSBHIDError("Read from device failed CRC check")
+        with self._device._lock:
+            self._device._write(frame)
+            response = self._device._read_response(may_block=may_block, length=_SERIAL_RESPONSE_SIZE)
+        return self._parse_serial(response)
+
+    def _parse_serial(self, response):
+        """ Decode the (CRC checked) response to a DEVICE_SERIAL command. """
         # the serial number is big-endian, although everything else is little-endian
-        serial = struct.unpack('>lxxx', response)
+        serial = struct.unpack('>lxx', response)
         return serial[0]
 
     def _challenge_response(self, challenge, mode, slot, variable, may_block):
         """ Do challenge-response with a YubiKey > 2.0. """
+        (frame, response_len) = self._challenge_frame(challenge, mode, slot, variable)
+        with self._device._lock:
+            self._device._write(frame)
+            response = self._device._read_response(may_block=may_block, length=response_len + 2)
+        return response[:response_len]
+
+    def _challenge_response_many(self, challenges, mode, slot, variable, may_block):
+        """ Do challenge-response with a YubiKey > 2.0 for each of `challenges'. """
+        for challenge in challenges:
+            (frame, response_len) = self._challenge_frame(challenge, mode, slot, variable)
+            # _read_response() ends waiting for SLOT_WRITE_FLAG to clear after its
+            # reset, so the next frame is written without polling first
+            with self._device._lock:
+                self._device._write(frame)
+                response = self._device._read_response(may_block=may_block, length=response_len + 2)
+            yield response[:response_len]
+
+    def _challenge_frame(self, challenge, mode, slot, variable):
+        """ Return the frame to send for a challenge, and the length of the response (without CRC). """
          # Check length and pad challenge if appropriate
         if mode == 'HMAC':
             if len(challenge) > yubikey_defs.SHA1_MAX_BLOCK_SIZE:
@@ -516,37 +810,61 @@ class YubiKeyUSBHID(YubiKey):
         except:
             raise yubico_exception.InputError('Invalid slot specified (%s)' % (slot))
 
-        frame = yubikey_frame.YubiKeyFrame(command=command, payload=challenge)
-        self._device._write(frame)
-        response = self._device._read_response(may_block=may_block)
-        if not yubico_util.validate_crc16(response[:response_len + 2]):
-            raise YubiKeyUSBHIDError("Read from device failed CRC check")
-        return response[:response_len]
+        return (yubikey_frame.YubiKeyFrame(command=command, payload=challenge), response_len)
+
+    def _crc_failure(self):
+        """ Report a response failing its CRC check to the instrument, if any. """
+        device = self._device
+        if device.instrument is not None:
+            device.instrument.crc_failure(device, device._command)
 
 
 class YubiKeyUSBHIDStatus(object):
-    """ Class to represent the status information we get from the YubiKey. """
+    """
+    Class to represent the status information we get from the YubiKey.
+
+    Instances are immutable, and the same status report read again gives
+    the same instance.
+    """
 
     CONFIG1_VALID = 0x01 # Bit in touchLevel indicating that configuration 1 is valid (from firmware 2.1)
     CONFIG2_VALID = 0x02 # Bit in touchLevel indicating that configuration 2 is valid (from firmware 2.1)
 
-    def __init__(self, data):
-        # From ykdef.h :
-        #
-        # struct status_st {
-        #        unsigned char versionMajor;     /* Firmware version information */
-        #        unsigned char versionMinor;
-        #        unsigned char versionBuild;
-        #        unsigned char pgmSeq;           /* Programming sequence number. 0 if no valid configuration */
-        #        unsigned short touchLevel;      /* Level from touch detector */
-        # };
-        fmt = '<x BBB B H B'
-        self.version_major, \
-            self.version_minor, \
-            self.version_build, \
-            self.pgm_seq, \
-            self.touch_level, \
-            self.flags = struct.unpack(fmt, data)
+    __slots__ = ('version_major', 'version_minor', 'version_build', 'pgm_seq', 'touch_level', 'flags')
+
+    # From ykdef.h :
+    #
+    # struct status_st {
+    #        unsigned char versionMajor;     /* Firmware version information */
+    #        unsigned char versionMinor;
+    #        unsigned char versionBuild;
+    #        unsigned char pgmSeq;           /* Programming sequence number. 0 if no valid configuration */
+    #        unsigned short touchLevel;      /* Level from touch detector */
+    # };
+    _struct = struct.Struct('<x BBB B H B')
+
+    def __new__(cls, data):
+        data = bytes(data)
+        key = (cls, data)
+        self = _STATUS_CACHE.get(key)
+        if self is None:
+            self = object.__new__(cls)
+            for (name, value) in zip(cls.__slots__, cls._struct.unpack(data)):
+                object.__setattr__(self, name, value)
+            if len(_STATUS_CACHE) >= _STATUS_CACHE_SIZE:
+                _STATUS_CACHE.clear()
+            _STATUS_CACHE[key] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __reduce__(self):
+        return (self.__class__, (self.to_string(),))
+
+    def to_string(self):
+        """ Return the status as the 8 bytes of the feature report. """
+        return self._struct.pack(*[getattr(self, name) for name in self.__slots__])
 
     def __repr__(self):
         valid_str = ''